@@ -1,14 +1,23 @@
 """API v1 routes"""
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
 import logging
+from typing import Any, Dict, List, Optional
 
+from app.config import settings
 from app.api.dependencies import get_recommendation_service
-from app.services.recommendation_service import RecommendationService
+from app.services.recommendation_service import RecommendationService, RECOMMENDATION_PHASE_SECONDS
 from app.api.v1.schemas import (
     TrackViewRequest,
     TrackViewResponse,
+    BulkTrackViewItem,
+    BulkTrackViewResponse,
     RecommendationRequest,
     RecommendationResponse,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    UserRecommendations,
     HealthResponse,
     ModelStatusResponse,
     PostDetail
@@ -16,6 +25,9 @@ from app.api.v1.schemas import (
 
 logger = logging.getLogger(__name__)
 
+_SERIALIZE_SECONDS = RECOMMENDATION_PHASE_SECONDS.labels('serialize')
+_BULK_VIEWS = TypeAdapter(List[BulkTrackViewItem])
+
 router = APIRouter(prefix="/api/v1", tags=["recommendations"])
 
 
@@ -23,12 +35,32 @@ router = APIRouter(prefix="/api/v1", tags=["recommendations"])
 async def health_check(
     recommendation_service: RecommendationService = Depends(get_recommendation_service)
 ):
-    """Health check endpoint"""
-    stats = recommendation_service.get_statistics()
+    """Health check endpoint; recommendations fall back to popular posts until ready"""
+    health = recommendation_service.get_health()
     return HealthResponse(
         status="healthy",
         service="post-recommendation-api",
-        model_loaded=stats['model_loaded']
+        model_loaded=health['model_loaded'],
+        ready=health['ready'],
+        warmup=health['warmup']
+    )
+
+
+@router.get("/ready", response_model=HealthResponse, status_code=status.HTTP_200_OK)
+async def readiness_check(
+    response: Response,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
+):
+    """Readiness probe: 503 until the model has warmed up enough to serve recommendations"""
+    health = recommendation_service.get_health()
+    if not health['ready']:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return HealthResponse(
+        status="ready" if health['ready'] else "warming_up",
+        service="post-recommendation-api",
+        model_loaded=health['model_loaded'],
+        ready=health['ready'],
+        warmup=health['warmup']
     )
 
 
@@ -47,7 +79,9 @@ async def track_view(
             user_id=request.user_id,
             post_id=request.post_id,
             post_content=request.post_content,
-            post_author_id=request.post_author_id
+            post_author_id=request.post_author_id,
+            duration_ms=request.duration_ms,
+            session_id=request.session_id
         )
         
         return TrackViewResponse(
@@ -65,6 +99,100 @@ async def track_view(
         )
 
 
+def _view_dict(item: BulkTrackViewItem) -> Dict[str, Any]:
+    view = item.model_dump()
+    if item.viewed_at is not None:
+        view['viewed_at'] = item.viewed_at.timestamp()
+    return view
+
+
+async def _track_ndjson(
+    request: Request,
+    recommendation_service: RecommendationService
+) -> (int, int, int):
+    """Apply an NDJSON body in chunks as it arrives; returns (tracked, new, rejected)"""
+    tracked = added = rejected = 0
+    views: List[Dict[str, Any]] = []
+    buffer = b''
+    
+    async def apply() -> None:
+        nonlocal tracked, added
+        if views:
+            count, new = await recommendation_service.track_views(views)
+            tracked += count
+            added += new
+            views.clear()
+    
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                views.append(_view_dict(BulkTrackViewItem.model_validate_json(line)))
+            except ValidationError:
+                rejected += 1
+            if len(views) >= settings.BULK_TRACK_CHUNK_SIZE:
+                await apply()
+    if buffer.strip():
+        try:
+            views.append(_view_dict(BulkTrackViewItem.model_validate_json(buffer)))
+        except ValidationError:
+            rejected += 1
+    await apply()
+    return tracked, added, rejected
+
+
+@router.post(
+    "/track-views",
+    response_model=BulkTrackViewResponse,
+    status_code=status.HTTP_200_OK
+)
+async def track_views(
+    request: Request,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
+):
+    """Track many views at once, from a JSON array or an NDJSON stream (application/x-ndjson).
+
+    An array is validated as a whole and applied in one pass with one
+    batched DB write. An NDJSON body is applied every BULK_TRACK_CHUNK_SIZE
+    lines as it streams in; invalid lines are skipped and counted.
+    """
+    try:
+        content_type = request.headers.get('content-type', '')
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            tracked, added, rejected = await _track_ndjson(request, recommendation_service)
+        else:
+            try:
+                items = _BULK_VIEWS.validate_json(await request.body())
+            except ValidationError as e:
+                raise RequestValidationError(e.errors(include_url=False))
+            if len(items) > settings.BULK_TRACK_MAX_VIEWS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"At most {settings.BULK_TRACK_MAX_VIEWS} views per array; stream larger batches as NDJSON"
+                )
+            tracked, added = await recommendation_service.track_views([_view_dict(i) for i in items])
+            rejected = 0
+        
+        return BulkTrackViewResponse(
+            status="success",
+            tracked=tracked,
+            new_interactions=added,
+            rejected=rejected
+        )
+        
+    except (HTTPException, RequestValidationError):
+        raise
+    except Exception as e:
+        logger.error(f"Error tracking views: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @router.get(
     "/recommendations/{user_id}",
     response_model=RecommendationResponse,
@@ -74,37 +202,89 @@ async def get_recommendations(
     user_id: str,
     page: int = Query(default=1, ge=1, description="Page number (1-based)"),
     limit: int = Query(default=10, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(default=None, description="Opaque cursor from meta.nextCursor; overrides page"),
+    include_total: bool = Query(default=True, description="Compute the total count (cached between cursor pages)"),
     recommendation_service: RecommendationService = Depends(get_recommendation_service)
 ):
     """Get post recommendations for a user based on their viewing history"""
     try:
-        recommendations, total = await recommendation_service.get_recommendations(
+        recommendations, total, next_cursor = await recommendation_service.get_recommendations(
             user_id=user_id,
             page=page,
-            limit=limit
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total
         )
         
-        total_pages = max(1, (total + limit - 1) // limit)
-        has_next = page < total_pages
-        has_previous = page > 1
+        total_pages = max(1, (total + limit - 1) // limit) if total is not None else None
+        if cursor:
+            # Keyset pages have no page number
+            page = None
+            total_pages = None
+            has_previous = True
+        else:
+            has_previous = page > 1
+        has_next = next_cursor is not None
+
+        with _SERIALIZE_SECONDS.time():
+            return RecommendationResponse(
+                status="success",
+                user_id=user_id,
+                recommendations=[PostDetail(**post) for post in recommendations],
+                count=len(recommendations),
+                meta={
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "totalPages": total_pages,
+                    "hasNext": has_next,
+                    "hasPrevious": has_previous,
+                    "nextCursor": next_cursor,
+                }
+            )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting recommendations: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
 
-        return RecommendationResponse(
+
+@router.post(
+    "/recommendations/batch",
+    response_model=BatchRecommendationResponse,
+    status_code=status.HTTP_200_OK
+)
+async def get_batch_recommendations(
+    request: BatchRecommendationRequest,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
+):
+    """Get the first page of recommendations for many users in one call"""
+    try:
+        results = await recommendation_service.get_batch_recommendations(
+            user_ids=request.user_ids,
+            limit=request.limit
+        )
+        
+        return BatchRecommendationResponse(
             status="success",
-            user_id=user_id,
-            recommendations=[PostDetail(**post) for post in recommendations],
-            count=len(recommendations),
-            meta={
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "totalPages": total_pages,
-                "hasNext": has_next,
-                "hasPrevious": has_previous,
-            }
+            results=[
+                UserRecommendations(
+                    user_id=user_id,
+                    recommendations=[PostDetail(**post) for post in posts],
+                    count=len(posts),
+                    total=total or 0
+                )
+                for user_id, (posts, total) in results.items()
+            ],
+            count=len(results)
         )
         
     except Exception as e:
-        logger.error(f"Error getting recommendations: {e}")
+        logger.error(f"Error getting batch recommendations: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -127,5 +307,8 @@ async def model_status(
         model_loaded=stats['model_loaded'],
         total_users=stats['total_users'],
         total_posts=stats['total_posts'],
-        total_interactions=stats['total_interactions']
+        total_interactions=stats['total_interactions'],
+        result_cache=stats['result_cache'],
+        post_cache=stats['post_cache'],
+        role=stats['role']
     )
@@ -22,12 +22,31 @@ class TrackViewResponse(BaseModel):
     post_id: str
 
 
+class BulkTrackViewItem(TrackViewRequest):
+    """One view of a bulk track-views request"""
+    viewed_at: Optional[datetime] = Field(default=None, description="When the view happened; defaults to when it is received")
+
+
+class BulkTrackViewResponse(BaseModel):
+    """Response schema for bulk view tracking"""
+    status: str
+    tracked: int = Field(..., description="Views applied to the model and queued for the DB")
+    new_interactions: int = Field(..., description="Tracked views of posts the user had not viewed before")
+    rejected: int = Field(default=0, description="NDJSON lines skipped because they were not valid views")
+
+
 class RecommendationRequest(BaseModel):
     """Request schema for getting recommendations"""
     user_id: str = Field(..., description="User ID to get recommendations for")
     limit: int = Field(default=10, ge=1, le=100, description="Number of recommendations")
 
 
+class BatchRecommendationRequest(BaseModel):
+    """Request schema for getting recommendations for many users at once"""
+    user_ids: List[str] = Field(..., min_length=1, max_length=1000, description="User IDs to get recommendations for")
+    limit: int = Field(default=10, ge=1, le=100, description="Number of recommendations per user")
+
+
 class PostDetail(BaseModel):
     """Post detail schema"""
     id: str
@@ -50,12 +69,13 @@ class PostDetail(BaseModel):
 
 class PaginationMeta(BaseModel):
     """Pagination metadata"""
-    page: int
+    page: Optional[int] = None
     limit: int
-    total: int
-    totalPages: int
+    total: Optional[int] = None
+    totalPages: Optional[int] = None
     hasNext: bool
     hasPrevious: bool
+    nextCursor: Optional[str] = Field(default=None, description="Pass as ?cursor= to fetch the next page")
 
 
 class RecommendationResponse(BaseModel):
@@ -67,11 +87,47 @@ class RecommendationResponse(BaseModel):
     meta: PaginationMeta
 
 
+class UserRecommendations(BaseModel):
+    """Recommendations for one user in a batch response"""
+    user_id: str
+    recommendations: List[PostDetail]
+    count: int
+    total: int
+
+
+class BatchRecommendationResponse(BaseModel):
+    """Response schema for batch recommendation endpoint"""
+    status: str
+    results: List[UserRecommendations]
+    count: int
+
+
+class WarmupStatus(BaseModel):
+    """Progress of the model warm-up"""
+    phase: str
+    rows_loaded: int
+    rows_total: Optional[int] = None
+    eta_seconds: Optional[float] = None
+    elapsed_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
 class HealthResponse(BaseModel):
     """Health check response schema"""
     status: str
     service: str
     model_loaded: bool
+    ready: bool = True
+    warmup: Optional[WarmupStatus] = None
+
+
+class CacheStats(BaseModel):
+    """Cache hit/miss counters"""
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+    hit_rate: float
 
 
 class ModelStatusResponse(BaseModel):
@@ -81,3 +137,6 @@ class ModelStatusResponse(BaseModel):
     total_users: int
     total_posts: int
     total_interactions: int
+    result_cache: Optional[CacheStats] = None
+    post_cache: Optional[CacheStats] = None
+    role: Optional[str] = None
@@ -26,6 +26,101 @@ class Settings(BaseSettings):
     # Model
     MODEL_PATH: str = os.getenv('MODEL_PATH', './models/recommendation_model')
     
+    # Interaction persistence (append-only log + periodic snapshot)
+    INTERACTION_LOG_FSYNC_EVERY: int = int(os.getenv('INTERACTION_LOG_FSYNC_EVERY', 100))
+    INTERACTION_LOG_FSYNC_INTERVAL: float = float(os.getenv('INTERACTION_LOG_FSYNC_INTERVAL', 1.0))
+    INTERACTION_SNAPSHOT_EVERY: int = int(os.getenv('INTERACTION_SNAPSHOT_EVERY', 10000))
+    
+    # Co-view model bounds
+    RECO_HISTORY_WINDOW: int = int(os.getenv('RECO_HISTORY_WINDOW', 50))
+    RECO_MAX_HISTORY_PER_USER: int = int(os.getenv('RECO_MAX_HISTORY_PER_USER', 500))
+    RECO_MAX_NEIGHBORS_PER_POST: int = int(os.getenv('RECO_MAX_NEIGHBORS_PER_POST', 200))
+    RECO_SCORING_NEIGHBORS: int = int(os.getenv('RECO_SCORING_NEIGHBORS', 50))
+    RECO_COVIEW_HALF_LIFE_HOURS: float = float(os.getenv('RECO_COVIEW_HALF_LIFE_HOURS', 24.0))
+    # Dwell time scales co-view weights: duration / reference, clipped to [min, max]
+    RECO_DWELL_REFERENCE_MS: float = float(os.getenv('RECO_DWELL_REFERENCE_MS', 10000.0))
+    RECO_DWELL_MIN_FACTOR: float = float(os.getenv('RECO_DWELL_MIN_FACTOR', 0.2))
+    RECO_DWELL_MAX_FACTOR: float = float(os.getenv('RECO_DWELL_MAX_FACTOR', 3.0))
+    
+    # Item-item weights: raw decayed 'coview' counts, or 'cosine' / 'jaccard' / 'idf' similarities
+    # rebuilt by a batch job every RECO_SIMILARITY_REBUILD_INTERVAL seconds (0 builds once at startup)
+    RECO_SIMILARITY_METRIC: str = os.getenv('RECO_SIMILARITY_METRIC', 'coview')
+    RECO_SIMILARITY_REBUILD_INTERVAL: float = float(os.getenv('RECO_SIMILARITY_REBUILD_INTERVAL', 3600.0))
+    
+    # Content-based candidates: post_content embedded with fastembed (optional dependency, same model
+    # as the rag-chatbot) and searched in an IVF index; weight is relative to the best co-view score
+    RECO_EMBEDDINGS_ENABLED: bool = os.getenv('RECO_EMBEDDINGS_ENABLED', 'False').lower() == 'true'
+    EMBEDDING_MODEL: str = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+    RECO_EMBEDDING_CANDIDATES: int = int(os.getenv('RECO_EMBEDDING_CANDIDATES', 100))
+    RECO_EMBEDDING_WEIGHT: float = float(os.getenv('RECO_EMBEDDING_WEIGHT', 0.3))
+    RECO_EMBEDDING_NPROBE: int = int(os.getenv('RECO_EMBEDDING_NPROBE', 8))
+    RECO_EMBEDDING_BATCH_SIZE: int = int(os.getenv('RECO_EMBEDDING_BATCH_SIZE', 64))
+    RECO_EMBEDDING_FLUSH_INTERVAL: float = float(os.getenv('RECO_EMBEDDING_FLUSH_INTERVAL', 1.0))
+    RECO_EMBEDDING_MAX_PENDING: int = int(os.getenv('RECO_EMBEDDING_MAX_PENDING', 10000))
+    
+    # Requests score against a snapshot of the co-view matrix republished at most this often (seconds)
+    RECO_READ_SNAPSHOT_INTERVAL: float = float(os.getenv('RECO_READ_SNAPSHOT_INTERVAL', 1.0))
+    
+    # Where co-view scoring runs: 'inline' (event loop), 'thread' or 'process' pool of RECO_SCORING_WORKERS;
+    # requests whose scoring exceeds RECO_SCORING_TIMEOUT seconds get the popular feed (0 disables)
+    RECO_SCORING_EXECUTOR: str = os.getenv('RECO_SCORING_EXECUTOR', 'inline')
+    RECO_SCORING_WORKERS: int = int(os.getenv('RECO_SCORING_WORKERS', 4))
+    RECO_SCORING_TIMEOUT: float = float(os.getenv('RECO_SCORING_TIMEOUT', 0.5))
+    
+    # Per-user ranked candidate cache
+    RECO_RESULT_CACHE_SIZE: int = int(os.getenv('RECO_RESULT_CACHE_SIZE', 10000))
+    RECO_RESULT_CACHE_TTL: float = float(os.getenv('RECO_RESULT_CACHE_TTL', 60.0))
+    RECO_RESULT_CACHE_DEPTH: int = int(os.getenv('RECO_RESULT_CACHE_DEPTH', 500))
+    
+    # Post details cache and like/comment counters
+    POST_CACHE_SIZE: int = int(os.getenv('POST_CACHE_SIZE', 50000))
+    POST_CACHE_TTL: float = float(os.getenv('POST_CACHE_TTL', 300.0))
+    POST_STATS_MODE: str = os.getenv('POST_STATS_MODE', 'live')  # live | materialized
+    POST_STATS_REFRESH_INTERVAL: float = float(os.getenv('POST_STATS_REFRESH_INTERVAL', 300.0))
+    
+    # Popularity leaderboard used for cold-start and fallback feeds
+    POPULARITY_REFRESH_INTERVAL: float = float(os.getenv('POPULARITY_REFRESH_INTERVAL', 60.0))
+    
+    # In-memory author index used for the author fallback feed
+    AUTHOR_INDEX_REFRESH_INTERVAL: float = float(os.getenv('AUTHOR_INDEX_REFRESH_INTERVAL', 300.0))
+    AUTHOR_INDEX_POSTS_PER_AUTHOR: int = int(os.getenv('AUTHOR_INDEX_POSTS_PER_AUTHOR', 200))
+    AUTHOR_AFFINITY_MAX_AUTHORS: int = int(os.getenv('AUTHOR_AFFINITY_MAX_AUTHORS', 50))
+    AUTHOR_AFFINITY_CACHE_SIZE: int = int(os.getenv('AUTHOR_AFFINITY_CACHE_SIZE', 10000))
+    AUTHOR_AFFINITY_CACHE_TTL: float = float(os.getenv('AUTHOR_AFFINITY_CACHE_TTL', 3600.0))
+    
+    # Warm-load of view history from Postgres
+    WARM_LOAD_CHUNK_SIZE: int = int(os.getenv('WARM_LOAD_CHUNK_SIZE', 5000))
+    
+    # Offline feed precomputation (0 disables the in-process schedule)
+    FEED_PRECOMPUTE_INTERVAL: float = float(os.getenv('FEED_PRECOMPUTE_INTERVAL', 0.0))
+    FEED_PRECOMPUTE_WORKERS: int = int(os.getenv('FEED_PRECOMPUTE_WORKERS', 2))
+    FEED_PRECOMPUTE_DEPTH: int = int(os.getenv('FEED_PRECOMPUTE_DEPTH', 500))
+    FEED_PRECOMPUTE_CHUNK_SIZE: int = int(os.getenv('FEED_PRECOMPUTE_CHUNK_SIZE', 1000))
+    FEED_STORE_MAX_AGE: float = float(os.getenv('FEED_STORE_MAX_AGE', 3600.0))
+    FEED_STORE_CHECK_INTERVAL: float = float(os.getenv('FEED_STORE_CHECK_INTERVAL', 5.0))
+    
+    # Multi-worker shared state: 'off', or 'shared' for one writer and memory-mapped readers
+    SHARED_STATE_MODE: str = os.getenv('SHARED_STATE_MODE', 'off')
+    SHARED_STATE_PUBLISH_INTERVAL: float = float(os.getenv('SHARED_STATE_PUBLISH_INTERVAL', 2.0))
+    SHARED_STATE_CHECK_INTERVAL: float = float(os.getenv('SHARED_STATE_CHECK_INTERVAL', 0.5))
+    
+    # Write-behind persistence of views to Postgres
+    VIEW_WRITE_BATCH_SIZE: int = int(os.getenv('VIEW_WRITE_BATCH_SIZE', 500))
+    VIEW_WRITE_FLUSH_INTERVAL: float = float(os.getenv('VIEW_WRITE_FLUSH_INTERVAL', 1.0))
+    VIEW_WRITE_MAX_PENDING: int = int(os.getenv('VIEW_WRITE_MAX_PENDING', 50000))
+    VIEW_WRITE_ENQUEUE_TIMEOUT: float = float(os.getenv('VIEW_WRITE_ENQUEUE_TIMEOUT', 0.5))
+    
+    # Bulk view ingestion: /track-views requests and the event consumer ('' off, 'file', 'queue' or 'module:factory')
+    BULK_TRACK_MAX_VIEWS: int = int(os.getenv('BULK_TRACK_MAX_VIEWS', 10000))
+    BULK_TRACK_CHUNK_SIZE: int = int(os.getenv('BULK_TRACK_CHUNK_SIZE', 1000))
+    VIEW_CONSUMER_SOURCE: str = os.getenv('VIEW_CONSUMER_SOURCE', '')
+    VIEW_CONSUMER_PATH: str = os.getenv('VIEW_CONSUMER_PATH', './models/view_events.ndjson')
+    VIEW_CONSUMER_BATCH_SIZE: int = int(os.getenv('VIEW_CONSUMER_BATCH_SIZE', 1000))
+    VIEW_CONSUMER_POLL_INTERVAL: float = float(os.getenv('VIEW_CONSUMER_POLL_INTERVAL', 1.0))
+    
+    # Hot-path timing histograms served on /metrics (Prometheus text format)
+    METRICS_ENABLED: bool = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
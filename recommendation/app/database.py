@@ -1,12 +1,27 @@
 """Database connection and session management"""
 import asyncpg
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from contextlib import asynccontextmanager
 from app.config import settings
+from app.utils.metrics import registry
 
 logger = logging.getLogger(__name__)
 
+POOL_WAIT_SECONDS = registry.histogram(
+    'reco_db_pool_wait_seconds',
+    'Time spent waiting for a connection from the pool'
+)
+QUERY_SECONDS = registry.histogram(
+    'reco_db_query_seconds',
+    'Database round-trip time by method, including pool wait',
+    ['method']
+)
+_EXECUTE_QUERY_SECONDS = QUERY_SECONDS.labels('execute_query')
+_EXECUTE_SECONDS = QUERY_SECONDS.labels('execute')
+_EXECUTEMANY_SECONDS = QUERY_SECONDS.labels('executemany')
+_COPY_SECONDS = QUERY_SECONDS.labels('copy_records_to_table')
+
 
 class Database:
     """Async PostgreSQL database connection manager"""
@@ -59,8 +74,12 @@ class Database:
         if self.pool is None:
             await self.connect()
         
-        async with self.pool.acquire() as connection:
+        with POOL_WAIT_SECONDS.time():
+            connection = await self.pool.acquire()
+        try:
             yield connection
+        finally:
+            await self.pool.release(connection)
     
     async def execute_query(
         self,
@@ -69,17 +88,39 @@ class Database:
     ) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results"""
         try:
-            async with self.get_connection() as conn:
-                if params:
-                    rows = await conn.fetch(query, *params)
-                else:
-                    rows = await conn.fetch(query)
-                
-                return [dict(row) for row in rows]
+            with _EXECUTE_QUERY_SECONDS.time():
+                async with self.get_connection() as conn:
+                    if params:
+                        rows = await conn.fetch(query, *params)
+                    else:
+                        rows = await conn.fetch(query)
+                    
+                    return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             raise
     
+    async def stream_query(
+        self,
+        query: str,
+        params: Optional[tuple] = None,
+        chunk_size: int = 5000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream a SELECT query through a server-side cursor in chunks"""
+        try:
+            async with self.get_connection() as conn:
+                # Server-side cursors only live inside a transaction
+                async with conn.transaction():
+                    cursor = await conn.cursor(query, *(params or ()))
+                    while True:
+                        rows = await cursor.fetch(chunk_size)
+                        if not rows:
+                            break
+                        yield [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            raise
+    
     async def execute(
         self,
         query: str,
@@ -87,15 +128,50 @@ class Database:
     ) -> None:
         """Execute a non-SELECT query (INSERT, UPDATE, DELETE)"""
         try:
-            async with self.get_connection() as conn:
-                if params:
-                    await conn.execute(query, *params)
-                else:
-                    await conn.execute(query)
+            with _EXECUTE_SECONDS.time():
+                async with self.get_connection() as conn:
+                    if params:
+                        await conn.execute(query, *params)
+                    else:
+                        await conn.execute(query)
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             raise
 
+    
+    async def executemany(
+        self,
+        query: str,
+        args: List[tuple]
+    ) -> None:
+        """Execute a non-SELECT query once per argument tuple in one round-trip"""
+        try:
+            with _EXECUTEMANY_SECONDS.time():
+                async with self.get_connection() as conn:
+                    await conn.executemany(query, args)
+        except Exception as e:
+            logger.error(f"Error executing batched query: {e}")
+            raise
+    
+    async def copy_records_to_table(
+        self,
+        table_name: str,
+        records: List[tuple],
+        columns: List[str]
+    ) -> None:
+        """Bulk-load records into a table using the COPY protocol"""
+        try:
+            with _COPY_SECONDS.time():
+                async with self.get_connection() as conn:
+                    await conn.copy_records_to_table(
+                        table_name,
+                        records=records,
+                        columns=columns
+                    )
+        except Exception as e:
+            logger.error(f"Error copying records to {table_name}: {e}")
+            raise
+
 
 # Global database instance
 db = Database()
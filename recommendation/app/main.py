@@ -1,12 +1,17 @@
 """FastAPI application entry point"""
+import time
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
 from app.database import db
+from app.schema import bootstrap_schema
 from app.api.v1.routes import router
+from app.api.dependencies import get_recommendation_service
+from app.utils.metrics import registry
 
 # Configure logging
 logging.basicConfig(
@@ -29,13 +34,21 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to connect to database: {e}")
         raise
     
-    # Recommendation service will load interactions on first use
-    logger.info("Recommendation service ready (loads interactions on first use)")
+    # Create recommendation tables and indexes once, not per request
+    try:
+        await bootstrap_schema()
+    except Exception as e:
+        logger.warning(f"Could not bootstrap recommendation schema: {e}")
+    
+    # Start recommendation background workers; the model warms up in the background
+    await get_recommendation_service().start()
+    logger.info("Recommendation service started")
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    await get_recommendation_service().stop()
     await db.close()
 
 
@@ -61,6 +74,32 @@ app.add_middleware(
 # Include routers
 app.include_router(router)
 
+REQUEST_SECONDS = registry.histogram(
+    'reco_http_request_seconds',
+    'HTTP request latency by route template and status code',
+    ['method', 'route', 'status']
+)
+
+if settings.METRICS_ENABLED:
+    # Only installed when enabled, so disabled metrics add nothing per request
+    @app.middleware("http")
+    async def time_requests(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        # The route template keeps label cardinality bounded (no raw user ids)
+        route = request.scope.get('route')
+        REQUEST_SECONDS.labels(
+            request.method,
+            getattr(route, 'path', 'unmatched'),
+            response.status_code
+        ).observe(time.perf_counter() - started)
+        return response
+
+    @app.get("/metrics", tags=["root"], include_in_schema=False)
+    async def metrics():
+        """Hot-path histograms and counters in the Prometheus text format"""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/", tags=["root"])
 async def root():
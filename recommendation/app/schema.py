@@ -0,0 +1,71 @@
+"""One-time schema bootstrap for tables owned by the recommendation service"""
+import logging
+
+from app.config import settings
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key so concurrent workers don't run the bootstrap at the same time
+SCHEMA_LOCK_KEY = 724063747
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS "RecommendationView" (
+      id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+      "userId" text NOT NULL,
+      "postId" text NOT NULL,
+      "postContent" text,
+      "postAuthorId" text,
+      "createdAt" timestamptz NOT NULL DEFAULT now()
+    )
+    """,
+    # Add columns if table already existed without them
+    'ALTER TABLE "RecommendationView" ADD COLUMN IF NOT EXISTS "postContent" text',
+    'ALTER TABLE "RecommendationView" ADD COLUMN IF NOT EXISTS "postAuthorId" text',
+    'ALTER TABLE "RecommendationView" ADD COLUMN IF NOT EXISTS "sessionId" text',
+    'ALTER TABLE "RecommendationView" ADD COLUMN IF NOT EXISTS "durationMs" integer',
+    """
+    CREATE INDEX IF NOT EXISTS "RecommendationView_userId_createdAt_idx"
+    ON "RecommendationView" ("userId", "createdAt")
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS "RecommendationView_postId_idx"
+    ON "RecommendationView" ("postId")
+    """,
+]
+
+# Precomputed like/comment counts, used when POST_STATS_MODE=materialized
+POST_STATS_STATEMENTS = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS "RecommendationPostStats" AS
+    SELECT
+        p.id AS "postId",
+        (SELECT COUNT(*) FROM "Like" l WHERE l."postId" = p.id)::int AS like_count,
+        (SELECT COUNT(*) FROM "Comment" c WHERE c."postId" = p.id)::int AS comment_count
+    FROM "Post" p
+    """,
+    # Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS "RecommendationPostStats_postId_key"
+    ON "RecommendationPostStats" ("postId")
+    """,
+]
+
+
+async def bootstrap_schema() -> None:
+    """Create the tables and indexes this service needs (run once at startup)"""
+    statements = list(SCHEMA_STATEMENTS)
+    if settings.POST_STATS_MODE == 'materialized':
+        statements.extend(POST_STATS_STATEMENTS)
+    async with db.get_connection() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_KEY)
+            for statement in statements:
+                await conn.execute(statement)
+    logger.info("Recommendation schema is up to date")
+
+
+async def refresh_post_stats() -> None:
+    """Recompute the materialized like/comment counts without blocking readers"""
+    await db.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY "RecommendationPostStats"')
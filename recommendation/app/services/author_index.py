@@ -0,0 +1,161 @@
+"""In-memory author affinity and recent-posts index for the author fallback feed"""
+import time
+import heapq
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.database import db
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def _first_before(posts: List[Tuple[datetime, str]], key: Tuple[datetime, str]) -> int:
+    """Index of the first entry of a newest-first list that sorts strictly before key"""
+    lo, hi = 0, len(posts)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if posts[mid] >= key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class AuthorIndex:
+    """Which authors each user reads, and each author's most recent posts.
+
+    ``author_posts`` holds up to ``posts_per_author`` (createdAt, post id)
+    entries per active author, newest first, and is rebuilt by a periodic
+    Post refresh. User -> author affinities are view counts, built lazily
+    from the user's history the first time they are needed and bumped on
+    every tracked view afterwards; only the ``max_authors`` strongest
+    authors per user are kept. Affinity maps live in a bounded TTL cache
+    of recently served users and are dropped on refresh, so they are
+    rebuilt against the current post -> author mapping.
+    """
+
+    def __init__(
+        self,
+        posts_per_author: int = 200,
+        max_authors: int = 50,
+        affinity_cache_size: int = 10000,
+        affinity_cache_ttl: float = 3600.0
+    ):
+        self.posts_per_author = posts_per_author
+        self.max_authors = max_authors
+        self.author_posts: Dict[str, List[Tuple[datetime, str]]] = {}
+        self.post_authors: Dict[str, str] = {}
+        self._indexed: Set[str] = set()
+        self.affinity = TTLCache(maxsize=affinity_cache_size, ttl=affinity_cache_ttl)
+        self.refreshed_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at is not None
+
+    async def refresh(self) -> None:
+        """Reload every active author's most recent posts from Postgres"""
+        rows = await db.execute_query(
+            """
+            SELECT id, "authorId", "createdAt"
+            FROM (
+                SELECT
+                    p.id,
+                    p."authorId",
+                    p."createdAt",
+                    ROW_NUMBER() OVER (
+                        PARTITION BY p."authorId" ORDER BY p."createdAt" DESC, p.id DESC
+                    ) AS rn
+                FROM "Post" p
+                INNER JOIN "User" u ON p."authorId" = u.id
+                WHERE u.status = 'ACTIVE'
+            ) ranked
+            WHERE rn <= $1
+            ORDER BY "authorId", "createdAt" DESC, id DESC
+            """,
+            (self.posts_per_author,)
+        )
+        author_posts: Dict[str, List[Tuple[datetime, str]]] = {}
+        for r in rows:
+            author_posts.setdefault(r['authorId'], []).append((r['createdAt'], r['id']))
+        post_authors = {r['id']: r['authorId'] for r in rows}
+        # Keep authors learned from tracked views for posts outside the index
+        for post_id, author_id in self.post_authors.items():
+            post_authors.setdefault(post_id, author_id)
+        self.author_posts, self.post_authors, self._indexed = (
+            author_posts,
+            post_authors,
+            {r['id'] for r in rows}
+        )
+        self.affinity.clear()
+        self.refreshed_at = time.time()
+        logger.info(f"Author index refreshed with {len(rows)} posts from {len(author_posts)} authors")
+
+    def record_view(self, user_id: str, post_id: str, author_id: Optional[str] = None) -> None:
+        """Bump the user's affinity for the viewed post's author"""
+        if author_id:
+            self.post_authors[post_id] = author_id
+        else:
+            author_id = self.post_authors.get(post_id)
+        affinity = self.affinity.get(user_id)
+        # Users without an affinity map yet get one built from their whole history later
+        if author_id and affinity is not None:
+            affinity[author_id] = affinity.get(author_id, 0) + 1
+            self._prune(affinity)
+
+    def _prune(self, affinity: Dict[str, int]) -> None:
+        if len(affinity) > 2 * self.max_authors:
+            keep = heapq.nlargest(self.max_authors, affinity.items(), key=lambda x: x[1])
+            affinity.clear()
+            affinity.update(keep)
+
+    def authors_for(self, user_id: str, history: Iterable[str]) -> List[str]:
+        """The user's strongest authors, building the affinity map from history if needed"""
+        affinity = self.affinity.get(user_id)
+        if affinity is None:
+            affinity = {}
+            for post_id in history:
+                author_id = self.post_authors.get(post_id)
+                if author_id:
+                    affinity[author_id] = affinity.get(author_id, 0) + 1
+            self._prune(affinity)
+            self.affinity.set(user_id, affinity)
+        return [a for a, _ in heapq.nlargest(self.max_authors, affinity.items(), key=lambda x: x[1])]
+
+    def page(
+        self,
+        authors: List[str],
+        page: int,
+        limit: int,
+        exclude_ids: Optional[Iterable[str]] = None,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[List[Tuple[datetime, str]], int, bool]:
+        """Return ((createdAt, post id) entries, total, has_more) of the authors' posts, newest first.
+
+        Pages by offset, or after a (createdAt, id) key when ``after`` is given.
+        """
+        excluded = set(exclude_ids or ())
+        author_set = set(authors)
+        lists = [self.author_posts[a] for a in authors if a in self.author_posts]
+        total = sum(len(posts) for posts in lists) - sum(
+            1 for post_id in excluded
+            if post_id in self._indexed and self.post_authors.get(post_id) in author_set
+        )
+        skip = (page - 1) * limit
+        if after is not None:
+            # Each list is newest first, so the key splits it into seen and unseen parts
+            lists = [posts[_first_before(posts, after):] for posts in lists]
+            skip = 0
+        entries: List[Tuple[datetime, str]] = []
+        for entry in heapq.merge(*lists, reverse=True):
+            if entry[1] in excluded:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            entries.append(entry)
+            if len(entries) > limit:
+                break
+        return entries[:limit], total, len(entries) > limit
@@ -0,0 +1,253 @@
+"""Content-based candidates: post embeddings in an in-process approximate nearest neighbour index"""
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.coview import IdIndex
+
+try:
+    from fastembed import TextEmbedding
+except ImportError:
+    # Optional: without fastembed only previously saved embeddings are searched
+    TextEmbedding = None
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """Inverted-file (IVF) index over unit-length post vectors.
+
+    Vectors are clustered with spherical k-means into about sqrt(n) lists;
+    a search scans only the ``nprobe`` lists whose centroids are closest to
+    the query, plus vectors added since the last training (the tail),
+    which are scanned exactly. Training works on a copy and is swapped in
+    with one assignment, so it can run in a thread while vectors are added.
+    """
+
+    # Below this many vectors every search is an exact scan
+    MIN_TRAIN_SIZE = 1024
+    # Training points sampled per list
+    SAMPLES_PER_LIST = 64
+    KMEANS_ITERATIONS = 10
+
+    def __init__(self, nprobe: int = 8):
+        self.nprobe = nprobe
+        self.posts = IdIndex()
+        self._vectors: Optional[np.ndarray] = None
+        # (centroids, row order grouped by list, list offsets, rows covered)
+        self._ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self.posts
+
+    @property
+    def untrained(self) -> int:
+        """Vectors in the exactly scanned tail"""
+        return len(self.posts) - (self._ivf[3] if self._ivf is not None else 0)
+
+    def add(self, post_id: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        row = self.posts.intern(post_id)
+        if self._vectors is None:
+            self._vectors = np.empty((1024, vector.shape[0]), dtype=np.float32)
+        elif row >= self._vectors.shape[0]:
+            # Grow into a new array; a training thread keeps reading the old one
+            grown = np.empty((self._vectors.shape[0] * 2, self._vectors.shape[1]), dtype=np.float32)
+            grown[:row] = self._vectors[:row]
+            self._vectors = grown
+        self._vectors[row] = vector / norm
+
+    def vectors(self, post_ids: Sequence[str]) -> np.ndarray:
+        """Stored vectors of the given posts, skipping posts without one"""
+        rows = self.posts.lookup(post_ids)
+        if self._vectors is None or not rows.shape[0]:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._vectors[rows]
+
+    def train(self, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """Cluster the current vectors; pass the result to install()"""
+        n = len(self.posts)
+        data = self._vectors[:n]
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(int(np.sqrt(n)), 4096))
+        sample = data[rng.choice(n, min(n, n_lists * self.SAMPLES_PER_LIST), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            # Empty lists keep their old centroid
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        assign = np.concatenate([
+            np.argmax(data[start:start + 65536] @ centroids.T, axis=1)
+            for start in range(0, n, 65536)
+        ])
+        order = np.argsort(assign, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        return centroids, order, offsets, n
+
+    def install(self, ivf: Tuple[np.ndarray, np.ndarray, np.ndarray, int]) -> None:
+        self._ivf = ivf
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """The ``k`` posts most similar to a unit-length query, best first, with cosine similarities"""
+        n = len(self.posts)
+        if self._vectors is None or n == 0:
+            return [], np.empty(0, dtype=np.float32)
+        if self._ivf is None:
+            rows = np.arange(n)
+        else:
+            centroids, order, offsets, covered = self._ivf
+            nprobe = min(nprobe or self.nprobe, centroids.shape[0])
+            probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+            rows = np.concatenate(
+                [order[offsets[c]:offsets[c + 1]] for c in probe.tolist()]
+                + [np.arange(covered, n)]
+            )
+        sims = self._vectors[rows] @ query
+        if k < rows.shape[0]:
+            top = np.argpartition(-sims, k - 1)[:k]
+            rows, sims = rows[top], sims[top]
+        order = np.argsort(-sims, kind='stable')
+        return self.posts.keys(rows[order].tolist()), sims[order]
+
+    def save(self, path: str) -> None:
+        """Write ids and vectors to one .npz file, replacing it atomically"""
+        n = len(self.posts)
+        tmp_path = path + '.tmp.npz'
+        np.savez(
+            tmp_path,
+            post_ids=np.array(self.posts.ids[:n], dtype=np.str_),
+            vectors=self._vectors[:n] if self._vectors is not None else np.empty((0, 0), dtype=np.float32)
+        )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """Add the vectors saved at path; returns how many were loaded"""
+        with np.load(path) as saved:
+            post_ids, vectors = saved['post_ids'].tolist(), saved['vectors']
+        for post_id, vector in zip(post_ids, vectors):
+            self.add(post_id, vector)
+        return len(post_ids)
+
+
+class ContentIndex:
+    """Embeds the content of viewed posts in the background and finds posts similar to a history.
+
+    Posts are embedded with the same fastembed model as the rag-chatbot.
+    Texts wait in a bounded queue and are embedded in batches in a thread;
+    the IVF index is retrained in a thread once the exactly scanned tail
+    outgrows a quarter of the trained part.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        nprobe: int = 8,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000
+    ):
+        self.path = path
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.index = VectorIndex(nprobe=nprobe)
+        self._embedder = None
+        self._pending: Dict[str, str] = {}
+        self._training = False
+        self.dropped = 0
+
+    @property
+    def available(self) -> bool:
+        return TextEmbedding is not None
+
+    def load(self) -> None:
+        """Load saved embeddings and train the index on them"""
+        if os.path.exists(self.path):
+            count = self.index.load(self.path)
+            if len(self.index) >= VectorIndex.MIN_TRAIN_SIZE:
+                self.index.install(self.index.train())
+            logger.info(f"Loaded {count} post embeddings")
+        if not self.available:
+            logger.warning("fastembed is not installed; new posts will not be embedded")
+
+    def save(self) -> None:
+        if len(self.index):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.index.save(self.path)
+
+    def enqueue(self, post_id: str, content: Optional[str]) -> None:
+        """Queue a viewed post's content for embedding, once per post"""
+        if not content or not self.available or post_id in self.index or post_id in self._pending:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending[post_id] = content
+
+    def _embed(self, texts: List[str]) -> List[np.ndarray]:
+        if self._embedder is None:
+            # Loading downloads the model on first use
+            self._embedder = TextEmbedding(model_name=self.model_name)
+        return list(self._embedder.embed(texts, batch_size=self.batch_size))
+
+    async def flush(self) -> int:
+        """Embed everything queued; returns the number of posts added"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        vectors = await asyncio.to_thread(self._embed, list(pending.values()))
+        for post_id, vector in zip(pending, vectors):
+            self.index.add(post_id, vector)
+        trained = len(self.index) - self.index.untrained
+        if (
+            not self._training
+            and len(self.index) >= VectorIndex.MIN_TRAIN_SIZE
+            and self.index.untrained > max(VectorIndex.MIN_TRAIN_SIZE, trained // 4)
+        ):
+            self._training = True
+            try:
+                self.index.install(await asyncio.to_thread(self.index.train))
+                await asyncio.to_thread(self.save)
+            finally:
+                self._training = False
+        return len(pending)
+
+    async def run(self) -> None:
+        """Embed queued posts every flush_interval seconds"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Could not embed posts: {e}")
+
+    def similar_to(self, post_ids: Sequence[str], k: int) -> Tuple[List[str], np.ndarray]:
+        """Posts closest to the mean embedding of post_ids (e.g. a user's recent views)"""
+        vectors = self.index.vectors(post_ids)
+        if not vectors.shape[0]:
+            return [], np.empty(0, dtype=np.float32)
+        query = vectors.mean(axis=0)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return [], np.empty(0, dtype=np.float32)
+        return self.index.search(query / norm, k)
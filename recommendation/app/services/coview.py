@@ -0,0 +1,641 @@
+"""Sparse co-view matrix backed by NumPy CSR arrays"""
+import time
+from abc import ABC, abstractmethod
+from typing import Container, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+class IdIndex:
+    """Bidirectional mapping between external string ids and dense integer ids"""
+
+    def __init__(self, ids: Optional[Iterable[str]] = None):
+        self._ids: List[str] = list(ids or ())
+        self._index: Dict[str, int] = dict(zip(self._ids, range(len(self._ids))))
+        if len(self._index) != len(self._ids):
+            # Duplicate keys: keep the first occurrence of each
+            keys, self._ids, self._index = self._ids, [], {}
+            for key in keys:
+                self.intern(key)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def intern(self, key: str) -> int:
+        """Return the integer id for key, assigning a new one if needed"""
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self._ids)
+            self._index[key] = idx
+            self._ids.append(key)
+        return idx
+
+    def get(self, key: str) -> Optional[int]:
+        """Return the integer id for key or None if it was never interned"""
+        return self._index.get(key)
+
+    def key(self, idx: int) -> str:
+        """Return the external id for an integer id"""
+        return self._ids[idx]
+
+    def keys(self, idxs: Iterable[int]) -> List[str]:
+        """Return the external ids for a sequence of integer ids"""
+        ids = self._ids
+        return [ids[i] for i in idxs]
+
+    def lookup(self, keys: Iterable[str]) -> np.ndarray:
+        """Return integer ids for known keys, silently skipping unknown ones"""
+        index = self._index
+        return np.fromiter(
+            (index[k] for k in keys if k in index),
+            dtype=np.int64
+        )
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+
+def _gather_positions(
+    starts: np.ndarray,
+    lengths: np.ndarray
+) -> np.ndarray:
+    """Return flat positions covering [start, start + length) for every row"""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    # Offset of each entry within its row, added to that row's start
+    row_offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + (np.arange(total) - row_offsets)
+
+
+def rank_gathered(
+    owners: np.ndarray,
+    cols: np.ndarray,
+    vals: np.ndarray,
+    histories: Sequence[np.ndarray],
+    n_posts: int,
+    depth: int,
+    boosts: Optional[Sequence[Optional[Tuple[np.ndarray, np.ndarray]]]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """CoViewReader.rank_many over already gathered (owner, neighbor, weight) entries.
+
+    ``boosts`` holds one (posts, weights) pair or None per history and
+    adds candidates the way ``boost`` does for a single history in
+    scoring_pool.rank_scores. Needs no matrix, so it can run in a worker
+    process given the output of gather_many.
+    """
+    n = max(n_posts, 1)
+    # Sum contributions per (history, post) pair
+    keys, inverse = np.unique(owners * n + cols, return_inverse=True)
+    scores = np.bincount(inverse, weights=vals, minlength=keys.shape[0])
+    lengths = [h.shape[0] for h in histories]
+    viewed = np.repeat(np.arange(len(histories)), lengths) * n + (
+        np.concatenate(histories) if histories else np.empty(0, dtype=np.int64)
+    )
+    unseen = ~np.isin(keys, viewed)
+    keys, scores = keys[unseen], scores[unseen]
+    boosted = [(i, boost) for i, boost in enumerate(boosts or ()) if boost is not None]
+    if boosted:
+        # Scaled to each history's best co-view score, so neither signal swamps the other
+        best = np.zeros(len(histories))
+        np.maximum.at(best, keys // n, scores)
+        best[best <= 0] = 1.0
+        boost_owners = np.concatenate([np.full(posts.shape[0], i) for i, (posts, _) in boosted])
+        boost_keys = boost_owners * n + np.concatenate([posts for _, (posts, _) in boosted])
+        boost_vals = np.concatenate([weights for _, (_, weights) in boosted]) * best[boost_owners]
+        keys, inverse = np.unique(np.concatenate([keys, boost_keys]), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate([scores, boost_vals]), minlength=keys.shape[0])
+        unseen = ~np.isin(keys, viewed)
+        keys, scores = keys[unseen], scores[unseen]
+    keep = scores > 0
+    keys, scores = keys[keep], scores[keep]
+    owners, posts = keys // n, keys % n
+    totals = np.bincount(owners, minlength=len(histories))
+
+    order = np.lexsort((posts, -scores, owners))
+    owners, posts, scores = owners[order], posts[order], scores[order]
+    group_starts = np.cumsum(totals) - totals
+    top = np.arange(owners.shape[0]) - group_starts[owners] < depth
+    return owners[top], posts[top], scores[top], totals
+
+
+def merge_entries(
+    csr: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    n_posts: int,
+    max_neighbors: Optional[int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR arrays with COO (rows, cols, weights) chunks merged in, duplicates summed.
+
+    Rows come out strongest-first and cut to ``max_neighbors`` if set.
+    """
+    if not chunks:
+        return csr
+    indptr, indices, data = csr
+    n = max(n_posts, 1)
+    stored_rows = np.repeat(np.arange(indptr.shape[0] - 1, dtype=np.int64), np.diff(indptr))
+    chunks = [(stored_rows, indices, data)] + chunks
+    rows = np.concatenate([c[0] for c in chunks])
+    cols = np.concatenate([c[1] for c in chunks])
+    vals = np.concatenate([c[2] for c in chunks])
+
+    keys = rows * n + cols
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    summed = np.bincount(inverse, weights=vals).astype(np.float32)
+    new_rows = unique_keys // n
+    new_cols = unique_keys % n
+
+    # Order each row strongest-first, then cut rows down to max_neighbors
+    order = np.lexsort((new_cols, -summed, new_rows))
+    new_rows, new_cols, summed = new_rows[order], new_cols[order], summed[order]
+    counts = np.bincount(new_rows, minlength=n_posts)
+    if max_neighbors is not None and counts.size and counts.max() > max_neighbors:
+        row_starts = np.cumsum(counts) - counts
+        rank = np.arange(new_rows.shape[0]) - row_starts[new_rows]
+        keep = rank < max_neighbors
+        new_rows, new_cols, summed = new_rows[keep], new_cols[keep], summed[keep]
+        counts = np.minimum(counts, max_neighbors)
+    return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), new_cols.astype(np.int32), summed
+
+
+def splice_rows(
+    indptr: np.ndarray,
+    columns: Sequence[np.ndarray],
+    changed: Dict[int, Sequence[np.ndarray]],
+    n_rows: int
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Row-major arrays with the ``changed`` rows replaced and the table grown to ``n_rows``.
+
+    ``columns`` share the row offsets in ``indptr``; ``changed`` maps a
+    row to its new values, one array per column. Added rows missing from
+    ``changed`` come out empty.
+    """
+    if not changed and indptr.shape[0] - 1 == n_rows:
+        return indptr, list(columns)
+    old_lengths = np.diff(indptr)
+    lengths = np.zeros(n_rows, dtype=np.int64)
+    lengths[:old_lengths.shape[0]] = old_lengths
+    for row, values in changed.items():
+        lengths[row] = values[0].shape[0]
+    new_indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    # Unchanged rows are copied in one gather
+    kept = np.ones(old_lengths.shape[0], dtype=bool)
+    kept[[row for row in changed if row < kept.shape[0]]] = False
+    kept = np.flatnonzero(kept)
+    source = _gather_positions(indptr[kept], old_lengths[kept])
+    target = _gather_positions(new_indptr[kept], old_lengths[kept])
+    spliced = []
+    for i, column in enumerate(columns):
+        new_column = np.empty(int(new_indptr[-1]), dtype=column.dtype)
+        new_column[target] = column[source]
+        for row, values in changed.items():
+            new_column[new_indptr[row]:new_indptr[row + 1]] = values[i]
+        spliced.append(new_column)
+    return new_indptr, spliced
+
+
+class CoViewReader(ABC):
+    """Scoring queries shared by the live co-view matrix and its read snapshots.
+
+    Subclasses provide ``posts``, ``n_posts``, ``top_k`` and the stored
+    arrays plus rows that need merging, which is all ``_gather`` reads.
+    """
+
+    posts: IdIndex
+    top_k: Optional[int]
+
+    @property
+    @abstractmethod
+    def n_posts(self) -> int:
+        """Number of posts with a row"""
+
+    @abstractmethod
+    def _read_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr padded to n_posts rows, indices, data) to read stored rows from"""
+
+    @abstractmethod
+    def _dirty_rows(self) -> Container[int]:
+        """Rows whose top-K list must come from topk() instead of the stored arrays"""
+
+    @abstractmethod
+    def topk(self, post: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbors, weights) of a post's top-K list, strongest first"""
+
+    def _gather(self, history: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (source, neighbor, weight) entries of the top-K lists of history posts"""
+        indptr, indices, data = self._read_arrays()
+        dirty_rows = self._dirty_rows()
+        dirty = np.fromiter(
+            (h in dirty_rows for h in history.tolist()),
+            dtype=bool,
+            count=history.shape[0]
+        )
+        clean = history[~dirty]
+        starts = indptr[clean]
+        lengths = indptr[clean + 1] - starts
+        if self.top_k is not None:
+            lengths = np.minimum(lengths, self.top_k)
+        positions = _gather_positions(starts, lengths)
+        sources = [np.repeat(clean, lengths)]
+        cols = [indices[positions]]
+        vals = [data[positions].astype(np.float64)]
+        for h in history[dirty].tolist():
+            h_cols, h_vals = self.topk(h)
+            sources.append(np.full(h_cols.shape[0], h, dtype=np.int64))
+            cols.append(h_cols)
+            vals.append(h_vals)
+        return np.concatenate(sources), np.concatenate(cols), np.concatenate(vals)
+
+    def gather(self, history: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbor, weight) entries of the history posts' top-K lists, e.g. to score elsewhere"""
+        _, cols, vals = self._gather(history)
+        return cols, vals
+
+    def score(self, history: np.ndarray) -> np.ndarray:
+        """Return dense scores for every post: history vector x top-K neighbor matrix"""
+        n = self.n_posts
+        if n == 0 or history.size == 0:
+            return np.zeros(n, dtype=np.float64)
+        _, cols, vals = self._gather(history)
+        return np.bincount(cols, weights=vals, minlength=n).astype(np.float64)
+
+    def contributions(
+        self,
+        history: np.ndarray,
+        candidates: Sequence[int]
+    ) -> Dict[int, Dict[int, float]]:
+        """Return per-history-post contributions to each candidate's score"""
+        result: Dict[int, Dict[int, float]] = {candidate: {} for candidate in candidates}
+        if history.size == 0 or not result:
+            return result
+        sources, cols, vals = self._gather(history)
+        mask = np.isin(cols, np.fromiter(result.keys(), dtype=np.int64, count=len(result)))
+        for source, col, val in zip(sources[mask].tolist(), cols[mask].tolist(), vals[mask].tolist()):
+            contrib = result[col]
+            contrib[source] = contrib.get(source, 0.0) + val
+        return result
+
+    def gather_many(
+        self,
+        histories: Sequence[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return (history number, source, neighbor, weight) entries for several histories.
+
+        Each distinct history post's top-K list is read once and then
+        expanded for every history that contains it.
+        """
+        lengths = np.fromiter((h.shape[0] for h in histories), dtype=np.int64, count=len(histories))
+        if self.n_posts == 0 or lengths.sum() == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, np.empty(0, dtype=np.float64)
+        history = np.concatenate(histories)
+        owners = np.repeat(np.arange(len(histories)), lengths)
+        sources, cols, vals = self._gather(np.unique(history))
+        order = np.argsort(sources, kind='stable')
+        sources, cols, vals = sources[order], cols[order], vals[order]
+        # Locate each history post's entries in the source-sorted gather
+        starts = np.searchsorted(sources, history, side='left')
+        counts = np.searchsorted(sources, history, side='right') - starts
+        positions = _gather_positions(starts, counts)
+        return np.repeat(owners, counts), sources[positions], cols[positions], vals[positions]
+
+    def rank_many(
+        self,
+        histories: Sequence[np.ndarray],
+        depth: int,
+        gathered: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None,
+        boosts: Optional[Sequence[Optional[Tuple[np.ndarray, np.ndarray]]]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Rank candidates for several histories in one pass.
+
+        Returns (history number, post, score) for the best ``depth``
+        candidates of every history, grouped by history and ordered by score
+        (ties by post id), plus each history's total candidate count. Posts
+        already in a history are never its candidates. ``gathered`` reuses
+        the output of gather_many for the same histories; ``boosts`` are
+        passed on to rank_gathered.
+        """
+        owners, _, cols, vals = gathered if gathered is not None else self.gather_many(histories)
+        return rank_gathered(owners, cols, vals, histories, self.n_posts, depth, boosts)
+
+
+class CoViewMatrix(CoViewReader):
+    """Post x post co-view weights, symmetric unless built by the idf similarity job.
+
+    Weights live in a compact CSR structure (int32 indices, float32 data)
+    whose rows are stored strongest-first, so the first ``top_k`` entries of
+    a row are that post's top-K neighbor list. Incremental co-views go into
+    small per-row delta dicts; a touched row's top-K list is re-derived from
+    its CSR slice plus delta the next time it is read. Deltas are merged
+    into the CSR arrays once they grow past a fraction of the stored
+    entries, so updates are O(1) amortised and reads never walk the whole
+    matrix. When ``max_neighbors`` is set, compaction keeps only each post's
+    strongest neighbors.
+    """
+
+    MIN_COMPACT_THRESHOLD = 65536
+    MAX_COMPACT_THRESHOLD = 1000000
+
+    def __init__(self, max_neighbors: Optional[int] = None, top_k: Optional[int] = None):
+        self.posts = IdIndex()
+        self.max_neighbors = max_neighbors
+        self.top_k = top_k
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.empty(0, dtype=np.int32)
+        self._data = np.empty(0, dtype=np.float32)
+        # row -> {col: weight} added since the last compaction
+        self._deltas: Dict[int, Dict[int, float]] = {}
+        self._delta_count = 0
+        # Bulk COO chunks from add_many, merged before the next read
+        self._bulk: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        # row -> merged top-K (cols, weights) for rows that have deltas
+        self._topk_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        # Rows given deltas since the last snapshot()
+        self._touched: Set[int] = set()
+
+    @property
+    def n_posts(self) -> int:
+        return len(self.posts)
+
+    @property
+    def nnz(self) -> int:
+        return (
+            int(self._indices.shape[0])
+            + self._delta_count
+            + sum(chunk[0].shape[0] for chunk in self._bulk)
+        )
+
+    def _add_delta(self, row: int, col: int, weight: float) -> None:
+        delta = self._deltas.get(row)
+        if delta is None:
+            delta = self._deltas[row] = {}
+        if col not in delta:
+            self._delta_count += 1
+        delta[col] = delta.get(col, 0.0) + weight
+        self._topk_cache.pop(row, None)
+        self._touched.add(row)
+
+    def add(self, post_a: str, post_b: str, weight: float) -> None:
+        """Add weight to the co-view between two posts (both directions)"""
+        if post_a == post_b:
+            return
+        a = self.posts.intern(post_a)
+        b = self.posts.intern(post_b)
+        self._add_delta(a, b, weight)
+        self._add_delta(b, a, weight)
+        self._maybe_compact()
+
+    def add_neighbors(
+        self,
+        post: int,
+        others: List[int],
+        weights: List[float],
+        reverse_weights: Optional[List[float]] = None
+    ) -> None:
+        """Add co-view weights between one interned post and several others.
+
+        Weights are symmetric unless ``reverse_weights`` gives the other
+        posts' side separately.
+        """
+        for other, weight, reverse in zip(others, weights, reverse_weights or weights):
+            if other != post:
+                self._add_delta(post, other, weight)
+                self._add_delta(other, post, reverse)
+        self._maybe_compact()
+
+    def add_many(self, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray) -> None:
+        """Add symmetric co-view weights for interned post id pairs in bulk"""
+        keep = rows != cols
+        rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        if rows.size == 0:
+            return
+        self._bulk.append((
+            np.concatenate([rows, cols]).astype(np.int64),
+            np.concatenate([cols, rows]).astype(np.int32),
+            np.concatenate([weights, weights]).astype(np.float32)
+        ))
+        if sum(chunk[0].shape[0] for chunk in self._bulk) >= max(
+            self.MIN_COMPACT_THRESHOLD, self._indices.shape[0] // 4
+        ):
+            self.compact()
+
+    def _maybe_compact(self) -> None:
+        threshold = min(
+            max(self.MIN_COMPACT_THRESHOLD, self._indices.shape[0] // 4),
+            self.MAX_COMPACT_THRESHOLD
+        )
+        if self._delta_count >= threshold:
+            self.compact()
+
+    def _delta_coo(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.fromiter(
+            (row for row, delta in self._deltas.items() for _ in range(len(delta))),
+            dtype=np.int64,
+            count=self._delta_count
+        )
+        cols = np.fromiter(
+            (col for delta in self._deltas.values() for col in delta),
+            dtype=np.int32,
+            count=self._delta_count
+        )
+        vals = np.fromiter(
+            (val for delta in self._deltas.values() for val in delta.values()),
+            dtype=np.float32,
+            count=self._delta_count
+        )
+        return rows, cols, vals
+
+    def pending_entries(self) -> Tuple[
+        Tuple[np.ndarray, np.ndarray, np.ndarray],
+        List[Tuple[np.ndarray, np.ndarray, np.ndarray]]
+    ]:
+        """Stored CSR arrays and the uncompacted entries as COO chunks.
+
+        Nothing returned is written to afterwards, so merge_entries() can
+        compact the copy in another thread while the matrix takes updates.
+        """
+        chunks = ([self._delta_coo()] if self._deltas else []) + list(self._bulk)
+        return (self._indptr, self._indices, self._data), chunks
+
+    def compact(self) -> None:
+        """Merge deltas and bulk entries into the CSR arrays, summing duplicates"""
+        if not self._deltas and not self._bulk:
+            return
+        csr, chunks = self.pending_entries()
+        self._indptr, self._indices, self._data = merge_entries(
+            csr, chunks, self.n_posts, self.max_neighbors
+        )
+        self._deltas = {}
+        self._delta_count = 0
+        self._bulk = []
+        self._topk_cache = {}
+
+    def _csr_for(self, n: int) -> np.ndarray:
+        """Return indptr padded to n rows (posts interned since last compaction)"""
+        indptr = self._indptr
+        if indptr.shape[0] - 1 < n:
+            indptr = np.concatenate([
+                indptr,
+                np.full(n - (indptr.shape[0] - 1), indptr[-1], dtype=np.int64)
+            ])
+        return indptr
+
+    def row(self, post: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return all (neighbor ids, weights) of one interned post, deltas merged in"""
+        if self._bulk:
+            self.compact()
+        indptr = self._csr_for(self.n_posts)
+        start, end = indptr[post], indptr[post + 1]
+        cols = self._indices[start:end]
+        vals = self._data[start:end].astype(np.float64)
+        delta = self._deltas.get(post)
+        if delta:
+            merged = dict(zip(cols.tolist(), vals.tolist()))
+            for col, val in delta.items():
+                merged[col] = merged.get(col, 0.0) + val
+            cols = np.fromiter(merged.keys(), dtype=np.int32, count=len(merged))
+            vals = np.fromiter(merged.values(), dtype=np.float64, count=len(merged))
+        return cols, vals
+
+    def topk(self, post: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the post's strongest top_k neighbors (all neighbors if top_k is unset)"""
+        cached = self._topk_cache.get(post)
+        if cached is not None:
+            return cached
+        cols, vals = self.row(post)
+        if self._deltas.get(post):
+            k = self.top_k or cols.shape[0]
+            if cols.shape[0] > k:
+                # Ties at the cut-off go to the lower column, as in compacted rows
+                keep = np.lexsort((cols, -vals))[:k]
+                cols, vals = cols[keep], vals[keep]
+            self._topk_cache[post] = (cols, vals)
+        elif self.top_k is not None:
+            # Stored rows are already strongest-first
+            cols, vals = cols[:self.top_k], vals[:self.top_k]
+        return cols, vals
+
+    def _read_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._bulk:
+            self.compact()
+        return self._csr_for(self.n_posts), self._indices, self._data
+
+    def _dirty_rows(self) -> Container[int]:
+        return self._deltas
+
+    def snapshot(self, previous: Optional['CoViewSnapshot'] = None) -> 'CoViewSnapshot':
+        """Freeze the current state for readers.
+
+        The CSR arrays are shared, since compaction replaces them instead of
+        writing into them. Rows with deltas get their merged top-K list
+        frozen; when ``previous`` was taken from the same arrays only rows
+        touched since then are re-merged.
+        """
+        indptr, indices, data = self._read_arrays()
+        if (
+            previous is not None
+            and previous.posts is self.posts
+            and previous._indices is indices
+        ):
+            overrides = dict(previous._overrides)
+            touched = self._touched
+        else:
+            overrides = {}
+            touched = list(self._deltas)
+        for row in touched:
+            if row in self._deltas:
+                overrides[row] = self.topk(row)
+        self._touched = set()
+        return CoViewSnapshot(self.posts, self.n_posts, indptr, indices, data, self.top_k, overrides)
+
+    def csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Compacted (indptr, indices, data) arrays; rows may be fewer than n_posts"""
+        self.compact()
+        return self._indptr, self._indices, self._data
+
+    def state(self) -> Dict[str, object]:
+        """Compacted CSR arrays and post ids, e.g. to rebuild the matrix in another process"""
+        indptr, indices, data = self.csr()
+        return {
+            'post_ids': list(self.posts.ids),
+            'indptr': indptr,
+            'indices': indices,
+            'data': data,
+            'max_neighbors': self.max_neighbors,
+            'top_k': self.top_k,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, object], posts: Optional[IdIndex] = None) -> 'CoViewMatrix':
+        """Rebuild a matrix from the output of state(), optionally sharing an existing id index"""
+        matrix = cls(max_neighbors=state['max_neighbors'], top_k=state['top_k'])
+        matrix.posts = posts if posts is not None else IdIndex(state['post_ids'])
+        matrix._indptr = state['indptr']
+        matrix._indices = state['indices']
+        matrix._data = state['data']
+        return matrix
+
+    def neighbors(self, post_id: str) -> Dict[str, float]:
+        """Return the co-view weights of a post keyed by external post id"""
+        idx = self.posts.get(post_id)
+        if idx is None:
+            return {}
+        cols, vals = self.row(idx)
+        return {self.posts.key(col): val for col, val in zip(cols.tolist(), vals.tolist())}
+
+
+class CoViewSnapshot(CoViewReader):
+    """Immutable read view of a CoViewMatrix as of one snapshot() call.
+
+    Nothing in it changes after construction, so requests can keep using
+    it across awaits, or from another thread, while the matrix goes on
+    taking updates. Posts interned after the snapshot are beyond
+    ``n_posts`` and are dropped from histories by ``history``.
+    """
+
+    def __init__(
+        self,
+        posts: IdIndex,
+        n_posts: int,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        top_k: Optional[int],
+        overrides: Dict[int, Tuple[np.ndarray, np.ndarray]]
+    ):
+        self.posts = posts
+        self._n_posts = n_posts
+        self._indptr = indptr
+        self._indices = indices
+        self._data = data
+        self.top_k = top_k
+        self._overrides = overrides
+        self.published_at = time.monotonic()
+
+    @property
+    def n_posts(self) -> int:
+        return self._n_posts
+
+    def history(self, post_ids: Iterable[str]) -> np.ndarray:
+        """Integer ids of the viewed posts this snapshot knows about"""
+        idx = self.posts.lookup(post_ids)
+        return idx[idx < self._n_posts]
+
+    def _read_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self._indptr, self._indices, self._data
+
+    def _dirty_rows(self) -> Container[int]:
+        return self._overrides
+
+    def topk(self, post: int) -> Tuple[np.ndarray, np.ndarray]:
+        override = self._overrides.get(post)
+        if override is not None:
+            return override
+        start, end = self._indptr[post], self._indptr[post + 1]
+        if self.top_k is not None:
+            end = min(end, start + self.top_k)
+        return self._indices[start:end], self._data[start:end].astype(np.float64)
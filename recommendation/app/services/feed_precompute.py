@@ -0,0 +1,137 @@
+"""Offline feed precomputation: rank every user's candidates in worker processes.
+
+Run once from the recommendation directory with::
+
+    python -m app.services.feed_precompute [--workers N] [--depth D]
+
+or periodically in the API process by setting FEED_PRECOMPUTE_INTERVAL.
+"""
+import time
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.coview import CoViewMatrix
+from app.services.feed_store import FeedStore
+
+logger = logging.getLogger(__name__)
+
+# Co-view matrix rebuilt once per worker process by _init_worker
+_worker_coview: Optional[CoViewMatrix] = None
+
+
+def _init_worker(state: Dict[str, object]) -> None:
+    global _worker_coview
+    _worker_coview = CoViewMatrix.from_state(state)
+
+
+def _rank_chunk(
+    histories: List[np.ndarray],
+    depth: int,
+    boosts: Optional[List[Optional[Tuple[np.ndarray, np.ndarray]]]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Rank one chunk of users in a worker"""
+    return _worker_coview.rank_many(histories, depth, boosts=boosts)
+
+
+def compute_feeds(
+    state: Dict[str, object],
+    user_ids: List[str],
+    histories: List[np.ndarray],
+    store: FeedStore,
+    depth: int,
+    workers: int = 2,
+    chunk_size: int = 1000,
+    generated_at: Optional[float] = None,
+    boosts: Optional[List[Optional[Tuple[np.ndarray, np.ndarray]]]] = None
+) -> int:
+    """Rank the given users against a co-view state and publish the result to store.
+
+    ``boosts`` are per-user content candidates, blended in as online
+    scoring does. Returns the number of users with at least one candidate.
+    """
+    generated_at = generated_at if generated_at is not None else time.time()
+    chunks = [
+        (start, histories[start:start + chunk_size])
+        for start in range(0, len(histories), chunk_size)
+    ]
+    chunk_boosts = [
+        boosts[start:start + chunk_size] if boosts is not None else None
+        for start, _ in chunks
+    ]
+    if workers > 1 and len(chunks) > 1:
+        # Spawned workers don't inherit the parent's event loop or DB connections
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(state,)
+        ) as pool:
+            ranked = list(pool.map(
+                _rank_chunk, [c for _, c in chunks], [depth] * len(chunks), chunk_boosts
+            ))
+    else:
+        _init_worker(state)
+        ranked = [_rank_chunk(c, depth, b) for (_, c), b in zip(chunks, chunk_boosts)]
+
+    owners = [owner + start for (start, _), (owner, _, _, _) in zip(chunks, ranked)]
+    owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+    items = np.concatenate([r[1] for r in ranked]) if ranked else np.empty(0, dtype=np.int64)
+    scores = np.concatenate([r[2] for r in ranked]) if ranked else np.empty(0, dtype=np.float64)
+    totals = np.concatenate([r[3] for r in ranked]) if ranked else np.empty(0, dtype=np.int64)
+
+    # Keep only users with candidates, and only the posts they reference
+    has_feed = np.flatnonzero(totals > 0)
+    row_of_user = np.full(len(user_ids), -1, dtype=np.int64)
+    row_of_user[has_feed] = np.arange(has_feed.shape[0])
+    owners = row_of_user[owners]
+    counts = np.bincount(owners, minlength=has_feed.shape[0])
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    used_posts, items = np.unique(items, return_inverse=True)
+    post_ids = state['post_ids']
+
+    store.write(
+        user_ids=[user_ids[i] for i in has_feed.tolist()],
+        post_ids=[post_ids[i] for i in used_posts.tolist()],
+        indptr=indptr,
+        items=items,
+        scores=scores,
+        totals=totals[has_feed],
+        generated_at=generated_at,
+        depth=depth
+    )
+    return int(has_feed.shape[0])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute recommendation feeds for all known users")
+    parser.add_argument('--workers', type=int, default=settings.FEED_PRECOMPUTE_WORKERS)
+    parser.add_argument('--depth', type=int, default=settings.FEED_PRECOMPUTE_DEPTH)
+    parser.add_argument('--chunk-size', type=int, default=settings.FEED_PRECOMPUTE_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL, logging.INFO))
+
+    # Imported here to avoid a cycle: the service schedules this module's job
+    from app.services.recommendation_service import RecommendationService
+
+    # Interactions come from the local snapshot and log written by the API
+    service = RecommendationService()
+    service.load_interactions()
+    if service.content_index is not None:
+        service.content_index.load()
+    count = asyncio.run(service.precompute_feeds(
+        workers=args.workers,
+        depth=args.depth,
+        chunk_size=args.chunk_size
+    ))
+    print(f"Precomputed feeds for {count} users")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Precomputed per-user feeds stored as memory-mapped NumPy arrays"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PrecomputedFeeds:
+    """One generation of precomputed feeds, read through memory maps.
+
+    Users' ranked posts are stored CSR-style: row ``r`` of ``items`` /
+    ``scores`` spans ``indptr[r]:indptr[r + 1]`` and indexes into
+    ``post_ids``. Only the user -> row dict and the post id list live on
+    the Python heap.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, 'users.json'), 'r') as f:
+            users = json.load(f)
+        with open(os.path.join(directory, 'posts.json'), 'r') as f:
+            self.post_ids: List[str] = json.load(f)
+        self.generated_at: float = meta['generated_at']
+        self.depth: int = meta['depth']
+        self._rows: Dict[str, int] = {user_id: i for i, user_id in enumerate(users)}
+        self._indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode='r')
+        self._items = np.load(os.path.join(directory, 'items.npy'), mmap_mode='r')
+        self._scores = np.load(os.path.join(directory, 'scores.npy'), mmap_mode='r')
+        self._totals = np.load(os.path.join(directory, 'totals.npy'), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, user_id: str) -> Optional[Tuple[List[str], np.ndarray, int]]:
+        """Return (post ids, scores, total candidates) for a user, or None"""
+        row = self._rows.get(user_id)
+        if row is None:
+            return None
+        start, end = int(self._indptr[row]), int(self._indptr[row + 1])
+        post_ids = self.post_ids
+        return (
+            [post_ids[i] for i in self._items[start:end].tolist()],
+            np.array(self._scores[start:end]),
+            int(self._totals[row])
+        )
+
+
+class FeedStore:
+    """Directory of precomputed feed generations with an atomically swapped pointer.
+
+    Each run writes a new generation directory, then replaces ``CURRENT``
+    with its name, so readers always see a complete generation. The
+    previous generation is kept until the next publish so in-flight readers
+    that still map it are unaffected.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pointer_file = os.path.join(directory, 'CURRENT')
+
+    def write(
+        self,
+        user_ids: List[str],
+        post_ids: List[str],
+        indptr: np.ndarray,
+        items: np.ndarray,
+        scores: np.ndarray,
+        totals: np.ndarray,
+        generated_at: float,
+        depth: int
+    ) -> str:
+        """Write and publish a new generation; returns its name"""
+        os.makedirs(self.directory, exist_ok=True)
+        generation = f"feeds-{int(generated_at * 1000)}"
+        tmp_dir = os.path.join(self.directory, generation + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'indptr.npy'), np.asarray(indptr, dtype=np.int64))
+        np.save(os.path.join(tmp_dir, 'items.npy'), np.asarray(items, dtype=np.int32))
+        np.save(os.path.join(tmp_dir, 'scores.npy'), np.asarray(scores, dtype=np.float64))
+        np.save(os.path.join(tmp_dir, 'totals.npy'), np.asarray(totals, dtype=np.int64))
+        for name, payload in (
+            ('users.json', user_ids),
+            ('posts.json', post_ids),
+            ('meta.json', {'generated_at': generated_at, 'depth': depth, 'users': len(user_ids)})
+        ):
+            with open(os.path.join(tmp_dir, name), 'w') as f:
+                json.dump(payload, f)
+        final_dir = os.path.join(self.directory, generation)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+
+        previous = self.current()
+        tmp_pointer = self.pointer_file + '.tmp'
+        with open(tmp_pointer, 'w') as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_pointer, self.pointer_file)
+
+        # Keep only the new generation and the one it replaced
+        for name in os.listdir(self.directory):
+            if name.startswith('feeds-') and name not in (generation, previous):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        logger.info(f"Published precomputed feeds {generation} for {len(user_ids)} users")
+        return generation
+
+    def current(self) -> Optional[str]:
+        """Name of the published generation, if any"""
+        try:
+            with open(self.pointer_file, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> Optional[PrecomputedFeeds]:
+        """Open the published generation"""
+        generation = self.current()
+        if generation is None:
+            return None
+        return PrecomputedFeeds(os.path.join(self.directory, generation))
+
+
+class FeedReader:
+    """Keeps the latest published generation open, re-checking the pointer at most every interval.
+
+    Opening a generation reads its JSON files, so run() refreshes in a
+    thread in the background and requests only read ``feeds``.
+    """
+
+    def __init__(self, store: FeedStore, check_interval: float = 5.0):
+        self.store = store
+        self.check_interval = check_interval
+        self.feeds: Optional[PrecomputedFeeds] = None
+        self._generation: Optional[str] = None
+        self._checked_at = 0.0
+
+    def refresh(self, force: bool = False) -> Optional[PrecomputedFeeds]:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return self.feeds
+        self._checked_at = now
+        try:
+            generation = self.store.current()
+            if generation != self._generation:
+                self.feeds = self.store.load()
+                self._generation = generation
+        except Exception as e:
+            logger.warning(f"Could not open precomputed feeds: {e}")
+        return self.feeds
+
+    async def run(self) -> None:
+        """Pick up newly published generations every check_interval seconds"""
+        while True:
+            await asyncio.to_thread(self.refresh, True)
+            await asyncio.sleep(self.check_interval)
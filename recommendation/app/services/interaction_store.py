@@ -0,0 +1,256 @@
+"""Append-only interaction log with periodic compacted snapshots"""
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# (session_id, duration_ms) of a view
+ViewContext = Tuple[Optional[str], Optional[int]]
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionStore:
+    """Persist user-post interactions as a JSONL log between model snapshots.
+
+    Every view is appended to ``interactions.log`` as one line. The log is
+    flushed and fsync'ed in batches by a background thread, so the event
+    loop only writes to the file buffer, and periodically folded into the
+    binary model snapshot (see ``ModelSnapshotStore``) so replay at
+    startup stays short. Snapshots rotate the log first, so views recorded
+    while a snapshot is being written are never lost; the rotated log is
+    only dropped once the snapshot covering it is published. The
+    ``createdAt`` high-water mark of rows already warm-loaded from
+    Postgres travels with the snapshot, so restarts only need to read
+    newer rows. ``interactions.json`` snapshots written by earlier
+    versions are still loaded. Views that came with a session id or dwell
+    time keep them in ``contexts``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+        snapshot_every: int = 10000
+    ):
+        self.snapshot_file = os.path.join(directory, 'interactions.json')
+        self.log_file = os.path.join(directory, 'interactions.log')
+        self.legacy_rotated_log_file = self.log_file + '.old'
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self._log: Optional[BinaryIO] = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        # Background fsync started by schedule_sync(); _io_lock keeps it off files being closed
+        self._sync_task: Optional[asyncio.Task] = None
+        self._io_lock = threading.Lock()
+        self.records_since_snapshot = 0
+        self.watermark: Optional[datetime] = None
+        # user -> {post: (session_id, duration_ms)}, filled by load()
+        self.contexts: Dict[str, Dict[str, ViewContext]] = {}
+
+    def load(self) -> Dict[str, Dict[str, float]]:
+        """Load the snapshot and replay logged views; returns user -> {post: viewed_at}"""
+        interactions: Dict[str, Dict[str, float]] = {}
+        contexts: Dict[str, Dict[str, ViewContext]] = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            if data.get('watermark'):
+                self.watermark = datetime.fromisoformat(data['watermark'])
+            # Snapshots written before view times were stored fall back to the file time
+            default_time = os.path.getmtime(self.snapshot_file)
+            view_times = data.get('view_times', {})
+            for uid, posts in data.get('interactions', {}).items():
+                times = view_times.get(uid) or [default_time] * len(posts)
+                interactions[uid] = dict(zip(posts, times))
+            for uid, posts in data.get('view_context', {}).items():
+                contexts[uid] = {pid: tuple(ctx) for pid, ctx in posts.items()}
+        replayed = 0
+        for record in self.replay():
+            uid, pid = record['u'], record['p']
+            history = interactions.setdefault(uid, {})
+            if pid not in history:
+                history[pid] = record.get('t') or time.time()
+                if 's' in record or 'd' in record:
+                    contexts.setdefault(uid, {})[pid] = (record.get('s'), record.get('d'))
+            replayed += 1
+        self.contexts = contexts
+        self.records_since_snapshot = replayed
+        if replayed:
+            logger.info(f"Replayed {replayed} logged interactions")
+        return interactions
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield the views logged since the last snapshot, oldest first"""
+        for path in self.rotated_logs() + [self.log_file]:
+            for record in self._read_log(path):
+                if record.get('u') and record.get('p'):
+                    yield record
+
+    def rotated_logs(self) -> List[str]:
+        """Logs rotated out for snapshots that were not published, oldest first"""
+        directory = os.path.dirname(self.log_file)
+        prefix = os.path.basename(self.log_file) + '.'
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        segments = sorted(
+            (int(name[len(prefix):]), name) for name in names
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        )
+        logs = [os.path.join(directory, name) for _, name in segments]
+        # Left by versions that kept a single rotated log
+        if os.path.exists(self.legacy_rotated_log_file):
+            logs.insert(0, self.legacy_rotated_log_file)
+        return logs
+
+    def _read_log(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash can leave a partially written last line
+                    logger.warning(f"Skipping corrupt line in {path}")
+
+    def _open_log(self) -> BinaryIO:
+        if self._log is None:
+            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+            # Binary buffered files are safe to flush from a thread while the loop appends
+            self._log = open(self.log_file, 'ab')
+        return self._log
+
+    def append(
+        self,
+        user_id: str,
+        post_id: str,
+        timestamp: Optional[float] = None,
+        session_id: Optional[str] = None,
+        duration_ms: Optional[int] = None,
+        sync: bool = True
+    ) -> None:
+        """Append one view to the log, fsync'ing in batches (or not at all with sync=False)"""
+        record = {'u': user_id, 'p': post_id, 't': timestamp if timestamp is not None else time.time()}
+        if session_id is not None:
+            record['s'] = session_id
+        if duration_ms is not None:
+            record['d'] = duration_ms
+        log = self._open_log()
+        log.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+        self._unsynced += 1
+        self.records_since_snapshot += 1
+        if sync and self._sync_due():
+            self.schedule_sync()
+
+    def _sync_due(self) -> bool:
+        return (
+            self._unsynced >= self.fsync_every
+            or (self._unsynced > 0 and time.monotonic() - self._last_sync >= self.fsync_interval)
+        )
+
+    def _fsync(self, log: BinaryIO, close: bool = False) -> None:
+        """Flush and fsync a log file, optionally closing it; safe to call from a thread"""
+        with self._io_lock:
+            if log.closed:
+                return
+            log.flush()
+            os.fsync(log.fileno())
+            if close:
+                log.close()
+
+    def schedule_sync(self) -> None:
+        """Fsync the lines appended so far in a background thread, unless one is already running.
+
+        Called from the event loop; lines appended while an fsync is in
+        flight are picked up by the next one once a batch is due again.
+        """
+        if self._log is None or self._unsynced == 0:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to keep responsive, e.g. in scripts
+            self.sync()
+            return
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = loop.create_task(self._sync_in_background())
+
+    async def _sync_in_background(self) -> None:
+        try:
+            while self._log is not None and self._unsynced:
+                log = self._log
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+                await asyncio.to_thread(self._fsync, log)
+                if not self._sync_due():
+                    break
+        except Exception as e:
+            logger.error(f"Could not fsync interaction log: {e}")
+
+    def sync(self) -> None:
+        """Flush buffered log lines and fsync them to disk, blocking until done"""
+        if self._log is None or self._unsynced == 0:
+            return
+        self._fsync(self._log)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def should_snapshot(self) -> bool:
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def rotate(self) -> Tuple[Optional[BinaryIO], List[str]]:
+        """Start a fresh log without waiting for the disk.
+
+        The current log is renamed to the next numbered segment and kept
+        until a snapshot covering it is published. Returns its still-open
+        file, which finish_rotation() fsyncs and closes off the event
+        loop, and every rotated log the snapshot being prepared covers;
+        logs of earlier snapshots that failed are kept alongside.
+        """
+        log, self._log = self._log, None
+        self._unsynced = 0
+        self.records_since_snapshot = 0
+        rotated = self.rotated_logs()
+        if os.path.exists(self.log_file):
+            last = rotated[-1].rsplit('.', 1)[-1] if rotated else ''
+            path = f"{self.log_file}.{int(last) + 1 if last.isdigit() else 1}"
+            os.replace(self.log_file, path)
+            rotated.append(path)
+        return log, rotated
+
+    def finish_rotation(self, log: Optional[BinaryIO]) -> None:
+        """Fsync and close the file rotate() returned (runs in a thread)"""
+        if log is not None:
+            self._fsync(log, close=True)
+
+    def drop_compacted(self, rotated: List[str]) -> None:
+        """Drop rotated logs, and any JSON snapshot, once a model snapshot covers them"""
+        for path in rotated + [self.snapshot_file]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def aclose(self) -> None:
+        """Wait for a background fsync, then fsync and close the log off the event loop"""
+        if self._sync_task is not None:
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+            self._sync_task = None
+        log, self._log = self._log, None
+        self._unsynced = 0
+        if log is not None:
+            await asyncio.to_thread(self._fsync, log, True)
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._fsync(self._log, close=True)
+            self._log = None
+        self._unsynced = 0
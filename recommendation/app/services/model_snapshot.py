@@ -0,0 +1,531 @@
+"""Versioned binary snapshot of the recommendation model for fast startup"""
+import os
+import json
+import time
+import shutil
+import logging
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services.coview import CoViewMatrix, IdIndex, merge_entries, splice_rows
+from app.services.interaction_store import ViewContext
+from app.services.similarity import PairNormalizer
+
+logger = logging.getLogger(__name__)
+
+MODEL_SNAPSHOT_VERSION = 1
+
+# Stored in place of a missing session code or dwell time
+_MISSING = -1
+
+
+def _save_ids(directory: str, name: str, ids: List[str]) -> None:
+    """Store ids as fixed-width UTF-8 bytes in id order, plus a sorted copy for lookups"""
+    encoded = np.array([key.encode('utf-8') for key in ids], dtype=np.bytes_)
+    order = np.argsort(encoded, kind='stable').astype(np.int32)
+    np.save(os.path.join(directory, f"{name}.npy"), encoded)
+    np.save(os.path.join(directory, f"{name}_sorted.npy"), encoded[order])
+    np.save(os.path.join(directory, f"{name}_order.npy"), order)
+
+
+def splice_histories(
+    histories: Tuple[np.ndarray, ...],
+    changed: Dict[int, Tuple[np.ndarray, ...]],
+    n_users: int
+) -> Tuple[np.ndarray, ...]:
+    """(user_indptr, posts, times, sessions, durations) with the changed users' rows replaced"""
+    user_indptr, columns = splice_rows(histories[0], histories[1:], changed, n_users)
+    return (user_indptr, *columns)
+
+
+class MappedIdIndex(IdIndex):
+    """IdIndex whose snapshot ids stay in memory-mapped arrays.
+
+    Ids from the snapshot are found by binary search over a sorted copy,
+    so opening the snapshot doesn't hash every id into a dict. Ids
+    interned afterwards get the following integer ids and live in the
+    regular dict.
+    """
+
+    def __init__(self, ids: np.ndarray, sorted_ids: np.ndarray, order: np.ndarray):
+        super().__init__()
+        self._base = ids
+        self._sorted = sorted_ids
+        self._order = order
+        self._n_base = int(ids.shape[0])
+        self._decoded: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return self._n_base + len(self._ids)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def _base_positions(self, keys: List[str]) -> np.ndarray:
+        """Snapshot integer id of each key, or -1"""
+        found = np.full(len(keys), -1, dtype=np.int64)
+        if self._n_base and keys:
+            encoded = np.array([key.encode('utf-8') for key in keys], dtype=np.bytes_)
+            pos = np.minimum(np.searchsorted(self._sorted, encoded), self._n_base - 1)
+            hit = self._sorted[pos] == encoded
+            found[hit] = self._order[pos[hit]]
+        return found
+
+    def get(self, key: str) -> Optional[int]:
+        idx = self._index.get(key)
+        if idx is None:
+            idx = int(self._base_positions([key])[0])
+            if idx < 0:
+                return None
+        return idx
+
+    def intern(self, key: str) -> int:
+        idx = self.get(key)
+        if idx is None:
+            idx = self._n_base + len(self._ids)
+            self._index[key] = idx
+            self._ids.append(key)
+        return idx
+
+    def key(self, idx: int) -> str:
+        if idx < self._n_base:
+            return self._base[idx].decode('utf-8')
+        return self._ids[idx - self._n_base]
+
+    def keys(self, idxs: Iterable[int]) -> List[str]:
+        return [self.key(idx) for idx in idxs]
+
+    def lookup(self, keys: Iterable[str]) -> np.ndarray:
+        keys = list(keys)
+        found = self._base_positions(keys)
+        if self._ids:
+            for i in np.flatnonzero(found < 0).tolist():
+                found[i] = self._index.get(keys[i], -1)
+        return found[found >= 0]
+
+    @property
+    def ids(self) -> List[str]:
+        # Decoded once, only for bulk consumers such as feed precomputation
+        if self._decoded is None:
+            self._decoded = [key.decode('utf-8') for key in self._base.tolist()]
+        return self._decoded + self._ids
+
+
+class SnapshotHistories(MutableMapping):
+    """user_id -> dict mapping that builds each user's dict from the snapshot on first access.
+
+    Behaves like the ``defaultdict(dict)`` it replaces: looking up an
+    unknown user creates an empty dict. Dicts handed out are kept, so they
+    can be mutated in place. ``items()`` and ``values()`` build dicts for
+    users that were never accessed without keeping them, so full scans
+    (snapshots, statistics) don't pull the whole snapshot onto the heap.
+    """
+
+    def __init__(self, users: IdIndex, build: Callable[[int], Dict[str, Any]]):
+        self._users = users
+        self._n_rows = len(users)
+        self._build = build
+        self._loaded: Dict[str, Dict[str, Any]] = {}
+        self._removed: set = set()
+        # Snapshot users now answered from _loaded or deleted
+        self._shadowed = 0
+
+    def _row(self, key: str) -> Optional[int]:
+        """Snapshot row of a user that was not deleted since"""
+        if key in self._removed:
+            return None
+        return self._users.get(key)
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        value = self._loaded.get(key)
+        if value is None:
+            row = self._row(key)
+            if row is not None:
+                self._shadowed += 1
+            value = self._build(row) if row is not None else {}
+            self._loaded[key] = value
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def __setitem__(self, key: str, value: Dict[str, Any]) -> None:
+        if key not in self._loaded and self._row(key) is not None:
+            self._shadowed += 1
+        self._loaded[key] = value
+        self._removed.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        if self._loaded.pop(key, None) is None:
+            self._shadowed += 1
+        if self._users.get(key) is not None:
+            self._removed.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._loaded or self._row(key) is not None
+
+    def _snapshot_rows(self) -> Iterator[Tuple[str, int]]:
+        """(user, row) of snapshot users not loaded or deleted since"""
+        for row in range(self._n_rows):
+            key = self._users.key(row)
+            if key not in self._loaded and key not in self._removed:
+                yield key, row
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._loaded)
+        for key, _ in self._snapshot_rows():
+            yield key
+
+    def __len__(self) -> int:
+        return len(self._loaded) + self._n_rows - self._shadowed
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        yield from list(self._loaded.items())
+        for key, row in self._snapshot_rows():
+            yield key, self._build(row)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        for _, value in self.items():
+            yield value
+
+
+class LoadedSnapshot(NamedTuple):
+    """Model state restored from a snapshot"""
+    coview: CoViewMatrix
+    histories: SnapshotHistories
+    contexts: SnapshotHistories
+    watermark: Optional[datetime]
+    created_at: float
+    # Scales new co-views when the snapshot holds normalized similarities
+    similarity: Optional[PairNormalizer]
+
+
+class ModelSnapshotStore:
+    """Directory of binary model snapshots with an atomically swapped pointer.
+
+    A snapshot holds the post and user id tables (see ``MappedIdIndex``),
+    the co-view matrix as CSR ``.npy`` arrays, user histories in the same
+    CSR layout (post ids, view times, session codes, dwell times) and a
+    ``meta.json`` with the format version. Arrays are opened with
+    ``mmap_mode='r'``, so loading reads almost nothing up front and pages
+    are only read in as they are used. Each write goes to a new generation
+    directory before ``CURRENT`` is replaced; the previous one is kept for
+    processes that still map it.
+
+    Like ``SharedModelPublisher``, snapshots are split so the event loop
+    only copies what changed: prepare() encodes the histories of users
+    who viewed posts since the last snapshot and takes the matrix's
+    uncompacted entries; write() merges those into the previous
+    snapshot's arrays and writes the files in a thread.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pointer_file = os.path.join(directory, 'CURRENT')
+        # Model objects the history arrays below were encoded from
+        self._post_index: Optional[IdIndex] = None
+        self._interactions: Optional[MutableMapping] = None
+        self._users = IdIndex()
+        self._sessions = IdIndex()
+        # History arrays (user_indptr, posts, times, sessions, durations) of the last written snapshot
+        self._histories: Optional[Tuple[np.ndarray, ...]] = None
+
+    def _encode(
+        self,
+        coview: CoViewMatrix,
+        history: Dict[str, float],
+        contexts: Dict[str, ViewContext]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        session_codes: List[int] = []
+        durations: List[int] = []
+        for post_id in history:
+            session_id, duration_ms = contexts.get(post_id, (None, None))
+            session_codes.append(_MISSING if session_id is None else self._sessions.intern(session_id))
+            durations.append(_MISSING if duration_ms is None else duration_ms)
+        return (
+            np.fromiter((coview.posts.intern(p) for p in history), dtype=np.int32, count=len(history)),
+            np.fromiter(history.values(), dtype=np.float64, count=len(history)),
+            np.array(session_codes, dtype=np.int32),
+            np.array(durations, dtype=np.int64),
+        )
+
+    def _encode_all(
+        self,
+        coview: CoViewMatrix,
+        interactions: MutableMapping,
+        contexts: MutableMapping
+    ) -> Tuple[IdIndex, IdIndex, Tuple[np.ndarray, ...]]:
+        """(users, sessions, history arrays) of every non-empty history"""
+        users = IdIndex()
+        sessions = IdIndex()
+        lengths: List[int] = []
+        post_idx: List[int] = []
+        times: List[float] = []
+        session_codes: List[int] = []
+        durations: List[int] = []
+        intern = coview.posts.intern
+        # Copied once up front: per-user lookups would materialize lazy snapshot entries
+        contexts = {user_id: posts for user_id, posts in contexts.items() if posts}
+        for user_id, history in interactions.items():
+            if not history:
+                continue
+            users.intern(user_id)
+            lengths.append(len(history))
+            user_contexts = contexts.get(user_id, {})
+            for post_id, viewed_at in history.items():
+                post_idx.append(intern(post_id))
+                times.append(viewed_at)
+                session_id, duration_ms = user_contexts.get(post_id, (None, None))
+                session_codes.append(_MISSING if session_id is None else sessions.intern(session_id))
+                durations.append(_MISSING if duration_ms is None else duration_ms)
+        return users, sessions, (
+            np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64),
+            np.array(post_idx, dtype=np.int32),
+            np.array(times, dtype=np.float64),
+            np.array(session_codes, dtype=np.int32),
+            np.array(durations, dtype=np.int64),
+        )
+
+    def prepare(
+        self,
+        coview: CoViewMatrix,
+        interactions: MutableMapping,
+        contexts: MutableMapping,
+        watermark: Optional[datetime] = None,
+        changed_users: Optional[Iterable[str]] = None,
+        similarity: Optional[PairNormalizer] = None
+    ) -> Dict[str, Any]:
+        """Copy what a snapshot needs; must run where the model is mutated.
+
+        ``changed_users`` are the users whose histories changed since the
+        last prepare(); only theirs are re-encoded. Every history is
+        encoded for a rebuilt matrix or replaced histories, after a failed
+        write, or without ``changed_users``.
+        """
+        if coview.posts is not self._post_index or interactions is not self._interactions:
+            self._post_index = coview.posts
+            self._interactions = interactions
+            self._histories = None
+        # Cleared until write() succeeds, so a failed snapshot is re-encoded in full
+        base, self._histories = self._histories, None
+        changed: Dict[int, Tuple[np.ndarray, ...]] = {}
+        if base is None or changed_users is None:
+            self._users, self._sessions, base = self._encode_all(coview, interactions, contexts)
+        else:
+            for user_id in changed_users:
+                changed[self._users.intern(user_id)] = self._encode(
+                    coview, interactions.get(user_id) or {}, contexts.get(user_id) or {}
+                )
+        csr, chunks = coview.pending_entries()
+        # Id tables are only appended to, so write() can slice them in its thread
+        return {
+            'csr': csr,
+            'chunks': chunks,
+            'histories': base,
+            'changed': changed,
+            # Build-time degrees are never written to, so the array is shared
+            'similarity_degrees': similarity.degrees if similarity is not None else None,
+            'ids': {
+                'posts': (coview.posts, coview.n_posts),
+                'users': (self._users, len(self._users)),
+            },
+            # Session ids come from clients, so they are not assumed to be newline free
+            'sessions': (self._sessions, len(self._sessions)),
+            'meta': {
+                'version': MODEL_SNAPSHOT_VERSION,
+                'n_posts': coview.n_posts,
+                'n_users': len(self._users),
+                'max_neighbors': coview.max_neighbors,
+                'top_k': coview.top_k,
+                'watermark': watermark.isoformat() if watermark is not None else None,
+                'similarity': (
+                    {'metric': similarity.metric, 'n_users': similarity.n_users}
+                    if similarity is not None else None
+                ),
+            },
+        }
+
+    def encoded_histories(
+        self,
+        coview: CoViewMatrix,
+        interactions: MutableMapping,
+        contexts: MutableMapping,
+        changed_users: Iterable[str]
+    ) -> Dict[str, Any]:
+        """Copy every history as arrays, for bulk readers such as the similarity build.
+
+        Starts from the last written snapshot's arrays, so only
+        ``changed_users``, whose histories changed since that snapshot was
+        prepared, are encoded; splice_histories() merges them in off the
+        loop. Without a snapshot of this model every history is encoded,
+        leaving the snapshot state alone.
+        """
+        base = self._histories
+        if base is None or coview.posts is not self._post_index or interactions is not self._interactions:
+            users, _, histories = self._encode_all(coview, interactions, contexts)
+            return {'histories': histories, 'changed': {}, 'users': users, 'n_users': len(users)}
+        changed = {
+            self._users.intern(user_id): self._encode(
+                coview, interactions.get(user_id) or {}, contexts.get(user_id) or {}
+            )
+            for user_id in changed_users
+        }
+        return {'histories': base, 'changed': changed, 'users': self._users, 'n_users': len(self._users)}
+
+    def write(self, prepared: Dict[str, Any]) -> str:
+        """Build and write a prepared snapshot and publish it; returns its name"""
+        meta = prepared['meta']
+        indptr, indices, data = merge_entries(
+            prepared['csr'], prepared['chunks'], meta['n_posts'], meta['max_neighbors']
+        )
+        histories = splice_histories(prepared['histories'], prepared['changed'], meta['n_users'])
+        user_indptr, columns = histories[0], histories[1:]
+        arrays = {
+            'indptr.npy': indptr,
+            'indices.npy': indices,
+            'data.npy': data,
+            'user_indptr.npy': user_indptr,
+            'history_posts.npy': columns[0],
+            'history_times.npy': columns[1],
+            'history_sessions.npy': columns[2],
+            'history_durations.npy': columns[3],
+        }
+        if prepared['similarity_degrees'] is not None:
+            arrays['similarity_degrees.npy'] = prepared['similarity_degrees']
+        meta = dict(meta, nnz=int(indices.shape[0]))
+
+        os.makedirs(self.directory, exist_ok=True)
+        created_at = time.time()
+        generation = f"model-{int(created_at * 1000)}"
+        tmp_dir = os.path.join(self.directory, generation + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, name), array)
+        for name, (index, count) in prepared['ids'].items():
+            _save_ids(tmp_dir, name, index.ids[:count])
+        sessions, n_sessions = prepared['sessions']
+        with open(os.path.join(tmp_dir, 'sessions.json'), 'w') as f:
+            json.dump(sessions.ids[:n_sessions], f)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, created_at=created_at), f)
+        for name in os.listdir(tmp_dir):
+            with open(os.path.join(tmp_dir, name), 'rb') as f:
+                os.fsync(f.fileno())
+        final_dir = os.path.join(self.directory, generation)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+
+        previous = self.current()
+        tmp_pointer = self.pointer_file + '.tmp'
+        with open(tmp_pointer, 'w') as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_pointer, self.pointer_file)
+        self._histories = histories
+
+        # Keep only the new snapshot and the one it replaced
+        for name in os.listdir(self.directory):
+            if name.startswith('model-') and name not in (generation, previous):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        logger.info(
+            f"Wrote model snapshot {generation} "
+            f"({meta['n_users']} users, {meta['nnz']} co-view entries)"
+        )
+        return generation
+
+    def current(self) -> Optional[str]:
+        """Name of the published snapshot, if any"""
+        try:
+            with open(self.pointer_file, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> Optional[LoadedSnapshot]:
+        """Open the published snapshot with memory-mapped arrays"""
+        generation = self.current()
+        if generation is None:
+            return None
+        directory = os.path.join(self.directory, generation)
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != MODEL_SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported model snapshot version {meta.get('version')}")
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, name), mmap_mode='r')
+
+        posts = MappedIdIndex(load('posts.npy'), load('posts_sorted.npy'), load('posts_order.npy'))
+        users = MappedIdIndex(load('users.npy'), load('users_sorted.npy'), load('users_order.npy'))
+        with open(os.path.join(directory, 'sessions.json'), 'r') as f:
+            sessions = json.load(f)
+        if len(posts) != meta['n_posts'] or len(users) != meta['n_users']:
+            raise ValueError(f"Model snapshot {generation} ids do not match its metadata")
+
+        coview = CoViewMatrix.from_state({
+            'indptr': load('indptr.npy'),
+            'indices': load('indices.npy'),
+            'data': load('data.npy'),
+            'max_neighbors': meta['max_neighbors'],
+            'top_k': meta['top_k'],
+        }, posts=posts)
+        user_indptr = load('user_indptr.npy')
+        history_posts = load('history_posts.npy')
+        history_times = load('history_times.npy')
+        history_sessions = load('history_sessions.npy')
+        history_durations = load('history_durations.npy')
+
+        def build_history(row: int) -> Dict[str, float]:
+            start, end = int(user_indptr[row]), int(user_indptr[row + 1])
+            return dict(zip(
+                posts.keys(history_posts[start:end].tolist()),
+                history_times[start:end].tolist()
+            ))
+
+        def build_contexts(row: int) -> Dict[str, ViewContext]:
+            start, end = int(user_indptr[row]), int(user_indptr[row + 1])
+            contexts: Dict[str, ViewContext] = {}
+            for post, session, duration in zip(
+                history_posts[start:end].tolist(),
+                history_sessions[start:end].tolist(),
+                history_durations[start:end].tolist()
+            ):
+                if session != _MISSING or duration != _MISSING:
+                    contexts[posts.key(post)] = (
+                        None if session == _MISSING else sessions[session],
+                        None if duration == _MISSING else duration
+                    )
+            return contexts
+
+        histories = SnapshotHistories(users, build_history)
+        # The next snapshot only re-encodes users changed since this one
+        self._post_index = posts
+        self._interactions = histories
+        self._users = MappedIdIndex(load('users.npy'), load('users_sorted.npy'), load('users_order.npy'))
+        self._sessions = IdIndex(sessions)
+        self._histories = (user_indptr, history_posts, history_times, history_sessions, history_durations)
+
+        similarity = None
+        if meta.get('similarity'):
+            similarity = PairNormalizer(
+                meta['similarity']['metric'],
+                np.load(os.path.join(directory, 'similarity_degrees.npy')),
+                meta['similarity']['n_users']
+            )
+
+        watermark = meta.get('watermark')
+        return LoadedSnapshot(
+            coview=coview,
+            histories=histories,
+            contexts=SnapshotHistories(users, build_contexts),
+            watermark=datetime.fromisoformat(watermark) if watermark else None,
+            created_at=meta['created_at'],
+            similarity=similarity
+        )
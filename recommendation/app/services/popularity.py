@@ -0,0 +1,120 @@
+"""In-memory popularity leaderboard refreshed in the background"""
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityLeaderboard:
+    """Active posts ranked by popularity, held as parallel sorted arrays.
+
+    The ranking (likes * 2 + comments, newest first on ties) is computed by
+    one aggregate query per refresh. Pages are sliced from memory, and
+    per-user exclusions are skipped by position instead of being sent to
+    Postgres as a ``NOT IN`` list.
+    """
+
+    def __init__(self):
+        self.post_ids: List[str] = []
+        self.scores = np.empty(0, dtype=np.float32)
+        self._positions: Dict[str, int] = {}
+        self.refreshed_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at is not None
+
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+    async def refresh(self, counts_sql: Dict[str, str]) -> None:
+        """Recompute the ranking from Postgres and swap it in"""
+        rows = await db.execute_query(
+            f"""
+            SELECT
+                p.id,
+                ({counts_sql['likes']} * 2 + {counts_sql['comments']})::int AS popularity_score
+            FROM "Post" p
+            INNER JOIN "User" u ON p."authorId" = u.id
+            {counts_sql['joins']}
+            WHERE u.status = 'ACTIVE'
+            {counts_sql['group_by']}
+            ORDER BY popularity_score DESC, p."createdAt" DESC, p.id
+            """
+        )
+        post_ids = [r['id'] for r in rows]
+        scores = np.fromiter((r['popularity_score'] for r in rows), dtype=np.float32, count=len(rows))
+        # Swap all three at once so readers never see a mix of old and new
+        self.post_ids, self.scores, self._positions = (
+            post_ids,
+            scores,
+            {post_id: i for i, post_id in enumerate(post_ids)}
+        )
+        self.refreshed_at = time.time()
+        logger.info(f"Popularity leaderboard refreshed with {len(post_ids)} posts")
+
+    def page(
+        self,
+        page: int,
+        limit: int,
+        exclude_ids: Optional[Iterable[str]] = None
+    ) -> Tuple[List[str], List[float], int]:
+        """Return (post ids, scores, total) for one page, skipping excluded posts"""
+        post_ids, scores, positions = self.post_ids, self.scores, self._positions
+        n = len(post_ids)
+        excluded = np.unique(np.fromiter(
+            (positions[pid] for pid in (exclude_ids or ()) if pid in positions),
+            dtype=np.int64
+        ))
+        total = n - excluded.shape[0]
+        start = (page - 1) * limit
+        if start >= total:
+            return [], [], total
+
+        # Find the leaderboard position of the start-th non-excluded post
+        position = start
+        while True:
+            shifted = start + int(np.searchsorted(excluded, position, side='right'))
+            if shifted == position:
+                break
+            position = shifted
+        window = np.arange(position, min(n, position + limit + excluded.shape[0]))
+        window = window[~np.isin(window, excluded)][:limit]
+        return [post_ids[i] for i in window.tolist()], scores[window].tolist(), total
+
+    def after(
+        self,
+        post_id: str,
+        score: float,
+        limit: int,
+        exclude_ids: Optional[Iterable[str]] = None
+    ) -> Tuple[List[str], List[float], int, bool]:
+        """Return (post ids, scores, total, has_more) for the page following a cursor post"""
+        post_ids, scores, positions = self.post_ids, self.scores, self._positions
+        n = len(post_ids)
+        excluded = np.unique(np.fromiter(
+            (positions[pid] for pid in (exclude_ids or ()) if pid in positions),
+            dtype=np.int64
+        ))
+        position = positions.get(post_id)
+        if position is not None:
+            start = position + 1
+        else:
+            # The cursor post dropped out on refresh; resume after its score
+            start = int(np.searchsorted(-scores, -score, side='right'))
+        # Fetch one extra post to know whether another page follows
+        window = np.arange(start, min(n, start + limit + 1 + excluded.shape[0]))
+        window = window[~np.isin(window, excluded)][:limit + 1]
+        has_more = window.shape[0] > limit
+        window = window[:limit]
+        return (
+            [post_ids[i] for i in window.tolist()],
+            scores[window].tolist(),
+            n - excluded.shape[0],
+            has_more
+        )
@@ -1,194 +1,1129 @@
 """Service for generating recommendations with real-time learning"""
 import os
-import json
+import time
+import asyncio
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, BinaryIO, Optional, NamedTuple, Set, Tuple
 import logging
 from collections import defaultdict
+from datetime import datetime, timezone
+from bisect import bisect_right
+from itertools import islice
 
 from app.database import db
 from app.config import settings
+from app.services.author_index import AuthorIndex
+from app.services.content_index import ContentIndex
+from app.services.coview import CoViewMatrix, CoViewSnapshot, IdIndex, merge_entries
+from app.services.feed_store import FeedStore, FeedReader
+from app.services.feed_precompute import compute_feeds
+from app.services.interaction_store import InteractionStore, ViewContext
+from app.services.model_snapshot import ModelSnapshotStore, splice_histories
+from app.services.popularity import PopularityLeaderboard
+from app.services.scoring_pool import ScoringPool, ScoringTimeout
+from app.services.shared_state import SharedModelPublisher, SharedModelReader, WriterLock
+from app.services.similarity import PairNormalizer, build_similarity
+from app.services.view_consumer import ViewConsumer, load_view_source
+from app.services.view_spool import SpoolReader, ViewSpool
+from app.services.warmup import WarmupProgress
+from app.services.view_writer import ViewWriteBehind
+from app.schema import refresh_post_stats
+from app.utils.cache import TTLCache
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.metrics import registry
 
 logger = logging.getLogger(__name__)
 
+# Co-view weight added for a pair of posts viewed by the same user at the same time;
+# pairs viewed further apart decay with RECO_COVIEW_HALF_LIFE_HOURS
+SIMILARITY_INCREMENT = 0.1
+
+SCORING_SECONDS = registry.histogram(
+    'reco_scoring_seconds',
+    'Time to score and rank co-view candidates for one user'
+)
+BATCH_SCORING_SECONDS = registry.histogram(
+    'reco_batch_scoring_seconds',
+    'Time to score and rank all users of a batch recommendation request'
+)
+TRACK_VIEW_SECONDS = registry.histogram(
+    'reco_track_view_seconds',
+    'Time to apply a tracked view to the model and queue it for the DB'
+)
+CONTENT_SEARCH_SECONDS = registry.histogram(
+    'reco_content_search_seconds',
+    'Time to find content-based candidates for one user in the post embedding index'
+)
+TRACK_VIEWS_SECONDS = registry.histogram(
+    'reco_track_views_seconds',
+    'Time to apply one bulk batch of tracked views to the model'
+)
+RECOMMENDATION_PHASE_SECONDS = registry.histogram(
+    'reco_recommendation_phase_seconds',
+    'Time spent in each phase of a co-view recommendation request',
+    ['phase']
+)
+RANKING_SOURCE = registry.counter(
+    'reco_ranking_source_total',
+    'Co-view rankings by where they came from',
+    ['source']
+)
+_RANK_SECONDS = RECOMMENDATION_PHASE_SECONDS.labels('rank')
+_POST_DETAILS_SECONDS = RECOMMENDATION_PHASE_SECONDS.labels('post_details')
+_ANNOTATE_SECONDS = RECOMMENDATION_PHASE_SECONDS.labels('annotate')
+_RANKED_FROM_CACHE = RANKING_SOURCE.labels('result_cache')
+_RANKED_FROM_FEED = RANKING_SOURCE.labels('precomputed')
+_RANKED_BY_SCORING = RANKING_SOURCE.labels('scored')
+SCORING_TIMEOUTS = registry.counter(
+    'reco_scoring_timeouts_total',
+    'Recommendation requests served from the popular feed because scoring timed out'
+)
+
+
+def coview_weight(age_seconds):
+    """Time-decayed co-view weight for views age_seconds apart (scalar or array)"""
+    half_life = settings.RECO_COVIEW_HALF_LIFE_HOURS * 3600.0
+    if half_life <= 0:
+        return SIMILARITY_INCREMENT * np.ones_like(age_seconds, dtype=np.float64)
+    return SIMILARITY_INCREMENT * np.power(0.5, np.abs(age_seconds) / half_life)
+
+
+def dwell_factor(duration_ms):
+    """Weight multiplier for a view's dwell time (scalar or array, NaN/None means unknown)"""
+    if duration_ms is None:
+        return 1.0
+    reference = settings.RECO_DWELL_REFERENCE_MS
+    factor = np.clip(
+        np.asarray(duration_ms, dtype=np.float64) / reference if reference > 0 else 1.0,
+        settings.RECO_DWELL_MIN_FACTOR,
+        settings.RECO_DWELL_MAX_FACTOR
+    )
+    return np.where(np.isnan(factor), 1.0, factor)
+
+
+def _post_counts_sql() -> Dict[str, str]:
+    """SQL fragments for like/comment counts, live or from the materialized view"""
+    if settings.POST_STATS_MODE == 'materialized':
+        return {
+            'joins': 'LEFT JOIN "RecommendationPostStats" s ON s."postId" = p.id',
+            'likes': 'COALESCE(s.like_count, 0)',
+            'comments': 'COALESCE(s.comment_count, 0)',
+            'group_by': '',
+        }
+    return {
+        'joins': 'LEFT JOIN "Like" l ON p.id = l."postId"\n'
+                 '                LEFT JOIN "Comment" c ON p.id = c."postId"',
+        'likes': 'COUNT(DISTINCT l.id)',
+        'comments': 'COUNT(DISTINCT c.id)',
+        'group_by': 'GROUP BY p.id, u.id',
+    }
+
+
+class RankedCandidates(NamedTuple):
+    """Top co-view candidates for a user, best first"""
+    post_idx: np.ndarray  # interned post ids
+    scores: np.ndarray
+    total: int  # number of candidates before truncation
+    posts: IdIndex  # the id index post_idx refers to
+
 
 class RecommendationService:
     """Service for handling recommendation logic with incremental learning"""
     
     def __init__(self):
-        self.user_post_interactions: Dict[str, List[str]] = defaultdict(list)  # user_id -> [post_ids]
-        self.post_similarity_matrix: Dict[str, Dict[str, float]] = {}  # post_id -> {post_id: similarity}
+        # user_id -> {post_id: viewed_at}, ordered oldest to newest view
+        self.user_post_interactions: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # user_id -> {post_id: (session_id, duration_ms)}, only for views that reported them
+        self.view_context: Dict[str, Dict[str, ViewContext]] = defaultdict(dict)
+        # sparse post x post co-view weights; views are applied here (the staging copy)
+        self.coview = self._new_coview()
+        # Immutable copy of coview that requests read, republished by read_model()
+        self._read_model: Optional[CoViewSnapshot] = None
+        self._read_model_source: Optional[CoViewMatrix] = None
+        self._read_model_dirty = False
+        # Scales new co-view weights while coview holds normalized similarities (RECO_SIMILARITY_METRIC)
+        self.similarity: Optional[PairNormalizer] = None
+        # Co-views (post, earlier posts) added while a similarity build runs, replayed onto its result
+        self._similarity_backlog: Optional[List[Tuple[int, List[int]]]] = None
+        # user_id -> RankedCandidates, dropped whenever the user views a new post
+        self.result_cache = TTLCache(
+            maxsize=settings.RECO_RESULT_CACHE_SIZE,
+            ttl=settings.RECO_RESULT_CACHE_TTL
+        )
+        # post_id -> post details row
+        self.post_cache = TTLCache(
+            maxsize=settings.POST_CACHE_SIZE,
+            ttl=settings.POST_CACHE_TTL
+        )
+        # (feed, user_id) -> total, so cursor pages skip the COUNT query
+        self.feed_total_cache = TTLCache(
+            maxsize=settings.RECO_RESULT_CACHE_SIZE,
+            ttl=settings.RECO_RESULT_CACHE_TTL
+        )
+        self.popularity = PopularityLeaderboard()
+        self.author_index = AuthorIndex(
+            posts_per_author=settings.AUTHOR_INDEX_POSTS_PER_AUTHOR,
+            max_authors=settings.AUTHOR_AFFINITY_MAX_AUTHORS,
+            affinity_cache_size=settings.AUTHOR_AFFINITY_CACHE_SIZE,
+            affinity_cache_ttl=settings.AUTHOR_AFFINITY_CACHE_TTL
+        )
+        self._background_tasks: List[asyncio.Task] = []
         self.model_loaded = False
-        self.interactions_file = os.path.join(
+        self.interaction_store = InteractionStore(
             os.path.dirname(settings.MODEL_PATH),
-            'interactions.json'
+            fsync_every=settings.INTERACTION_LOG_FSYNC_EVERY,
+            fsync_interval=settings.INTERACTION_LOG_FSYNC_INTERVAL,
+            snapshot_every=settings.INTERACTION_SNAPSHOT_EVERY
         )
-        self.load_interactions()
-        # Try to ensure DB table exists and preload interactions from DB (best-effort)
-        try:
-            import asyncio
-            asyncio.create_task(self._ensure_views_table())
-            asyncio.create_task(self._load_interactions_from_db())
-        except Exception:
-            pass
+        # The model snapshot being written, awaited by stop() before the log is closed
+        self._snapshot_task: Optional[asyncio.Task] = None
+        # Binary co-view matrix + histories, memory-mapped at startup
+        self.model_snapshot = ModelSnapshotStore(settings.MODEL_PATH)
+        # Users whose histories changed since the last model snapshot was prepared
+        self._snapshot_changed_users: Set[str] = set()
+        # Feeds ranked offline by the precompute job, read before scoring online
+        self.feed_store = FeedStore(os.path.join(os.path.dirname(settings.MODEL_PATH), 'feeds'))
+        self.feed_reader = FeedReader(self.feed_store, check_interval=settings.FEED_STORE_CHECK_INTERVAL)
+        self.view_writer = ViewWriteBehind(
+            batch_size=settings.VIEW_WRITE_BATCH_SIZE,
+            flush_interval=settings.VIEW_WRITE_FLUSH_INTERVAL,
+            max_pending=settings.VIEW_WRITE_MAX_PENDING,
+            enqueue_timeout=settings.VIEW_WRITE_ENQUEUE_TIMEOUT
+        )
+        # 'standalone', or 'writer' / 'reader' when workers share state
+        self.role = 'standalone'
+        self._shared_dirty = False
+        # Users whose histories changed since the last publish (tracked by the writer only)
+        self._shared_changed_users: Optional[Set[str]] = None
+        # The model is loaded by start(); views tracked before it is ready wait here
+        self.warmup = WarmupProgress()
+        self._pending_views: List[tuple] = []
+        # Bulk ingestion of view events from a file or queue (VIEW_CONSUMER_SOURCE)
+        self.view_consumer: Optional[ViewConsumer] = None
+        # In-process producers put view events here when VIEW_CONSUMER_SOURCE=queue
+        self.view_queue: Optional[asyncio.Queue] = (
+            asyncio.Queue() if settings.VIEW_CONSUMER_SOURCE == 'queue' else None
+        )
+        # Runs co-view scoring inline or in a worker pool (RECO_SCORING_EXECUTOR)
+        self.scoring_pool = ScoringPool(settings.RECO_SCORING_EXECUTOR, settings.RECO_SCORING_WORKERS)
+        # Post embeddings blended into co-view scoring (RECO_EMBEDDINGS_ENABLED)
+        self.content_index: Optional[ContentIndex] = None
+        if settings.RECO_EMBEDDINGS_ENABLED:
+            self.content_index = ContentIndex(
+                os.path.join(os.path.dirname(settings.MODEL_PATH), 'embeddings.npz'),
+                settings.EMBEDDING_MODEL,
+                nprobe=settings.RECO_EMBEDDING_NPROBE,
+                batch_size=settings.RECO_EMBEDDING_BATCH_SIZE,
+                flush_interval=settings.RECO_EMBEDDING_FLUSH_INTERVAL,
+                max_pending=settings.RECO_EMBEDDING_MAX_PENDING
+            )
+        self._register_metrics()
     
+    def _register_metrics(self) -> None:
+        """Expose the cache counters on /metrics; they are read at scrape time"""
+        caches = {
+            'result': self.result_cache,
+            'post': self.post_cache,
+            'feed_total': self.feed_total_cache,
+        }
+        registry.callback(
+            'reco_cache_hits_total', 'Cache lookups that found a live entry', 'counter', ['cache'],
+            lambda: {(name, ): cache.hits for name, cache in caches.items()}
+        )
+        registry.callback(
+            'reco_cache_misses_total', 'Cache lookups that found nothing or an expired entry', 'counter', ['cache'],
+            lambda: {(name, ): cache.misses for name, cache in caches.items()}
+        )
+        registry.callback(
+            'reco_cache_entries', 'Entries currently held by each cache', 'gauge', ['cache'],
+            lambda: {(name, ): len(cache) for name, cache in caches.items()}
+        )
+    
+    def read_model(self) -> CoViewSnapshot:
+        """The co-view snapshot requests score against, republished when views have changed coview.
+
+        Views go into ``self.coview``; readers only ever see a snapshot taken
+        between updates, at most RECO_READ_SNAPSHOT_INTERVAL seconds old, and
+        keep it for the whole request. A replaced matrix (rebuild, reload or
+        a shared-state refresh) is picked up straight away.
+        """
+        model = self._read_model
+        if (
+            model is None
+            or self._read_model_source is not self.coview
+            or (
+                self._read_model_dirty
+                and time.monotonic() - model.published_at >= settings.RECO_READ_SNAPSHOT_INTERVAL
+            )
+        ):
+            previous = model if self._read_model_source is self.coview else None
+            self._read_model_dirty = False
+            self._read_model_source = self.coview
+            model = self._read_model = self.coview.snapshot(previous)
+        return model
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the model is loaded and used to serve recommendations"""
+        return self.warmup.ready
+    
+    @staticmethod
+    def _new_coview() -> CoViewMatrix:
+        return CoViewMatrix(
+            max_neighbors=settings.RECO_MAX_NEIGHBORS_PER_POST,
+            top_k=settings.RECO_SCORING_NEIGHBORS
+        )
+    
+    def _init_writer(self) -> None:
+        """Own the interaction log and publish the model for the other workers"""
+        self.role = 'writer'
+        self.shared_publisher = SharedModelPublisher(self.shared_dir)
+        self.spool_reader = SpoolReader(os.path.join(self.shared_dir, 'spool'))
+        self._shared_dirty = True
+        self._shared_changed_users = set()
+        logger.info(f"Shared state writer (pid {os.getpid()})")
+
+    def _init_reader(self) -> None:
+        """Serve from the writer's published model and hand tracked views to it"""
+        self.role = 'reader'
+        self.shared_reader = SharedModelReader(self.shared_dir)
+        self.view_spool = ViewSpool(os.path.join(self.shared_dir, 'spool'))
+        logger.info(f"Shared state reader (pid {os.getpid()})")
+
+    def _refresh_shared_model(self) -> None:
+        """Swap in the newest generation published by the writer, if any"""
+        try:
+            published = self.shared_reader.refresh()
+        except Exception as e:
+            logger.warning(f"Could not open shared model: {e}")
+            return
+        if published is not None:
+            self.coview, self.user_post_interactions = published
+            self.result_cache.clear()
+            self.model_loaded = True
+            if not self.ready:
+                self.warmup.finish()
+                self.warmup.mark_ready()
+
     def load_interactions(self) -> None:
-        """Load user-post interactions from file"""
+        """Load user-post interactions from the snapshot and replay the log"""
+        if self._load_model_snapshot():
+            return
         try:
-            if os.path.exists(self.interactions_file):
-                with open(self.interactions_file, 'r') as f:
-                    data = json.load(f)
-                    self.user_post_interactions = defaultdict(list, data.get('interactions', {}))
+            interactions = self.interaction_store.load()
+            if interactions:
+                max_history = settings.RECO_MAX_HISTORY_PER_USER
+                self.user_post_interactions = defaultdict(dict, {
+                    uid: dict(list(posts.items())[-max_history:])
+                    for uid, posts in interactions.items()
+                })
+                self.view_context = defaultdict(dict, {
+                    uid: {pid: ctx for pid, ctx in posts.items() if pid in self.user_post_interactions[uid]}
+                    for uid, posts in self.interaction_store.contexts.items()
+                    if uid in self.user_post_interactions
+                })
+                self._rebuild_similarity_matrix()
                 logger.info(f"Loaded {len(self.user_post_interactions)} user interactions")
                 self.model_loaded = True
         except Exception as e:
             logger.warning(f"Could not load interactions: {e}")
     
-    def save_interactions(self) -> None:
-        """Save user-post interactions to file"""
+    def _load_model_snapshot(self) -> bool:
+        """Map the binary model snapshot and replay newer logged views onto it"""
         try:
-            os.makedirs(os.path.dirname(self.interactions_file), exist_ok=True)
-            data = {
-                'interactions': dict(self.user_post_interactions)
-            }
-            with open(self.interactions_file, 'w') as f:
-                json.dump(data, f)
-            logger.info("Interactions saved successfully")
+            started = time.monotonic()
+            snapshot = self.model_snapshot.load()
+            if snapshot is None:
+                return False
+            self.coview = snapshot.coview
+            self.user_post_interactions = snapshot.histories
+            self.view_context = snapshot.contexts
+            self.similarity = snapshot.similarity
+            self.interaction_store.watermark = snapshot.watermark
+            replayed = 0
+            for record in self.interaction_store.replay():
+                self._add_interaction(record['u'], record['p'], record.get('t'), record.get('s'), record.get('d'))
+                replayed += 1
+            self.interaction_store.records_since_snapshot = replayed
+            self.result_cache.clear()
+            self.model_loaded = True
+            logger.info(
+                f"Loaded model snapshot with {len(self.user_post_interactions)} users "
+                f"and replayed {replayed} logged views in {time.monotonic() - started:.2f}s"
+            )
+            return True
         except Exception as e:
-            logger.error(f"Error saving interactions: {e}")
-    
-    async def _ensure_views_table(self) -> None:
-        """Create recommendation views table if not exists"""
+            logger.warning(f"Could not load model snapshot, rebuilding from interactions: {e}")
+            self.coview = self._new_coview()
+            self.user_post_interactions = defaultdict(dict)
+            self.view_context = defaultdict(dict)
+            self.similarity = None
+            return False
+
+    def _write_snapshots(self, prepared: Dict[str, Any], rotation: Tuple[Optional[BinaryIO], List[str]]) -> None:
+        """Close the rotated log, write the binary model snapshot, then drop the rotated logs it covers"""
+        log, rotated = rotation
+        self.interaction_store.finish_rotation(log)
+        # On failure the rotated logs are kept, so the previous snapshot plus the logs still hold every view
+        self.model_snapshot.write(prepared)
+        self.interaction_store.drop_compacted(rotated)
+
+    def _prepare_snapshots(self) -> Tuple[Dict[str, Any], Tuple[Optional[BinaryIO], List[str]]]:
+        """Rotate the log and copy the model changes it corresponds to"""
+        rotation = self.interaction_store.rotate()
+        changed, self._snapshot_changed_users = self._snapshot_changed_users, set()
+        prepared = self.model_snapshot.prepare(
+            self.coview,
+            self.user_post_interactions,
+            self.view_context,
+            self.interaction_store.watermark,
+            changed,
+            self.similarity
+        )
+        return prepared, rotation
+
+    def _schedule_snapshot(self) -> asyncio.Task:
+        """Start compacting the interaction log in the background, unless a snapshot is already running"""
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._snapshot_interactions())
+        return self._snapshot_task
+
+    async def _snapshot_interactions(self) -> None:
+        """Compact the interaction log into a snapshot off the event loop (run via _schedule_snapshot)"""
         try:
-            # Create table
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS "RecommendationView" (
-                  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
-                  "userId" text NOT NULL,
-                  "postId" text NOT NULL,
-                  "postContent" text,
-                  "postAuthorId" text,
-                  "createdAt" timestamptz NOT NULL DEFAULT now()
-                );
-                """
+            # Only users changed since the last snapshot are encoded on the loop;
+            # merging them into the previous arrays and writing happen off it
+            snapshots = self._prepare_snapshots()
+            await asyncio.to_thread(self._write_snapshots, *snapshots)
+            logger.info("Interaction snapshot written")
+        except Exception as e:
+            logger.error(f"Error writing interaction snapshot: {e}")
+
+    async def start(self) -> None:
+        """Start background workers and the model warm-up (called from the application lifespan)"""
+        if settings.SHARED_STATE_MODE == 'shared':
+            self.shared_dir = os.path.join(os.path.dirname(settings.MODEL_PATH), 'shared')
+            self.writer_lock = WriterLock(os.path.join(self.shared_dir, 'writer.lock'))
+            if self.writer_lock.acquire():
+                self._init_writer()
+            else:
+                self._init_reader()
+        self.view_writer.start()
+        try:
+            await self.scoring_pool.start()
+        except Exception as e:
+            logger.error(f"Could not start scoring workers: {e}")
+        if self.content_index is not None:
+            try:
+                await asyncio.to_thread(self.content_index.load)
+            except Exception as e:
+                logger.warning(f"Could not load post embeddings: {e}")
+            self._background_tasks.append(asyncio.create_task(self.content_index.run()))
+        self._background_tasks.append(asyncio.create_task(self._refresh_popularity_loop()))
+        self._background_tasks.append(asyncio.create_task(self._refresh_author_index_loop()))
+        self._background_tasks.append(asyncio.create_task(self.feed_reader.run()))
+        if self.view_queue is not None:
+            # Every process drains its own queue; track_views holds views back until the model is ready
+            self._start_view_consumer()
+        if self.role == 'reader':
+            self.warmup.begin('loading')
+            self._background_tasks.append(asyncio.create_task(self._shared_reader_loop()))
+        else:
+            self._background_tasks.append(asyncio.create_task(self._warm_up()))
+
+    async def _warm_up(self) -> None:
+        """Load the local snapshot, then catch up from the DB; serve once the model is usable"""
+        try:
+            self.warmup.begin('loading')
+            # Nothing else touches the model until it is ready, so loading can leave the loop
+            await asyncio.to_thread(self.load_interactions)
+            if self.model_loaded:
+                self._mark_ready()
+            self.warmup.begin('warm_loading', await self._estimate_warm_load_rows())
+            await self._load_interactions_from_db()
+            if self.model_loaded and self.model_snapshot.current() is None:
+                # Rebuilt from the interaction log; write the binary snapshot for the next start
+                await asyncio.shield(self._schedule_snapshot())
+            if self.warmup.phase == 'warm_loading':
+                self.warmup.finish()
+        except Exception as e:
+            logger.error(f"Model warm-up failed: {e}")
+            self.warmup.fail(e)
+        # Serve whatever was loaded; views keep training the model from here on
+        self._mark_ready()
+
+    def _mark_ready(self) -> None:
+        """Apply views tracked during warm-up and switch requests over to the model"""
+        if self.ready:
+            return
+        pending, self._pending_views = self._pending_views, []
+        for view in pending:
+            self._record_view(*view)
+        self.warmup.mark_ready()
+        self._start_model_tasks()
+        logger.info(f"Recommendation model ready ({len(pending)} views applied from warm-up)")
+
+    async def _estimate_warm_load_rows(self) -> Optional[int]:
+        """Planner estimate of the rows a full warm-load reads; None when resuming from a watermark"""
+        if self.interaction_store.watermark is not None:
+            return None
+        try:
+            rows = await db.execute_query(
+                "SELECT reltuples::bigint AS estimate FROM pg_class WHERE relname = 'RecommendationView'"
             )
-            # Add columns if table already existed without them
-            await db.execute(
-                "ALTER TABLE \"RecommendationView\" ADD COLUMN IF NOT EXISTS \"postContent\" text"
+            return max(int(rows[0]['estimate']), 0) if rows else None
+        except Exception as e:
+            logger.warning(f"Could not estimate warm-load size: {e}")
+            return None
+
+    def _start_model_tasks(self) -> None:
+        """Tasks that only the process owning the model runs"""
+        if settings.POST_STATS_MODE == 'materialized':
+            self._background_tasks.append(asyncio.create_task(self._refresh_post_stats_loop()))
+        if settings.FEED_PRECOMPUTE_INTERVAL > 0:
+            self._background_tasks.append(asyncio.create_task(self._precompute_feeds_loop()))
+        if settings.RECO_SIMILARITY_METRIC != 'coview':
+            self._background_tasks.append(asyncio.create_task(self._rebuild_similarity_loop()))
+        if self.role == 'writer':
+            self._background_tasks.append(asyncio.create_task(self._shared_writer_loop()))
+        if settings.VIEW_CONSUMER_SOURCE and self.view_consumer is None:
+            self._start_view_consumer()
+
+    def _start_view_consumer(self) -> None:
+        """Feed VIEW_CONSUMER_SOURCE into track_views in the background"""
+        try:
+            source = load_view_source(
+                settings.VIEW_CONSUMER_SOURCE,
+                settings.VIEW_CONSUMER_PATH,
+                settings.VIEW_CONSUMER_BATCH_SIZE,
+                queue=self.view_queue
             )
-            await db.execute(
-                "ALTER TABLE \"RecommendationView\" ADD COLUMN IF NOT EXISTS \"postAuthorId\" text"
+            self.view_consumer = ViewConsumer(
+                source,
+                self.track_views,
+                poll_interval=settings.VIEW_CONSUMER_POLL_INTERVAL
             )
+            self._background_tasks.append(asyncio.create_task(self.view_consumer.run()))
+        except Exception as e:
+            logger.error(f"Could not start view event consumer: {e}")
+
+    async def stop(self) -> None:
+        """Drain queued view writes and flush local state on shutdown"""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks = []
+        if self.view_consumer is not None:
+            self.view_consumer.source.close()
+        self.scoring_pool.shutdown()
+        if self.content_index is not None:
+            try:
+                self.content_index.save()
+            except Exception as e:
+                logger.warning(f"Could not save post embeddings: {e}")
+        await self.view_writer.drain()
+        if self.role == 'writer':
+            # Apply views handed over by readers before giving up the log
+            self._apply_spooled_views()
+        if self._snapshot_task is not None:
+            # A cancelled caller leaves its snapshot running; finish it before the log is closed
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+        try:
+            await self.interaction_store.aclose()
         except Exception as e:
-            logger.warning(f"Could not ensure RecommendationView table: {e}")
+            logger.error(f"Error closing interaction log: {e}")
+        if self.role != 'standalone':
+            if self.role == 'reader':
+                self.view_spool.close()
+            self.writer_lock.release()
 
+    async def _shared_writer_loop(self) -> None:
+        """Apply views spooled by readers and publish the model when it changed"""
+        while True:
+            try:
+                self._apply_spooled_views()
+                if self._shared_dirty:
+                    self._shared_dirty = False
+                    changed, self._shared_changed_users = self._shared_changed_users, set()
+                    # Only changed histories and co-view deltas are copied on the loop;
+                    # merging them into the published arrays and writing happen off it
+                    prepared = self.shared_publisher.prepare(self.coview, self.user_post_interactions, changed)
+                    generation = await asyncio.to_thread(self.shared_publisher.write, prepared)
+                    logger.debug(f"Published shared model {generation}")
+            except Exception as e:
+                self._shared_dirty = True
+                logger.warning(f"Could not publish shared model: {e}")
+            await asyncio.sleep(settings.SHARED_STATE_PUBLISH_INTERVAL)
+
+    def _apply_spooled_views(self) -> None:
+        """Fold views tracked by reader workers into the model and the interaction log"""
+        applied = 0
+        for record in self.spool_reader.read():
+            uid, pid = record.get('u'), record.get('p')
+            if not uid or not pid:
+                continue
+            viewed_at = record.get('t')
+            if self._add_interaction(uid, pid, viewed_at, record.get('s'), record.get('d')):
+                self.interaction_store.append(uid, pid, viewed_at, record.get('s'), record.get('d'))
+                self.author_index.record_view(uid, pid, record.get('a'))
+                applied += 1
+        if applied and self.interaction_store.should_snapshot():
+            self._schedule_snapshot()
+
+    async def _shared_reader_loop(self) -> None:
+        """Follow the writer's publications, taking over if the writer goes away"""
+        while True:
+            try:
+                if self.writer_lock.acquire():
+                    self._promote_to_writer()
+                    return
+                self._refresh_shared_model()
+            except Exception as e:
+                logger.warning(f"Could not refresh shared model: {e}")
+            await asyncio.sleep(settings.SHARED_STATE_CHECK_INTERVAL)
+
+    def _promote_to_writer(self) -> None:
+        """Become the writer after the previous one exited"""
+        self.view_spool.close()
+        self.user_post_interactions = defaultdict(dict)
+        self.view_context = defaultdict(dict)
+        self.coview = self._new_coview()
+        self.model_loaded = False
+        self.warmup = WarmupProgress()
+        self._init_writer()
+        self._background_tasks.append(asyncio.create_task(self._warm_up()))
+
+    async def _refresh_popularity_loop(self) -> None:
+        """Keep the in-memory popularity leaderboard fresh"""
+        while True:
+            try:
+                await self.popularity.refresh(_post_counts_sql())
+            except Exception as e:
+                logger.warning(f"Could not refresh popularity leaderboard: {e}")
+            await asyncio.sleep(settings.POPULARITY_REFRESH_INTERVAL)
+
+    async def _refresh_author_index_loop(self) -> None:
+        """Keep the in-memory author -> recent posts index fresh"""
+        while True:
+            try:
+                await self.author_index.refresh()
+            except Exception as e:
+                logger.warning(f"Could not refresh author index: {e}")
+            await asyncio.sleep(settings.AUTHOR_INDEX_REFRESH_INTERVAL)
+
+    async def _refresh_post_stats_loop(self) -> None:
+        """Periodically refresh the materialized like/comment counts"""
+        while True:
+            await asyncio.sleep(settings.POST_STATS_REFRESH_INTERVAL)
+            try:
+                await refresh_post_stats()
+            except Exception as e:
+                logger.warning(f"Could not refresh post stats: {e}")
+
+    async def _precompute_feeds_loop(self) -> None:
+        """Periodically re-rank every user's feed offline"""
+        while True:
+            await asyncio.sleep(settings.FEED_PRECOMPUTE_INTERVAL)
+            try:
+                await self.precompute_feeds()
+            except Exception as e:
+                logger.warning(f"Could not precompute feeds: {e}")
+
+    async def _rebuild_similarity_loop(self) -> None:
+        """Build normalized similarities once the model is ready, then every RECO_SIMILARITY_REBUILD_INTERVAL"""
+        while True:
+            try:
+                await self.rebuild_similarity()
+            except Exception as e:
+                logger.warning(f"Could not build {settings.RECO_SIMILARITY_METRIC} similarities: {e}")
+            if settings.RECO_SIMILARITY_REBUILD_INTERVAL <= 0:
+                return
+            await asyncio.sleep(settings.RECO_SIMILARITY_REBUILD_INTERVAL)
+
+    async def rebuild_similarity(self, metric: Optional[str] = None) -> int:
+        """Replace the co-view weights with normalized similarities built from every history.
+
+        Histories come from the model snapshot's encoded arrays, so the
+        loop only encodes users who viewed posts since it was written;
+        splitting them per user and the build run in a thread. Co-views
+        tracked meanwhile are replayed onto its result before it is
+        swapped in. Returns the number of neighbors kept.
+        """
+        metric = metric or settings.RECO_SIMILARITY_METRIC
+        posts = self.coview.posts
+        encoded = await self._encoded_histories()
+        n_posts = len(posts)
+
+        def build() -> Tuple[Dict[str, object], PairNormalizer]:
+            user_indptr, history_posts, _, history_sessions, _ = splice_histories(
+                encoded['histories'], encoded['changed'], encoded['n_users']
+            )
+            # Users whose histories were emptied keep an empty row
+            rows = np.flatnonzero(np.diff(user_indptr))
+            histories = [history_posts[user_indptr[row]:user_indptr[row + 1]] for row in rows]
+            sessions = [history_sessions[user_indptr[row]:user_indptr[row + 1]] for row in rows]
+            return build_similarity(
+                histories,
+                n_posts,
+                metric,
+                settings.RECO_HISTORY_WINDOW,
+                settings.RECO_MAX_NEIGHBORS_PER_POST,
+                settings.RECO_SCORING_NEIGHBORS,
+                sessions
+            )
+
+        self._similarity_backlog = []
+        try:
+            state, normalizer = await asyncio.to_thread(build)
+            backlog = self._similarity_backlog
+        finally:
+            self._similarity_backlog = None
+        if self.coview.posts is not posts:
+            logger.warning("Co-view matrix was rebuilt during the similarity build; discarding it")
+            return 0
+        # Sharing the id index keeps post numbering, so shared-state readers stay on their epoch
+        coview = CoViewMatrix.from_state(state, posts=posts)
+        for post, others in backlog:
+            # One co-occurrence per pair, as counted by the build
+            forward, backward = normalizer.normalize(
+                np.full(len(others), post), np.array(others), np.ones(len(others))
+            )
+            coview.add_neighbors(post, others, forward.tolist(), backward.tolist())
+        self.coview = coview
+        self.similarity = normalizer
+        self.result_cache.clear()
+        self._shared_dirty = True
+        logger.info(
+            f"Swapped in {metric} similarities for {normalizer.n_users} users "
+            f"({len(backlog)} views replayed)"
+        )
+        return int(state['indices'].shape[0])
+
+    async def _encoded_histories(self) -> Dict[str, Any]:
+        """Every history as arrays over coview.posts, starting from the last model snapshot's"""
+        if self._snapshot_task is not None and not self._snapshot_task.done():
+            # Its arrays become the base once written
+            await asyncio.shield(self._snapshot_task)
+        return self.model_snapshot.encoded_histories(
+            self.coview, self.user_post_interactions, self.view_context, self._snapshot_changed_users
+        )
+
+    async def precompute_feeds(
+        self,
+        workers: Optional[int] = None,
+        depth: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> int:
+        """Rank all known users in worker processes and publish them to the feed store.
+
+        The loop only takes the co-view matrix's pending entries and the
+        model snapshot's encoded histories (see _encoded_histories);
+        compacting, splitting histories per user and content searches run
+        in a thread, ranking in worker processes.
+        """
+        generated_at = time.time()
+        encoded = await self._encoded_histories()
+        coview = self.coview
+        csr, chunks = coview.pending_entries()
+        post_index, n_posts = coview.posts, coview.n_posts
+        with_content = self.content_index is not None and len(self.content_index.index) > 0
+
+        def collect() -> Tuple[Dict[str, object], List[str], List[np.ndarray], Optional[List]]:
+            indptr, indices, data = merge_entries(csr, chunks, n_posts, coview.max_neighbors)
+            user_indptr, history_posts, *_ = splice_histories(
+                encoded['histories'], encoded['changed'], encoded['n_users']
+            )
+            rows = np.flatnonzero(np.diff(user_indptr))
+            user_ids = encoded['users'].keys(rows.tolist())
+            histories = [history_posts[user_indptr[row]:user_indptr[row + 1]] for row in rows]
+            boosts = None
+            if with_content:
+                # Content candidates as online scoring adds them: searched from the newest views
+                window = settings.RECO_HISTORY_WINDOW
+                boosts = [
+                    self._similar_posts(post_index.keys(history[-window:][::-1].tolist()), post_index, n_posts)
+                    for history in histories
+                ]
+            state = {
+                'post_ids': post_index.ids[:n_posts],
+                'indptr': indptr,
+                'indices': indices,
+                'data': data,
+                'max_neighbors': coview.max_neighbors,
+                'top_k': coview.top_k,
+            }
+            return state, user_ids, histories, boosts
+
+        state, user_ids, histories, boosts = await asyncio.to_thread(collect)
+        count = await asyncio.to_thread(
+            compute_feeds,
+            state,
+            user_ids,
+            histories,
+            self.feed_store,
+            depth or settings.FEED_PRECOMPUTE_DEPTH,
+            workers or settings.FEED_PRECOMPUTE_WORKERS,
+            chunk_size or settings.FEED_PRECOMPUTE_CHUNK_SIZE,
+            generated_at,
+            boosts
+        )
+        await asyncio.to_thread(self.feed_reader.refresh, True)
+        logger.info(f"Precomputed feeds for {count} of {len(user_ids)} users")
+        return count
+
+    def close(self) -> None:
+        """Flush pending interaction log writes"""
+        try:
+            self.interaction_store.close()
+        except Exception as e:
+            logger.error(f"Error closing interaction log: {e}")
+    
     async def _load_interactions_from_db(self) -> None:
-        """Warm in-memory interactions from DB history."""
+        """Stream DB view history into the model, resuming from the last high-water mark"""
         try:
-            await self._ensure_views_table()
-            rows = await db.execute_query(
-                """
-                SELECT "userId", "postId"
-                FROM "RecommendationView"
-                ORDER BY "createdAt" ASC
-                """
+            watermark = self.interaction_store.watermark
+            query = (
+                'SELECT "userId", "postId", "postAuthorId", "createdAt", "sessionId", "durationMs"'
+                ' FROM "RecommendationView"'
             )
-            rebuilt: Dict[str, List[str]] = defaultdict(list)
-            for r in rows:
-                uid = r.get('userId')
-                pid = r.get('postId')
-                if uid and pid:
-                    if pid not in rebuilt[uid]:
-                        rebuilt[uid].append(pid)
-            if rebuilt:
-                self.user_post_interactions = rebuilt
-                # Rebuild a lightweight similarity (co-view counts)
-                sim: Dict[str, Dict[str, float]] = {}
-                for posts in rebuilt.values():
-                    for i in range(len(posts)):
-                        for j in range(i + 1, len(posts)):
-                            a, b = posts[i], posts[j]
-                            sim.setdefault(a, {})
-                            sim.setdefault(b, {})
-                            sim[a][b] = sim[a].get(b, 0.0) + 0.1
-                            sim[b][a] = sim[b].get(a, 0.0) + 0.1
-                self.post_similarity_matrix = sim
+            params = None
+            if watermark is not None:
+                # Rows sharing the watermark timestamp are re-read; dedup makes that harmless
+                query += ' WHERE "createdAt" >= $1'
+                params = (watermark,)
+            query += ' ORDER BY "createdAt" ASC'
+            
+            loaded = 0
+            added = 0
+            async for rows in db.stream_query(query, params, chunk_size=settings.WARM_LOAD_CHUNK_SIZE):
+                for r in rows:
+                    uid = r.get('userId')
+                    pid = r.get('postId')
+                    if uid and pid and self._add_interaction(
+                        uid, pid, r['createdAt'].timestamp(), r.get('sessionId'), r.get('durationMs')
+                    ):
+                        self.author_index.record_view(uid, pid, r.get('postAuthorId'))
+                        added += 1
+                loaded += len(rows)
+                self.warmup.add_rows(len(rows))
+                watermark = rows[-1]['createdAt']
+            
+            if loaded:
+                self.coview.compact()
                 self.model_loaded = True
-                logger.info(
-                    f"Warm-loaded {sum(len(v) for v in rebuilt.values())} interactions from DB"
-                )
+                # Persist the merged state together with the new watermark
+                self.interaction_store.watermark = watermark
+                await asyncio.shield(self._schedule_snapshot())
+                logger.info(f"Warm-loaded {loaded} views ({added} new interactions) from DB")
         except Exception as e:
             logger.warning(f"Could not load interactions from DB: {e}")
+            self.warmup.fail(e)
+    
+    def _add_interaction(
+        self,
+        user_id: str,
+        post_id: str,
+        viewed_at: Optional[float] = None,
+        session_id: Optional[str] = None,
+        duration_ms: Optional[int] = None
+    ) -> bool:
+        """Record a view in the user's history; returns False if it was already known"""
+        history = self.user_post_interactions[user_id]
+        if post_id in history:
+            return False
+        viewed_at = viewed_at if viewed_at is not None else time.time()
+        # Update similarity matrix based on co-viewing patterns
+        self._update_similarity_matrix(user_id, post_id, viewed_at, session_id, duration_ms)
+        if history and viewed_at < next(reversed(history.values())):
+            # Backdated, e.g. consumed from an event backlog: histories stay in time order,
+            # which eviction below and _precomputed_ranking rely on
+            items = list(history.items())
+            position = bisect_right([t for _, t in items], viewed_at)
+            history.clear()
+            history.update(items[:position])
+            history[post_id] = viewed_at
+            history.update(items[position:])
+        else:
+            history[post_id] = viewed_at
+        if session_id is not None or duration_ms is not None:
+            self.view_context[user_id][post_id] = (session_id, duration_ms)
+        self.result_cache.pop(user_id)
+        self._shared_dirty = True
+        if self._shared_changed_users is not None:
+            self._shared_changed_users.add(user_id)
+        self._snapshot_changed_users.add(user_id)
+        self._read_model_dirty = True
+        # Forget the oldest view once the user's history is full
+        if len(history) > settings.RECO_MAX_HISTORY_PER_USER:
+            oldest = next(iter(history))
+            del history[oldest]
+            self.view_context.get(user_id, {}).pop(oldest, None)
+        return True
+    
+    def _rebuild_similarity_matrix(self) -> None:
+        """Rebuild co-view weights from the loaded interaction history"""
+        coview = self._new_coview()
+        histories = list(self.user_post_interactions.values())
+        total = sum(len(h) for h in histories)
+        posts = np.fromiter(
+            (coview.posts.intern(p) for h in histories for p in h),
+            dtype=np.int64,
+            count=total
+        )
+        times = np.fromiter((t for h in histories for t in h.values()), dtype=np.float64, count=total)
+        owners = np.repeat(np.arange(len(histories)), [len(h) for h in histories])
+        # Session of each view as an integer code (-1 when unknown) and its dwell factor
+        session_codes: Dict[str, int] = {}
+        sessions = np.full(total, -1, dtype=np.int64)
+        durations = np.full(total, np.nan)
+        position = 0
+        for uid, history in self.user_post_interactions.items():
+            contexts = self.view_context.get(uid)
+            if contexts:
+                for i, post_id in enumerate(history):
+                    session_id, duration_ms = contexts.get(post_id, (None, None))
+                    if session_id is not None:
+                        sessions[position + i] = session_codes.setdefault(session_id, len(session_codes))
+                    if duration_ms is not None:
+                        durations[position + i] = duration_ms
+            position += len(history)
+        factors = dwell_factor(durations)
+        # Runs of consecutive views from the same user and session
+        runs = np.cumsum(np.concatenate([[0], (owners[1:] != owners[:-1]) | (sessions[1:] != sessions[:-1])]))
+        # Pair every view with the views up to RECO_HISTORY_WINDOW positions before it,
+        # staying inside the later view's session run when it has a session
+        for offset in range(1, settings.RECO_HISTORY_WINDOW + 1):
+            same_user = owners[offset:] == owners[:-offset]
+            if not same_user.any():
+                break
+            pair = same_user & ((sessions[offset:] < 0) | (runs[offset:] == runs[:-offset]))
+            coview.add_many(
+                posts[offset:][pair],
+                posts[:-offset][pair],
+                coview_weight(times[offset:][pair] - times[:-offset][pair])
+                * np.sqrt(factors[offset:][pair] * factors[:-offset][pair])
+            )
+        coview.compact()
+        self.coview = coview
+        self.similarity = None
+        self.result_cache.clear()
     
     async def track_view(
         self,
         user_id: str,
         post_id: str,
         post_content: Optional[str] = None,
-        post_author_id: Optional[str] = None
+        post_author_id: Optional[str] = None,
+        duration_ms: Optional[int] = None,
+        session_id: Optional[str] = None
     ) -> None:
         """Track a user viewing a post and update the model"""
-        try:
-            # Add interaction
-            if post_id not in self.user_post_interactions[user_id]:
-                self.user_post_interactions[user_id].append(post_id)
-            
-            # Update similarity matrix based on co-viewing patterns
-            await self._update_similarity_matrix(user_id, post_id)
-            
-            # Save interactions
-            self.save_interactions()
-            self.model_loaded = True
-            
-            # Persist to DB (best-effort)
+        with TRACK_VIEW_SECONDS.time():
             try:
-                await self._ensure_views_table()
-                await db.execute(
-                    """
-                    INSERT INTO "RecommendationView" ("userId", "postId", "postContent", "postAuthorId")
-                    VALUES ($1, $2, $3, $4)
-                    """,
-                    (user_id, post_id, post_content, post_author_id)
+                viewed_at = time.time()
+                if self.role == 'reader':
+                    # Only the writer mutates the model; it applies spooled views and republishes
+                    self._spool_view(user_id, post_id, viewed_at, post_author_id, session_id, duration_ms)
+                elif not self.ready:
+                    # The model is still loading; _mark_ready applies these in order
+                    self._pending_views.append(
+                        (user_id, post_id, viewed_at, post_author_id, session_id, duration_ms)
+                    )
+                else:
+                    self._record_view(user_id, post_id, viewed_at, post_author_id, session_id, duration_ms)
+                if self.content_index is not None:
+                    self.content_index.enqueue(post_id, post_content)
+                
+                # Persist to DB (best-effort, batched in the background)
+                await self.view_writer.enqueue(
+                    user_id,
+                    post_id,
+                    post_content,
+                    post_author_id,
+                    session_id=session_id,
+                    duration_ms=duration_ms
                 )
+                
+                logger.info(f"Tracked view: user={user_id}, post={post_id}")
+                
             except Exception as e:
-                logger.warning(f"Failed to persist view to DB: {e}")
-            
-            logger.info(f"Tracked view: user={user_id}, post={post_id}")
-            
-        except Exception as e:
-            logger.error(f"Error tracking view: {e}")
-            raise
+                logger.error(f"Error tracking view: {e}")
+                raise
+    
+    async def track_views(self, views: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Track a batch of views in one pass and queue them for persistence in one step.
+
+        Each view has the fields of a single track-view request, plus an
+        optional ``viewed_at`` (epoch seconds, capped at now) for events
+        replayed from a stream. Returns (views tracked, new interactions).
+        """
+        now = time.time()
+        batch = [
+            (
+                v['user_id'],
+                v['post_id'],
+                min(v.get('viewed_at') or now, now),
+                v.get('post_author_id'),
+                v.get('session_id'),
+                v.get('duration_ms')
+            )
+            for v in views
+        ]
+        if not batch:
+            return 0, 0
+        
+        with TRACK_VIEWS_SECONDS.time():
+            added = 0
+            if self.role == 'reader':
+                for view in batch:
+                    self._spool_view(*view)
+            elif not self.ready:
+                self._pending_views.extend(batch)
+            else:
+                added = self._record_views(batch)
+            if self.content_index is not None:
+                for v in views:
+                    self.content_index.enqueue(v['post_id'], v.get('post_content'))
+        
+        # Persist to DB (best-effort, written in COPY batches by the background flusher)
+        self.view_writer.enqueue_many([
+            (
+                user_id,
+                post_id,
+                v.get('post_content'),
+                post_author_id,
+                datetime.fromtimestamp(viewed_at, timezone.utc),
+                session_id,
+                duration_ms
+            )
+            for v, (user_id, post_id, viewed_at, post_author_id, session_id, duration_ms) in zip(views, batch)
+        ])
+        logger.info(f"Tracked {len(batch)} views ({added} new interactions)")
+        return len(batch), added
+    
+    def _record_views(self, views: List[tuple]) -> int:
+        """Apply views to the model and the log, syncing the log and checking for a snapshot once"""
+        added = 0
+        for user_id, post_id, viewed_at, post_author_id, session_id, duration_ms in views:
+            if self._add_interaction(user_id, post_id, viewed_at, session_id, duration_ms):
+                self.interaction_store.append(user_id, post_id, viewed_at, session_id, duration_ms, sync=False)
+                self.author_index.record_view(user_id, post_id, post_author_id)
+                added += 1
+        self.interaction_store.schedule_sync()
+        if self.interaction_store.should_snapshot():
+            self._schedule_snapshot()
+        self.model_loaded = True
+        return added
+    
+    def _record_view(
+        self,
+        user_id: str,
+        post_id: str,
+        viewed_at: float,
+        post_author_id: Optional[str],
+        session_id: Optional[str],
+        duration_ms: Optional[int]
+    ) -> None:
+        """Apply a view to the model and the interaction log"""
+        # Add interaction and update co-view weights if it is new
+        if self._add_interaction(user_id, post_id, viewed_at, session_id, duration_ms):
+            # Persist the new interaction (O(1) log append)
+            self.interaction_store.append(user_id, post_id, viewed_at, session_id, duration_ms)
+            self.author_index.record_view(user_id, post_id, post_author_id)
+        
+        if self.interaction_store.should_snapshot():
+            self._schedule_snapshot()
+        self.model_loaded = True
     
-    async def _update_similarity_matrix(
+    def _spool_view(
         self,
         user_id: str,
-        viewed_post_id: str
+        post_id: str,
+        viewed_at: float,
+        post_author_id: Optional[str],
+        session_id: Optional[str],
+        duration_ms: Optional[int]
+    ) -> None:
+        """Hand a view tracked by a reader worker over to the writer"""
+        history = self.user_post_interactions.get(user_id)
+        if history and post_id in history:
+            return
+        record: Dict[str, Any] = {'u': user_id, 'p': post_id, 't': viewed_at}
+        if post_author_id:
+            record['a'] = post_author_id
+        if session_id is not None:
+            record['s'] = session_id
+        if duration_ms is not None:
+            record['d'] = duration_ms
+        self.view_spool.append(record)
+        self.result_cache.pop(user_id)
+        self.author_index.record_view(user_id, post_id, post_author_id)
+    
+    def _update_similarity_matrix(
+        self,
+        user_id: str,
+        viewed_post_id: str,
+        viewed_at: float,
+        session_id: Optional[str] = None,
+        duration_ms: Optional[int] = None
     ) -> None:
         """Update similarity matrix based on co-viewing patterns"""
         try:
-            # Get all posts this user has viewed
-            user_viewed_posts = self.user_post_interactions[user_id]
+            history = self.user_post_interactions[user_id]
+            # Only pair with the views just before this one, so cost is bounded by the window
+            recent = islice(
+                (item for item in reversed(history.items()) if item[1] <= viewed_at),
+                settings.RECO_HISTORY_WINDOW
+            )
+            contexts = self.view_context.get(user_id) or {}
+            posts = self.coview.posts
+            viewed_idx = posts.intern(viewed_post_id)
+            others: List[int] = []
+            ages: List[float] = []
+            durations: List[float] = []
+            for other_post_id, other_viewed_at in recent:
+                other_session, other_duration = contexts.get(other_post_id, (None, None))
+                # Sessioned views only pair within their session (views are in time order)
+                if session_id is not None and other_session != session_id:
+                    break
+                if other_post_id != viewed_post_id:
+                    others.append(posts.intern(other_post_id))
+                    ages.append(viewed_at - other_viewed_at)
+                    durations.append(np.nan if other_duration is None else other_duration)
+            if history and viewed_at < next(reversed(history.values())):
+                # Backdated: the views recorded after it pair with it as if it had arrived in order
+                later = islice(
+                    (item for item in history.items() if item[1] > viewed_at),
+                    settings.RECO_HISTORY_WINDOW
+                )
+                for other_post_id, other_viewed_at in later:
+                    other_session, other_duration = contexts.get(other_post_id, (None, None))
+                    if other_session is not None and other_session != session_id:
+                        continue
+                    others.append(posts.intern(other_post_id))
+                    ages.append(other_viewed_at - viewed_at)
+                    durations.append(np.nan if other_duration is None else other_duration)
+            if not others:
+                return
             
-            # For each post the user has viewed, increase similarity with the new post
-            for other_post_id in user_viewed_posts:
-                if other_post_id == viewed_post_id:
-                    continue
-                
-                # Initialize similarity dicts if needed
-                if viewed_post_id not in self.post_similarity_matrix:
-                    self.post_similarity_matrix[viewed_post_id] = {}
-                if other_post_id not in self.post_similarity_matrix:
-                    self.post_similarity_matrix[other_post_id] = {}
-                
-                # Increase similarity (co-viewing indicates similarity)
-                similarity_increment = 0.1
-                
-                # Update both directions (symmetric)
-                self.post_similarity_matrix[viewed_post_id][other_post_id] = \
-                    self.post_similarity_matrix[viewed_post_id].get(other_post_id, 0) + similarity_increment
-                self.post_similarity_matrix[other_post_id][viewed_post_id] = \
-                    self.post_similarity_matrix[other_post_id].get(viewed_post_id, 0) + similarity_increment
+            if self._similarity_backlog is not None:
+                self._similarity_backlog.append((viewed_idx, others))
+            if self.similarity is not None:
+                # Normalized similarities count co-occurrences like the build does:
+                # each pair adds one, rescaled to the built matrix per direction
+                forward, backward = self.similarity.normalize(
+                    np.full(len(others), viewed_idx), np.array(others), np.ones(len(others))
+                )
+                self.coview.add_neighbors(viewed_idx, others, forward.tolist(), backward.tolist())
+                return
+
+            # Co-viewing indicates similarity, weighted by how long both posts were read;
+            # the matrix stores both directions
+            weights = coview_weight(np.array(ages)) * np.sqrt(
+                dwell_factor(duration_ms) * dwell_factor(np.array(durations))
+            )
+            self.coview.add_neighbors(viewed_idx, others, weights.tolist())
                 
         except Exception as e:
             logger.error(f"Error updating similarity matrix: {e}")
@@ -197,141 +1132,436 @@ class RecommendationService:
         self,
         user_id: str,
         page: int = 1,
-        limit: int = 10
-    ) -> (List[Dict[str, Any]], int):
-        """Get post recommendations for a user based on their viewing history"""
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = True
+    ) -> (List[Dict[str, Any]], Optional[int], Optional[str]):
+        """Get post recommendations for a user based on their viewing history.
+
+        Returns (posts, total, next_cursor). When a cursor is given the page
+        continues right after the cursor's post in the feed it came from
+        (keyset pagination) and ``page`` is ignored.
+        """
+        # A malformed cursor is a client error, so decode it outside the fallback below
+        after = decode_cursor(cursor) if cursor else None
+        source = after['src'] if after else None
+        if not self.ready:
+            # A half-loaded model would recommend from partial histories
+            return await self._popular_fallback(
+                page, limit, after=after if source == 'popular' else None, include_total=include_total
+            )
         try:
             # Get posts user has viewed
-            viewed_post_ids = self.user_post_interactions.get(user_id, [])
+            viewed_post_ids = list(self.user_post_interactions.get(user_id, ()))
             
             if not viewed_post_ids:
                 # If user has no viewing history, return popular posts with proper pagination/total
-                posts, total = await self.get_popular_posts_paged(page=page, limit=limit)
-                return posts, total
-            
-            # Calculate recommendation scores and per-source contributions
-            recommendation_scores: Dict[str, float] = {}
-            contribution_matrix: Dict[str, Dict[str, float]] = {}
+                return await self.get_popular_posts_paged(
+                    page=page, limit=limit, after=after, include_total=include_total
+                )
             
-            # For each post the user has viewed, find similar posts
-            for viewed_post_id in viewed_post_ids:
-                similar_posts = self.post_similarity_matrix.get(viewed_post_id, {})
-                
-                for similar_post_id, similarity in similar_posts.items():
-                    # Don't recommend posts user has already viewed
-                    if similar_post_id not in viewed_post_ids:
-                        recommendation_scores[similar_post_id] = \
-                            recommendation_scores.get(similar_post_id, 0) + similarity
-                        # Track contribution from this viewed post
-                        if similar_post_id not in contribution_matrix:
-                            contribution_matrix[similar_post_id] = {}
-                        contribution_matrix[similar_post_id][viewed_post_id] = \
-                            contribution_matrix[similar_post_id].get(viewed_post_id, 0) + similarity
+            if source in (None, 'similarity'):
+                model = self.read_model()
+                posts, total, next_cursor = await self._get_similarity_posts(
+                    user_id, model, model.history(viewed_post_ids), page, limit, after
+                )
+                # If no recommended ids from similarity here, we'll try author-based next
+                if posts or source == 'similarity':
+                    return posts, total, next_cursor
             
-            # Sort by score (high to low accuracy)
-            sorted_posts = sorted(
-                recommendation_scores.items(),
-                key=lambda x: x[1],
-                reverse=True
+            # Fallback to popular posts with pagination
+            # Try author-based before popular
+            if source in (None, 'author'):
+                author_posts, author_total, next_cursor = await self.get_author_based_posts(
+                    user_id=user_id,
+                    page=page,
+                    limit=limit,
+                    exclude_ids=viewed_post_ids,
+                    after=after,
+                    include_total=include_total
+                )
+                if author_posts or source == 'author':
+                    for p in author_posts:
+                        p['similarity_score'] = p.get('similarity_score') or 0.0
+                        p['source'] = 'author'
+                    return author_posts, author_total, next_cursor
+
+            return await self._popular_fallback(
+                page, limit, exclude_ids=viewed_post_ids, after=after, include_total=include_total
             )
-            total = len(sorted_posts)
-            
-            # Pagination slice
-            start = (page - 1) * limit
-            end = start + limit
-            paged_posts = sorted_posts[start:end]
             
-            recommended_post_ids = [post_id for post_id, _ in paged_posts]
+        except ScoringTimeout:
+            SCORING_TIMEOUTS.inc()
+            logger.warning(f"Scoring for user {user_id} timed out, serving popular posts")
+            return await self._popular_fallback(
+                page, limit, exclude_ids=viewed_post_ids, include_total=include_total
+            )
+        except Exception as e:
+            logger.error(f"Error getting recommendations: {e}")
+            return await self._popular_fallback(page, limit)
+    
+    async def _popular_fallback(
+        self,
+        page: int,
+        limit: int,
+        exclude_ids: Optional[List[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+        include_total: bool = True
+    ) -> (List[Dict[str, Any]], Optional[int], Optional[str]):
+        """Popular posts tagged as a fallback feed"""
+        posts, total, next_cursor = await self.get_popular_posts_paged(
+            page=page,
+            limit=limit,
+            exclude_ids=exclude_ids,
+            after=after,
+            include_total=include_total
+        )
+        for p in posts:
+            p['similarity_score'] = p.get('similarity_score') or 0.0
+            p['score_matrix'] = None
+            p['source'] = 'popular'
+        return posts, total, next_cursor
+    
+    async def _get_similarity_posts(
+        self,
+        user_id: str,
+        model: CoViewSnapshot,
+        history: np.ndarray,
+        page: int,
+        limit: int,
+        after: Optional[Dict[str, Any]] = None
+    ) -> (List[Dict[str, Any]], int, Optional[str]):
+        """One page of co-view recommendations, by page number or after a cursor"""
+        with _RANK_SECONDS.time():
+            if after is None:
+                # Pagination slice
+                start = (page - 1) * limit
+                end = start + limit
+                ranked = await self._rank_candidates(user_id, model, history, end)
+                total = ranked.total
+                paged = ranked.post_idx[start:end]
+                paged_scores = ranked.scores[start:end]
+                has_more = total > end
+            else:
+                paged, paged_scores, total, has_more = await self._rank_after(
+                    user_id, model, history, after, limit
+                )
+        
+        recommended_post_ids = model.posts.keys(paged.tolist())
+        if not recommended_post_ids:
+            return [], total, None
+        
+        # Get full post details from database
+        with _POST_DETAILS_SECONDS.time():
+            recommended_posts = await self.get_post_details(recommended_post_ids)
+        
+        with _ANNOTATE_SECONDS.time():
+            # Add similarity scores and score_matrix (per-viewed-post contributions)
+            score_dict = {
+                post_id: round(float(score), 6)
+                for post_id, score in zip(recommended_post_ids, paged_scores.tolist())
+            }
+            contribution_matrix = {
+                model.posts.key(candidate): {
+                    model.posts.key(source): round(value, 6)
+                    for source, value in contrib.items()
+                }
+                for candidate, contrib in model.contributions(history, paged.tolist()).items()
+            }
+            for post in recommended_posts:
+                post['similarity_score'] = float(score_dict.get(post['id'], 0.0))
+                contrib = contribution_matrix.get(post['id'])
+                if contrib:
+                    # Ensure floats, and sort contributions by value desc
+                    post['score_matrix'] = {
+                        k: float(v) for k, v in sorted(contrib.items(), key=lambda x: x[1], reverse=True)
+                    }
+                else:
+                    post['score_matrix'] = None
             
-            # If no recommended ids from similarity here, we'll try author-based next
+            # Mark source
+            for p in recommended_posts:
+                p['source'] = 'similarity'
+            # The cursor follows ranking order, not the createdAt order of the details
+            next_cursor = None
+            if has_more:
+                next_cursor = encode_cursor(
+                    'similarity', recommended_post_ids[-1], score=float(paged_scores[-1])
+                )
+        return recommended_posts, total, next_cursor
+    
+    async def get_batch_recommendations(
+        self,
+        user_ids: List[str],
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        """First page of recommendations for many users, sharing scoring and DB fetches.
+
+        Returns user_id -> (posts, total). Users with co-view candidates are
+        scored together in one pass, and all of their posts are fetched with
+        a single details query; the rest fall back to the regular feed.
+        """
+        results: Dict[str, Any] = {}
+        user_ids = list(dict.fromkeys(user_ids))
+        scored_users: List[str] = []
+        histories: List[np.ndarray] = []
+        # Until the model is ready nobody is scored, so an empty snapshot will do
+        model = self.read_model() if self.ready else self._new_coview().snapshot()
+        for user_id in user_ids if self.ready else ():
+            viewed_post_ids = list(self.user_post_interactions.get(user_id, ()))
+            if viewed_post_ids:
+                scored_users.append(user_id)
+                histories.append(model.history(viewed_post_ids))
+        
+        try:
+            boosts = None
+            if self.content_index is not None and len(self.content_index.index):
+                boosts = [self._content_candidates(user_id, model) for user_id in scored_users]
+            with BATCH_SCORING_SECONDS.time():
+                gathered, ranked = await self.scoring_pool.rank_many(model, histories, limit, boosts=boosts)
+            owners, sources, cols, vals = gathered
+            n = max(model.n_posts, 1)
+            pair_owners, pair_posts, pair_scores, totals = ranked
             
-            # Get full post details from database
-            if recommended_post_ids:
-                recommended_posts = await self.get_post_details(recommended_post_ids)
-                
-                # Add similarity scores and score_matrix (per-viewed-post contributions)
-                score_dict = dict(sorted_posts)
-                for post in recommended_posts:
-                    post['similarity_score'] = float(score_dict.get(post['id'], 0.0))
-                    contrib = contribution_matrix.get(post['id'])
-                    if contrib:
-                        # Ensure floats, and sort contributions by value desc
-                        post['score_matrix'] = {
-                            k: float(v) for k, v in sorted(contrib.items(), key=lambda x: x[1], reverse=True)
-                        }
-                    else:
-                        post['score_matrix'] = None
-                
-                # Mark source
-                for p in recommended_posts:
-                    p['source'] = 'similarity'
-                return recommended_posts, total
+            # Per-source contributions for the selected pairs only
+            selected = np.isin(owners * n + cols, pair_owners * n + pair_posts)
+            contributions: Dict[tuple, Dict[int, float]] = defaultdict(dict)
+            for owner, source, col, val in zip(
+                owners[selected].tolist(), sources[selected].tolist(),
+                cols[selected].tolist(), vals[selected].tolist()
+            ):
+                contrib = contributions[(owner, col)]
+                contrib[source] = contrib.get(source, 0.0) + val
             
-            # Fallback to popular posts with pagination
-            # Try author-based before popular
-            author_posts, author_total = await self.get_author_based_posts(
-                user_id=user_id,
-                page=page,
-                limit=limit,
-                exclude_ids=viewed_post_ids
+            # One details query for the union of everyone's candidates
+            details = {
+                p['id']: p
+                for p in await self.get_post_details(
+                    model.posts.keys(np.unique(pair_posts).tolist())
+                )
+            }
+            bounds = np.searchsorted(pair_owners, np.arange(len(scored_users) + 1))
+            keys = model.posts
+            for i, user_id in enumerate(scored_users):
+                posts = []
+                for post_idx, score in zip(
+                    pair_posts[bounds[i]:bounds[i + 1]].tolist(),
+                    pair_scores[bounds[i]:bounds[i + 1]].tolist()
+                ):
+                    detail = details.get(keys.key(post_idx))
+                    if detail is None:
+                        continue
+                    post = dict(detail)
+                    post['similarity_score'] = round(score, 6)
+                    contrib = contributions.get((i, post_idx))
+                    post['score_matrix'] = {
+                        keys.key(source): round(value, 6)
+                        for source, value in sorted(contrib.items(), key=lambda x: x[1], reverse=True)
+                    } if contrib else None
+                    post['source'] = 'similarity'
+                    posts.append(post)
+                if posts:
+                    results[user_id] = (posts, int(totals[i]))
+        except Exception as e:
+            logger.error(f"Error scoring batch recommendations: {e}")
+        
+        # Everyone else gets the regular feed; history-less users share one popular page
+        popular = None
+        for user_id in user_ids:
+            if user_id in results:
+                continue
+            if self.ready and self.user_post_interactions.get(user_id):
+                posts, total, _ = await self.get_recommendations(user_id, page=1, limit=limit)
+            else:
+                if popular is None:
+                    popular = await self.get_popular_posts_paged(page=1, limit=limit)
+                posts, total = [dict(p) for p in popular[0]], popular[1]
+            results[user_id] = (posts, total)
+        return {user_id: results[user_id] for user_id in user_ids}
+    
+    async def _rank_candidates(
+        self,
+        user_id: str,
+        model: CoViewSnapshot,
+        history: np.ndarray,
+        depth: int
+    ) -> RankedCandidates:
+        """Rank at least the top `depth` co-view candidates, using the per-user cache"""
+        cacheable = depth <= settings.RECO_RESULT_CACHE_DEPTH
+        if cacheable:
+            cached = self.result_cache.get(user_id)
+            # Rankings made against a replaced matrix number posts differently
+            if cached is not None and cached.posts is model.posts:
+                _RANKED_FROM_CACHE.inc()
+                return cached
+            depth = settings.RECO_RESULT_CACHE_DEPTH
+        
+        ranked = self._precomputed_ranking(user_id, model, depth)
+        if ranked is not None:
+            _RANKED_FROM_FEED.inc()
+            if cacheable:
+                self.result_cache.set(user_id, ranked)
+            return ranked
+        
+        _RANKED_BY_SCORING.inc()
+        boost = self._content_candidates(user_id, model)
+        with SCORING_SECONDS.time():
+            ranked_idx, scores, total = await self.scoring_pool.rank(
+                model, history, depth, timeout=settings.RECO_SCORING_TIMEOUT, boost=boost
             )
-            if author_posts:
-                for p in author_posts:
-                    p['similarity_score'] = p.get('similarity_score') or 0.0
-                    p['source'] = 'author'
-                return author_posts, author_total
+        ranked = RankedCandidates(ranked_idx, scores, total, model.posts)
+        if cacheable:
+            self.result_cache.set(user_id, ranked)
+        return ranked
+    
+    def _content_candidates(
+        self,
+        user_id: str,
+        model: CoViewSnapshot
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Posts whose embeddings are closest to the user's recent views, as (post index, weight)"""
+        if self.content_index is None or not len(self.content_index.index):
+            return None
+        return self._similar_posts(self._recent_views(user_id), model.posts, model.n_posts)
 
-            posts, total = await self.get_popular_posts_paged(page=page, limit=limit, exclude_ids=viewed_post_ids)
-            for p in posts:
-                p['similarity_score'] = p.get('similarity_score') or 0.0
-                p['score_matrix'] = None
-                p['source'] = 'popular'
-            return posts, total
-            
-        except Exception as e:
-            logger.error(f"Error getting recommendations: {e}")
-            posts, total = await self.get_popular_posts_paged(page=page, limit=limit)
-            for p in posts:
-                p['similarity_score'] = p.get('similarity_score') or 0.0
-                p['score_matrix'] = None
-                p['source'] = 'popular'
-            return posts, total
+    def _recent_views(self, user_id: str) -> List[str]:
+        return list(islice(
+            reversed(self.user_post_interactions.get(user_id, {})), settings.RECO_HISTORY_WINDOW
+        ))
+
+    def _similar_posts(
+        self,
+        recent: List[str],
+        post_index: IdIndex,
+        n_posts: int
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Content candidates for recently viewed posts among the first n_posts of post_index"""
+        with CONTENT_SEARCH_SECONDS.time():
+            post_ids, sims = self.content_index.similar_to(
+                recent, settings.RECO_EMBEDDING_CANDIDATES + len(recent)
+            )
+        posts: List[int] = []
+        weights: List[float] = []
+        for post_id, sim in zip(post_ids, sims.tolist()):
+            idx = post_index.get(post_id)
+            # Posts interned after the snapshot are not scored yet
+            if idx is not None and idx < n_posts and sim > 0:
+                posts.append(idx)
+                weights.append(sim * settings.RECO_EMBEDDING_WEIGHT)
+        if not posts:
+            return None
+        return np.array(posts, dtype=np.int64), np.array(weights)
+    
+    def _precomputed_ranking(
+        self,
+        user_id: str,
+        model: CoViewSnapshot,
+        depth: int
+    ) -> Optional[RankedCandidates]:
+        """Ranking from the offline feed store, if it is deep and fresh enough for this user"""
+        # Kept current by feed_reader.run(); nothing is read from disk here
+        feeds = self.feed_reader.feeds
+        if feeds is None or depth > feeds.depth:
+            return None
+        if time.time() - feeds.generated_at > settings.FEED_STORE_MAX_AGE:
+            return None
+        # Views recorded after the run aren't reflected in the stored feed
+        history = self.user_post_interactions.get(user_id)
+        if not history or next(reversed(history.values())) > feeds.generated_at:
+            return None
+        entry = feeds.get(user_id)
+        if entry is None:
+            return None
+        post_ids, scores, total = entry
+        # A view applied after the run but dated before it (consumed from a backlog) is only caught here
+        if any(post_id in history for post_id in post_ids):
+            return None
+        post_idx = model.history(post_ids)
+        if post_idx.shape[0] != len(post_ids):
+            return None
+        return RankedCandidates(post_idx, scores, total, model.posts)
+    
+    async def _rank_after(
+        self,
+        user_id: str,
+        model: CoViewSnapshot,
+        history: np.ndarray,
+        after: Dict[str, Any],
+        limit: int
+    ) -> (np.ndarray, np.ndarray, int, bool):
+        """Rank the `limit` candidates that follow a similarity cursor's (score, post) key"""
+        score = after['s']
+        after_idx = model.posts.get(after['i'])
+        if after_idx is None:
+            after_idx = -1
+        ranked = await self._rank_candidates(user_id, model, history, settings.RECO_RESULT_CACHE_DEPTH)
+        following = np.flatnonzero(
+            (ranked.scores < score) | ((ranked.scores == score) & (ranked.post_idx > after_idx))
+        )[:limit + 1]
+        if following.shape[0] > limit or ranked.post_idx.shape[0] == ranked.total:
+            # The cached ranking reaches far enough
+            window = following[:limit]
+            return ranked.post_idx[window], ranked.scores[window], ranked.total, following.shape[0] > limit
+        
+        # Past the cached depth: rescore, keep candidates after the key and rank only those
+        boost = self._content_candidates(user_id, model)
+        with SCORING_SECONDS.time():
+            top, scores, _ = await self.scoring_pool.rank(
+                model, history, limit + 1, after=(score, after_idx),
+                timeout=settings.RECO_SCORING_TIMEOUT, boost=boost
+            )
+        return top[:limit], scores[:limit], ranked.total, top.shape[0] > limit
     
     async def get_post_details(
         self,
         post_ids: List[str]
     ) -> List[Dict[str, Any]]:
-        """Get full post details from database"""
+        """Get full post details, from the post cache where possible"""
         if not post_ids:
             return []
         
         try:
-            # Create placeholders for IN clause
-            placeholders = ','.join(['$' + str(i+1) for i in range(len(post_ids))])
-            query = f"""
-                SELECT 
-                    p.id,
-                    p."authorId",
-                    p.content,
-                    p.images,
-                    p."createdAt",
-                    p."updatedAt",
-                    u.username,
-                    u."firstName",
-                    u."lastName",
-                    u.image as author_image,
-                    COUNT(DISTINCT l.id)::int as like_count,
-                    COUNT(DISTINCT c.id)::int as comment_count
-                FROM "Post" p
-                INNER JOIN "User" u ON p."authorId" = u.id
-                LEFT JOIN "Like" l ON p.id = l."postId"
-                LEFT JOIN "Comment" c ON p.id = c."postId"
-                WHERE p.id IN ({placeholders})
-                GROUP BY p.id, u.id
-                ORDER BY p."createdAt" DESC
-            """
+            posts: List[Dict[str, Any]] = []
+            missing: List[str] = []
+            for post_id in dict.fromkeys(post_ids):
+                cached = self.post_cache.get(post_id)
+                if cached is not None:
+                    posts.append(cached)
+                else:
+                    missing.append(post_id)
+            
+            if missing:
+                # Fetch all misses in one query
+                placeholders = ','.join(['$' + str(i+1) for i in range(len(missing))])
+                counts = _post_counts_sql()
+                query = f"""
+                    SELECT 
+                        p.id,
+                        p."authorId",
+                        p.content,
+                        p.images,
+                        p."createdAt",
+                        p."updatedAt",
+                        u.username,
+                        u."firstName",
+                        u."lastName",
+                        u.image as author_image,
+                        {counts['likes']}::int as like_count,
+                        {counts['comments']}::int as comment_count
+                    FROM "Post" p
+                    INNER JOIN "User" u ON p."authorId" = u.id
+                    {counts['joins']}
+                    WHERE p.id IN ({placeholders})
+                    {counts['group_by']}
+                """
+                rows = await db.execute_query(query, tuple(missing))
+                for row in rows:
+                    self.post_cache.set(row['id'], row)
+                posts.extend(rows)
             
-            posts = await db.execute_query(query, tuple(post_ids))
+            # Callers annotate the rows, so hand out copies of cached entries
+            posts = [dict(p) for p in posts]
+            posts.sort(key=lambda p: p['createdAt'], reverse=True)
             return posts
             
         except Exception as e:
@@ -342,9 +1572,21 @@ class RecommendationService:
         self,
         page: int = 1,
         limit: int = 10,
-        exclude_ids: Optional[List[str]] = None
-    ) -> (List[Dict[str, Any]], int):
+        exclude_ids: Optional[List[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+        include_total: bool = True
+    ) -> (List[Dict[str, Any]], Optional[int], Optional[str]):
         """Get popular posts with pagination and optional exclusion list."""
+        if after is not None and not self.popularity.ready:
+            # Cursors are resolved against the leaderboard, so build it on demand
+            try:
+                await self.popularity.refresh(_post_counts_sql())
+            except Exception as e:
+                logger.warning(f"Could not refresh popularity leaderboard: {e}")
+        if self.popularity.ready:
+            return await self._get_popular_posts_from_leaderboard(page, limit, exclude_ids, after, include_total)
+        if after is not None:
+            return [], None, None
         try:
             where_exclusion = ""
             params: List[Any] = []
@@ -354,18 +1596,21 @@ class RecommendationService:
                 params.extend(exclude_ids)
 
             # Count query for total
-            count_query = f"""
-                SELECT COUNT(*)::int AS total
-                FROM "Post" p
-                INNER JOIN "User" u ON p."authorId" = u.id
-                WHERE u.status = 'ACTIVE'{where_exclusion}
-            """
-            count_rows = await db.execute_query(count_query, tuple(params) if params else None)
-            total = count_rows[0]['total'] if count_rows else 0
+            total = None
+            if include_total:
+                count_query = f"""
+                    SELECT COUNT(*)::int AS total
+                    FROM "Post" p
+                    INNER JOIN "User" u ON p."authorId" = u.id
+                    WHERE u.status = 'ACTIVE'{where_exclusion}
+                """
+                count_rows = await db.execute_query(count_query, tuple(params) if params else None)
+                total = count_rows[0]['total'] if count_rows else 0
 
-            # Data query with LIMIT/OFFSET
+            # Data query with LIMIT/OFFSET, one extra row tells whether a next page exists
             offset = (page - 1) * limit
-            params_with_paging = list(params) + [limit, offset]
+            params_with_paging = list(params) + [limit + 1, offset]
+            counts = _post_counts_sql()
             data_query = f"""
                 SELECT 
                     p.id,
@@ -378,37 +1623,77 @@ class RecommendationService:
                     u."firstName",
                     u."lastName",
                     u.image as author_image,
-                    COUNT(DISTINCT l.id)::int as like_count,
-                    COUNT(DISTINCT c.id)::int as comment_count,
-                    (COUNT(DISTINCT l.id) * 2 + COUNT(DISTINCT c.id))::int as popularity_score
+                    {counts['likes']}::int as like_count,
+                    {counts['comments']}::int as comment_count,
+                    ({counts['likes']} * 2 + {counts['comments']})::int as popularity_score
                 FROM "Post" p
                 INNER JOIN "User" u ON p."authorId" = u.id
-                LEFT JOIN "Like" l ON p.id = l."postId"
-                LEFT JOIN "Comment" c ON p.id = c."postId"
+                {counts['joins']}
                 WHERE u.status = 'ACTIVE'{where_exclusion}
-                GROUP BY p.id, u.id
-                ORDER BY popularity_score DESC, p."createdAt" DESC
+                {counts['group_by']}
+                ORDER BY popularity_score DESC, p."createdAt" DESC, p.id
                 LIMIT ${len(params)+1} OFFSET ${len(params)+2}
             """
             posts = await db.execute_query(data_query, tuple(params_with_paging))
+            next_cursor = None
+            if len(posts) > limit:
+                posts = posts[:limit]
+                last = posts[-1]
+                next_cursor = encode_cursor('popular', last['id'], score=float(last['popularity_score']))
             # Ensure consistency of optional fields
             for p in posts:
                 p['popularity_score'] = float(p.get('popularity_score', 0))
-            return posts, total
+            return posts, total, next_cursor
         except Exception as e:
             logger.error(f"Error fetching popular posts (paged): {e}")
-            return [], 0
+            return [], 0, None
+
+    async def _get_popular_posts_from_leaderboard(
+        self,
+        page: int,
+        limit: int,
+        exclude_ids: Optional[List[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+        include_total: bool = True
+    ) -> (List[Dict[str, Any]], Optional[int], Optional[str]):
+        """Serve a popular page from the in-memory leaderboard"""
+        try:
+            if after is None:
+                post_ids, scores, total = self.popularity.page(page, limit, exclude_ids)
+                has_more = page * limit < total
+            else:
+                post_ids, scores, total, has_more = self.popularity.after(
+                    after['i'], after['s'], limit, exclude_ids
+                )
+            details = {p['id']: p for p in await self.get_post_details(post_ids)}
+            posts = []
+            # Keep leaderboard order rather than the details query's ordering
+            for post_id, score in zip(post_ids, scores):
+                post = details.get(post_id)
+                if post is not None:
+                    post['popularity_score'] = float(score)
+                    posts.append(post)
+            next_cursor = None
+            if has_more and post_ids:
+                next_cursor = encode_cursor('popular', post_ids[-1], score=scores[-1])
+            return posts, total if include_total else None, next_cursor
+        except Exception as e:
+            logger.error(f"Error fetching popular posts from leaderboard: {e}")
+            return [], 0, None
 
     async def get_author_based_posts(
         self,
         user_id: str,
         page: int = 1,
         limit: int = 10,
-        exclude_ids: Optional[List[str]] = None
-    ) -> (List[Dict[str, Any]], int):
+        exclude_ids: Optional[List[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+        include_total: bool = True
+    ) -> (List[Dict[str, Any]], Optional[int], Optional[str]):
         """Recommend posts from authors the user has viewed, excluding already viewed posts."""
+        if self.author_index.ready:
+            return await self._get_author_posts_from_index(user_id, page, limit, exclude_ids, after, include_total)
         try:
-            await self._ensure_views_table()
             # Find authors from user's viewed posts
             author_rows = await db.execute_query(
                 """
@@ -421,7 +1706,7 @@ class RecommendationService:
             )
             author_ids = [r['author_id'] for r in author_rows if r.get('author_id')]
             if not author_ids:
-                return [], 0
+                return [], 0, None
 
             # Build params and exclusion
             params: List[Any] = author_ids[:]
@@ -432,20 +1717,32 @@ class RecommendationService:
                 params.extend(exclude_ids)
 
             author_placeholders = ",".join([f"${i+1}" for i in range(len(author_ids))])
-            # Count
-            count_query = f"""
-                SELECT COUNT(*)::int AS total
-                FROM "Post" p
-                WHERE p."authorId" IN ({author_placeholders}){where_exclusion}
-            """
-            count_rows = await db.execute_query(count_query, tuple(params))
-            total = count_rows[0]['total'] if count_rows else 0
-            if total == 0:
-                return [], 0
+            # Count; cursor pages reuse a recently computed total
+            total = None
+            if include_total:
+                if after is not None:
+                    total = self.feed_total_cache.get(('author', user_id))
+                if total is None:
+                    count_query = f"""
+                        SELECT COUNT(*)::int AS total
+                        FROM "Post" p
+                        WHERE p."authorId" IN ({author_placeholders}){where_exclusion}
+                    """
+                    count_rows = await db.execute_query(count_query, tuple(params))
+                    total = count_rows[0]['total'] if count_rows else 0
+                    self.feed_total_cache.set(('author', user_id), total)
+                if total == 0:
+                    return [], 0, None
 
-            # Page
+            # Page, either by offset or after the cursor's (createdAt, id) key
+            where_keyset = ""
             offset = (page - 1) * limit
-            params_with_paging = params + [limit, offset]
+            if after is not None:
+                where_keyset = f' AND (p."createdAt", p.id) < (${len(params)+1}, ${len(params)+2})'
+                params = params + [after['c'], after['i']]
+                offset = 0
+            # One extra row tells whether a next page exists
+            params_with_paging = params + [limit + 1, offset]
             data_query = f"""
                 SELECT 
                     p.id,
@@ -462,32 +1759,91 @@ class RecommendationService:
                     0::int as comment_count
                 FROM "Post" p
                 INNER JOIN "User" u ON p."authorId" = u.id
-                WHERE p."authorId" IN ({author_placeholders}){where_exclusion}
-                ORDER BY p."createdAt" DESC
+                WHERE p."authorId" IN ({author_placeholders}){where_exclusion}{where_keyset}
+                ORDER BY p."createdAt" DESC, p.id DESC
                 LIMIT ${len(params)+1} OFFSET ${len(params)+2}
             """
             posts = await db.execute_query(data_query, tuple(params_with_paging))
+            next_cursor = None
+            if len(posts) > limit:
+                posts = posts[:limit]
+                next_cursor = encode_cursor('author', posts[-1]['id'], created_at=posts[-1]['createdAt'])
             # Provide base author score and score matrix
             for p in posts:
                 p['similarity_score'] = p.get('similarity_score') or 0.5
                 p['score_matrix'] = {f"author:{p['authorId']}": 0.5}
                 p['popularity_score'] = None
-            return posts, total
+            return posts, total, next_cursor
         except Exception as e:
             logger.warning(f"Error fetching author-based posts: {e}")
-            return [], 0
+            return [], 0, None
     
+    async def _get_author_posts_from_index(
+        self,
+        user_id: str,
+        page: int,
+        limit: int,
+        exclude_ids: Optional[List[str]] = None,
+        after: Optional[Dict[str, Any]] = None,
+        include_total: bool = True
+    ) -> (List[Dict[str, Any]], Optional[int], Optional[str]):
+        """Serve the author feed from the in-memory author index"""
+        try:
+            authors = self.author_index.authors_for(
+                user_id, self.user_post_interactions.get(user_id, ())
+            )
+            if not authors:
+                return [], 0, None
+            entries, total, has_more = self.author_index.page(
+                authors,
+                page,
+                limit,
+                exclude_ids,
+                after=(after['c'], after['i']) if after is not None else None
+            )
+            post_ids = [post_id for _, post_id in entries]
+            details = {p['id']: p for p in await self.get_post_details(post_ids)}
+            posts = [details[post_id] for post_id in post_ids if post_id in details]
+            # Provide base author score and score matrix
+            for p in posts:
+                p['similarity_score'] = p.get('similarity_score') or 0.5
+                p['score_matrix'] = {f"author:{p['authorId']}": 0.5}
+                p['popularity_score'] = None
+            next_cursor = None
+            if has_more and entries:
+                created_at, post_id = entries[-1]
+                next_cursor = encode_cursor('author', post_id, created_at=created_at)
+            return posts, total if include_total else None, next_cursor
+        except Exception as e:
+            logger.warning(f"Error fetching author-based posts from index: {e}")
+            return [], 0, None
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Readiness and warm-up progress, cheap enough for frequent probes"""
+        return {
+            'model_loaded': self.model_loaded,
+            'ready': self.ready,
+            'warmup': self.warmup.as_dict()
+        }
+
     def get_statistics(self) -> Dict[str, Any]:
         """Get recommendation system statistics"""
-        total_interactions = sum(len(posts) for posts in self.user_post_interactions.values())
+        # Histories are filled off the event loop until the model is ready
+        histories = list(self.user_post_interactions.values()) if self.ready else []
+        total_interactions = sum(len(posts) for posts in histories)
         unique_posts = set()
-        for posts in self.user_post_interactions.values():
+        for posts in histories:
             unique_posts.update(posts)
         # model_loaded true if we have any interactions loaded
         model_loaded = total_interactions > 0
         return {
             'model_loaded': model_loaded,
-            'total_users': len(self.user_post_interactions),
+            'total_users': len(histories),
             'total_posts': len(unique_posts),
-            'total_interactions': total_interactions
+            'total_interactions': total_interactions,
+            'result_cache': self.result_cache.stats(),
+            'post_cache': self.post_cache.stats(),
+            'similarity_metric': self.similarity.metric if self.similarity is not None else 'coview',
+            'embedded_posts': len(self.content_index.index) if self.content_index is not None else 0,
+            'role': self.role
         }
@@ -0,0 +1,193 @@
+"""Co-view scoring kernels and the executor that runs them off the event loop"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.coview import CoViewReader, rank_gathered
+
+logger = logging.getLogger(__name__)
+
+SCORING_EXECUTORS = ('inline', 'thread', 'process')
+
+
+class ScoringTimeout(Exception):
+    """A ranking did not finish within the per-request timeout"""
+
+
+def select_top(scores: np.ndarray, candidates: np.ndarray, depth: int) -> np.ndarray:
+    """Order the best `depth` candidates by score (high to low), ties by post index.
+
+    The result is always a prefix of the full (score desc, index asc)
+    order, so page slices and cursor keys agree on which tied posts come first.
+    """
+    # Only candidates scoring at least the depth-th best score need ordering;
+    # all of those are kept so ties at the cut-off are broken by index below
+    if 0 < depth < candidates.shape[0]:
+        candidate_scores = scores[candidates]
+        cutoff = -np.partition(-candidate_scores, depth - 1)[depth - 1]
+        candidates = candidates[candidate_scores >= cutoff]
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:depth]
+
+
+def rank_scores(
+    cols: np.ndarray,
+    vals: np.ndarray,
+    history: np.ndarray,
+    n_posts: int,
+    depth: int,
+    after: Optional[Tuple[float, int]] = None,
+    boost: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Rank gathered (neighbor, weight) entries of a history.
+
+    Returns the best ``depth`` posts, their scores and the total number of
+    candidates. With ``after`` = (score, post index) only candidates that
+    follow that key in ranking order are ranked; the total still counts
+    all of them. ``boost`` = (posts, weights) adds other candidates, e.g.
+    content-based ones, with weights relative to the best co-view score.
+    Needs no matrix, so it can run in a worker process.
+    """
+    # Score every post at once: user history vector x top-K neighbor matrix
+    scores = np.bincount(cols, weights=vals, minlength=n_posts)
+    # Don't recommend posts user has already viewed
+    scores[history] = 0.0
+    if boost is not None:
+        boost_posts, boost_weights = boost
+        # Scaled to the co-view scores so neither signal swamps the other
+        best = scores.max() if scores.shape[0] else 0.0
+        scores[boost_posts] += boost_weights * (best if best > 0 else 1.0)
+        scores[history] = 0.0
+    candidates = np.flatnonzero(scores > 0)
+    total = int(candidates.shape[0])
+    if after is not None:
+        score, after_idx = after
+        candidate_scores = scores[candidates]
+        candidates = candidates[
+            (candidate_scores < score) | ((candidate_scores == score) & (candidates > after_idx))
+        ]
+    top = select_top(scores, candidates, depth)
+    return top, scores[top], total
+
+
+def rank_history(
+    model: CoViewReader,
+    history: np.ndarray,
+    depth: int,
+    after: Optional[Tuple[float, int]] = None,
+    boost: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """rank_scores for a history of an immutable read model"""
+    cols, vals = model.gather(history)
+    return rank_scores(cols, vals, history, model.n_posts, depth, after, boost)
+
+
+def _warm_worker() -> int:
+    return 0
+
+
+class ScoringPool:
+    """Runs the scoring kernels inline, in a thread pool or in a process pool.
+
+    Thread workers score the read snapshot directly; NumPy releases the GIL
+    in most of the kernel. Process workers get the gathered neighbor
+    entries instead of the matrix, so nothing large is pickled per call.
+    ``timeout`` raises ScoringTimeout if a ranking takes longer
+    (queueing included); the worker still finishes it in the background.
+    """
+
+    def __init__(self, mode: str = 'inline', workers: int = 4):
+        if mode not in SCORING_EXECUTORS:
+            raise ValueError(f"Unknown scoring executor '{mode}', expected one of {SCORING_EXECUTORS}")
+        self.mode = mode
+        self.workers = max(workers, 1)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == 'thread':
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='scoring'
+                )
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the workers now rather than on the first request"""
+        if self.mode == 'inline':
+            return
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        # Spawned processes import NumPy on their first task
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _warm_worker) for _ in range(self.workers)
+        ))
+        logger.info(f"Scoring runs in a {self.mode} pool of {self.workers} workers")
+
+    async def _run(self, func, timeout: Optional[float]):
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), func)
+        if not timeout:
+            return await future
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise ScoringTimeout(f"Scoring took longer than {timeout}s") from None
+
+    async def rank(
+        self,
+        model: CoViewReader,
+        history: np.ndarray,
+        depth: int,
+        after: Optional[Tuple[float, int]] = None,
+        timeout: Optional[float] = None,
+        boost: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """rank_history in the configured executor"""
+        if self.mode == 'inline':
+            return rank_history(model, history, depth, after, boost)
+        if self.mode == 'thread':
+            return await self._run(partial(rank_history, model, history, depth, after, boost), timeout)
+        # Gathering reads the matrix, so it stays here; only the kernel is shipped
+        cols, vals = model.gather(history)
+        return await self._run(
+            partial(rank_scores, cols, vals, history, model.n_posts, depth, after, boost), timeout
+        )
+
+    async def rank_many(
+        self,
+        model: CoViewReader,
+        histories: Sequence[np.ndarray],
+        depth: int,
+        timeout: Optional[float] = None,
+        boosts: Optional[Sequence[Optional[Tuple[np.ndarray, np.ndarray]]]] = None
+    ) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+               Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """model.rank_many in the configured executor; returns (gathered, ranked)"""
+        if self.mode == 'inline':
+            gathered = model.gather_many(histories)
+            return gathered, model.rank_many(histories, depth, gathered=gathered, boosts=boosts)
+        if self.mode == 'thread':
+            def rank():
+                gathered = model.gather_many(histories)
+                return gathered, model.rank_many(histories, depth, gathered=gathered, boosts=boosts)
+            return await self._run(rank, timeout)
+        gathered = model.gather_many(histories)
+        owners, _, cols, vals = gathered
+        ranked = await self._run(
+            partial(rank_gathered, owners, cols, vals, list(histories), model.n_posts, depth, boosts), timeout
+        )
+        return gathered, ranked
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            # Abandoned (timed out) rankings are not waited for
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
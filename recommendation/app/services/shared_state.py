@@ -0,0 +1,325 @@
+"""Model state shared between worker processes through memory-mapped files"""
+import os
+import json
+import time
+import fcntl
+import shutil
+import logging
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.coview import CoViewMatrix, IdIndex, merge_entries, splice_rows
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_VERSION = 1
+
+
+class WriterLock:
+    """Non-blocking exclusive file lock that elects the single writer process"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Try to become the writer; the lock is released when the process exits"""
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class SharedHistories(Mapping):
+    """Read-only user_id -> {post_id: viewed_at} view over published history arrays"""
+
+    def __init__(
+        self,
+        users: IdIndex,
+        posts: IdIndex,
+        n_users: int,
+        indptr: np.ndarray,
+        post_idx: np.ndarray,
+        times: np.ndarray
+    ):
+        self._users = users
+        self._posts = posts
+        self._n_users = n_users
+        self._indptr = indptr
+        self._post_idx = post_idx
+        self._times = times
+
+    def __getitem__(self, user_id: str) -> Dict[str, float]:
+        row = self._users.get(user_id)
+        if row is None or row >= self._n_users:
+            raise KeyError(user_id)
+        start, end = int(self._indptr[row]), int(self._indptr[row + 1])
+        return dict(zip(
+            self._posts.keys(self._post_idx[start:end].tolist()),
+            self._times[start:end].tolist()
+        ))
+
+    def __len__(self) -> int:
+        return self._n_users
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._users.ids[:self._n_users])
+
+
+class SharedModelPublisher:
+    """Writer side: publishes the co-view matrix and histories as immutable generations.
+
+    Post and user ids are appended to ``posts.ids`` / ``users.ids`` once, so
+    integer ids stay stable within an epoch (one writer lifetime) and
+    readers only read the new tail. Each generation directory holds the
+    CSR and history arrays as ``.npy`` files; ``CURRENT`` is replaced
+    atomically to point at the newest one.
+
+    Publishing is split so the writer's event loop only copies what
+    changed: prepare() encodes the histories of users who viewed posts
+    since the last generation and takes the matrix's uncompacted
+    entries; write() merges those into the previous generation's arrays
+    and writes the files, and can run in a thread.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pointer_file = os.path.join(directory, 'CURRENT')
+        self._post_index: Optional[IdIndex] = None
+
+    def _start_epoch(self, post_index: IdIndex) -> None:
+        self.epoch = f"epoch-{int(time.time() * 1000)}"
+        self.epoch_dir = os.path.join(self.directory, self.epoch)
+        self._post_index = post_index
+        self._users = IdIndex()
+        self._posts_published = 0
+        self._users_published = 0
+        self._generation = 0
+        # History arrays (user_indptr, posts, times) of the last written generation
+        self._histories: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._interactions: Optional[Mapping] = None
+
+    def _append_ids(self, name: str, ids: List[str]) -> None:
+        if not ids:
+            return
+        with open(os.path.join(self.epoch_dir, name), 'a', encoding='utf-8') as f:
+            f.write('\n'.join(ids) + '\n')
+
+    def _encode(self, coview: CoViewMatrix, history: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        # Interning here so every history post has a row id in this generation
+        posts = np.fromiter((coview.posts.intern(p) for p in history), dtype=np.int32, count=len(history))
+        times = np.fromiter(history.values(), dtype=np.float64, count=len(history))
+        return posts, times
+
+    def _encode_all(
+        self,
+        coview: CoViewMatrix,
+        interactions: Mapping
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # One pass over items() so lazily loaded histories are not all kept in memory
+        current = dict(interactions.items())
+        for user_id in current:
+            self._users.intern(user_id)
+        histories = [current.get(user_id) or {} for user_id in self._users.ids]
+        lengths = np.fromiter((len(h) for h in histories), dtype=np.int64, count=len(histories))
+        total = int(lengths.sum())
+        history_posts = np.fromiter(
+            (coview.posts.intern(p) for h in histories for p in h),
+            dtype=np.int32,
+            count=total
+        )
+        history_times = np.fromiter((t for h in histories for t in h.values()), dtype=np.float64, count=total)
+        return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64), history_posts, history_times
+
+    def prepare(
+        self,
+        coview: CoViewMatrix,
+        interactions: Mapping,
+        changed_users: Optional[Iterable[str]] = None
+    ) -> Dict[str, object]:
+        """Copy what a generation needs; must run where coview and interactions are mutated.
+
+        ``changed_users`` are the users whose histories changed since the
+        last prepare(); only theirs are re-encoded. Every history is
+        encoded on a new epoch, when ``interactions`` is a different
+        mapping, after a failed write, or without ``changed_users``.
+        """
+        if coview.posts is not self._post_index:
+            # A rebuilt matrix numbers posts differently, so readers must start over
+            self._start_epoch(coview.posts)
+        # Cleared until write() succeeds, so a failed generation is re-encoded in full
+        base, self._histories = self._histories, None
+        changed: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        if base is None or changed_users is None or interactions is not self._interactions:
+            base = self._encode_all(coview, interactions)
+        else:
+            for user_id in changed_users:
+                changed[self._users.intern(user_id)] = self._encode(coview, interactions.get(user_id) or {})
+        self._interactions = interactions
+        csr, chunks = coview.pending_entries()
+        n_posts = coview.n_posts
+        return {
+            'csr': csr,
+            'chunks': chunks,
+            'histories': base,
+            'changed': changed,
+            'new_posts': coview.posts.ids[self._posts_published:n_posts],
+            'new_users': self._users.ids[self._users_published:],
+            'meta': {
+                'version': SHARED_STATE_VERSION,
+                'n_posts': n_posts,
+                'n_users': len(self._users),
+                'max_neighbors': coview.max_neighbors,
+                'top_k': coview.top_k,
+            },
+        }
+
+    def write(self, prepared: Dict[str, object]) -> str:
+        """Build and write a prepared generation and point readers at it; returns its name"""
+        meta = prepared['meta']
+        indptr, indices, data = merge_entries(
+            prepared['csr'], prepared['chunks'], meta['n_posts'], meta['max_neighbors']
+        )
+        base = prepared['histories']
+        user_indptr, (history_posts, history_times) = splice_rows(
+            base[0], base[1:], prepared['changed'], meta['n_users']
+        )
+        histories = (user_indptr, history_posts, history_times)
+        arrays = {
+            'indptr.npy': indptr,
+            'indices.npy': indices,
+            'data.npy': data,
+            'user_indptr.npy': histories[0],
+            'history_posts.npy': histories[1],
+            'history_times.npy': histories[2],
+        }
+        meta = dict(meta, nnz=int(indices.shape[0]))
+        os.makedirs(self.epoch_dir, exist_ok=True)
+        self._append_ids('posts.ids', prepared['new_posts'])
+        self._posts_published = meta['n_posts']
+        self._append_ids('users.ids', prepared['new_users'])
+        self._users_published = meta['n_users']
+
+        self._generation += 1
+        generation = f"gen-{self._generation:08d}"
+        tmp_dir = os.path.join(self.epoch_dir, generation + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, name), array)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, published_at=time.time()), f)
+        os.replace(tmp_dir, os.path.join(self.epoch_dir, generation))
+
+        tmp_pointer = self.pointer_file + '.tmp'
+        with open(tmp_pointer, 'w') as f:
+            f.write(f"{self.epoch}/{generation}")
+        os.replace(tmp_pointer, self.pointer_file)
+        self._histories = histories
+        self._cleanup(generation)
+        return generation
+
+    def publish(self, coview: CoViewMatrix, interactions: Mapping) -> str:
+        """Prepare and write a generation in one step"""
+        return self.write(self.prepare(coview, interactions))
+
+    def _cleanup(self, current: str) -> None:
+        """Drop other epochs and all but the last two generations (readers keep open maps alive)"""
+        for name in os.listdir(self.directory):
+            if name.startswith('epoch-') and name != self.epoch:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        generations = sorted(n for n in os.listdir(self.epoch_dir) if n.startswith('gen-'))
+        for name in generations[:-2]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.epoch_dir, name), ignore_errors=True)
+
+
+class SharedModelReader:
+    """Reader side: maps the newest published generation without taking any lock"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pointer_file = os.path.join(directory, 'CURRENT')
+        self.current: Optional[str] = None
+        self._epoch: Optional[str] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.posts = IdIndex()
+        self.users = IdIndex()
+        self._offsets = {'posts.ids': 0, 'users.ids': 0}
+
+    def _read_ids(self, name: str, index: IdIndex, count: int) -> None:
+        """Extend index from the append-only ids file up to count entries"""
+        if len(index) >= count:
+            return
+        with open(os.path.join(self.directory, self._epoch, name), 'rb') as f:
+            f.seek(self._offsets[name])
+            while len(index) < count:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    raise ValueError(f"{name} is shorter than published metadata")
+                index.intern(line[:-1].decode('utf-8'))
+            self._offsets[name] = f.tell()
+
+    def refresh(self) -> Optional[Tuple[CoViewMatrix, SharedHistories]]:
+        """Open the newest generation; returns None if nothing new was published"""
+        try:
+            with open(self.pointer_file, 'r') as f:
+                pointer = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if not pointer or pointer == self.current:
+            return None
+        epoch, generation = pointer.split('/')
+        if epoch != self._epoch:
+            # A new writer started; its integer ids are unrelated to the old ones
+            self._epoch = epoch
+            self._reset()
+        gen_dir = os.path.join(self.directory, epoch, generation)
+        with open(os.path.join(gen_dir, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != SHARED_STATE_VERSION:
+            raise ValueError(f"Unsupported shared state version {meta.get('version')}")
+        self._read_ids('posts.ids', self.posts, meta['n_posts'])
+        self._read_ids('users.ids', self.users, meta['n_users'])
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(gen_dir, name), mmap_mode='r')
+
+        coview = CoViewMatrix.from_state({
+            'indptr': load('indptr.npy'),
+            'indices': load('indices.npy'),
+            'data': load('data.npy'),
+            'max_neighbors': meta['max_neighbors'],
+            'top_k': meta['top_k'],
+        }, posts=self.posts)
+        histories = SharedHistories(
+            self.users,
+            self.posts,
+            meta['n_users'],
+            load('user_indptr.npy'),
+            load('history_posts.npy'),
+            load('history_times.npy')
+        )
+        self.current = pointer
+        return coview, histories
@@ -0,0 +1,167 @@
+"""Normalized item-item similarities built in one vectorized pass over all histories"""
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_METRICS = ('cosine', 'jaccard', 'idf')
+
+# Pair keys sorted at a time, bounding the builder's peak memory
+PAIR_CHUNK_SIZE = 8_000_000
+
+
+def _count_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted distinct keys and how often each occurs"""
+    keys = np.sort(keys)
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[starts], np.diff(np.append(starts, keys.shape[0]))
+
+
+def _merge_counts(runs: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum the counts of several sorted (keys, counts) runs"""
+    keys = np.concatenate([run[0] for run in runs])
+    counts = np.concatenate([run[1] for run in runs])
+    # A stable sort finds the already sorted runs, so merging stays cheap
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[starts], np.add.reduceat(counts[order], starts)
+
+
+def cooccurrence(
+    histories: Sequence[np.ndarray],
+    n_posts: int,
+    window: int,
+    sessions: Optional[Sequence[np.ndarray]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Count users per post and per post pair.
+
+    Histories are interned post ids, oldest view first. Like the co-view
+    model, two posts only count as co-viewed when they are at most
+    ``window`` views apart in a history, and a view with a session (an
+    integer code in ``sessions``, -1 when unknown) only pairs with the
+    views before it in the same session. Returns (a, b, count) for every
+    co-viewed pair with a < b, plus each post's number of users (the
+    column sums of the user x post matrix).
+    """
+    n = max(n_posts, 1)
+    lengths = [h.shape[0] for h in histories]
+    posts = np.concatenate(histories).astype(np.int64) if histories else np.empty(0, dtype=np.int64)
+    owners = np.repeat(np.arange(len(histories)), lengths)
+    degrees = np.bincount(posts, minlength=n_posts).astype(np.float64)
+    if sessions is not None:
+        codes = np.concatenate(sessions).astype(np.int64) if histories else np.empty(0, dtype=np.int64)
+        # Runs of consecutive views from the same user and session
+        session_runs = np.cumsum(np.concatenate([[0], (owners[1:] != owners[:-1]) | (codes[1:] != codes[:-1])]))
+
+    # Pair keys are counted a chunk at a time, then the sorted runs are merged once
+    runs: List[Tuple[np.ndarray, np.ndarray]] = []
+    keys: List[np.ndarray] = []
+    buffered = 0
+    for offset in range(1, window + 1):
+        same_user = owners[offset:] == owners[:-offset]
+        if not same_user.any():
+            break
+        pair = same_user
+        if sessions is not None:
+            pair = same_user & ((codes[offset:] < 0) | (session_runs[offset:] == session_runs[:-offset]))
+        later, earlier = posts[offset:][pair], posts[:-offset][pair]
+        keys.append(np.minimum(later, earlier) * n + np.maximum(later, earlier))
+        buffered += keys[-1].shape[0]
+        if buffered >= PAIR_CHUNK_SIZE:
+            runs.append(_count_keys(np.concatenate(keys)))
+            keys, buffered = [], 0
+    if keys:
+        runs.append(_count_keys(np.concatenate(keys)))
+    if runs:
+        pair_keys, pair_counts = _merge_counts(runs) if len(runs) > 1 else runs[0]
+    else:
+        pair_keys, pair_counts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pair_counts = pair_counts.astype(np.float64)
+    return pair_keys // n, pair_keys % n, pair_counts, degrees
+
+
+def bm25_idf(degrees: np.ndarray, n_users: int) -> np.ndarray:
+    """BM25 inverse document frequency of posts viewed by ``degrees`` of ``n_users`` users"""
+    return np.log1p((n_users - degrees + 0.5) / (degrees + 0.5))
+
+
+def build_similarity(
+    histories: Sequence[np.ndarray],
+    n_posts: int,
+    metric: str,
+    window: int,
+    max_neighbors: Optional[int],
+    top_k: Optional[int],
+    sessions: Optional[Sequence[np.ndarray]] = None
+) -> Tuple[Dict[str, object], 'PairNormalizer']:
+    """Normalized similarity matrix of all histories, pruned to each post's strongest neighbors.
+
+    ``cosine`` divides a pair's co-view count by sqrt(users(a) * users(b)),
+    ``jaccard`` by users(a) + users(b) - count, and ``idf`` weights it by
+    the BM25 idf of the neighbor post, so popular posts stop dominating
+    every list. ``sessions`` are passed on to cooccurrence(). Returns a
+    CoViewMatrix state (without post ids) and the normalizer for pairs
+    added after the build.
+    """
+    if metric not in SIMILARITY_METRICS:
+        raise ValueError(f"Unknown similarity metric '{metric}', expected one of {SIMILARITY_METRICS}")
+    a, b, count, degrees = cooccurrence(histories, n_posts, window, sessions)
+    normalizer = PairNormalizer(metric, degrees, len(histories))
+    forward, backward = normalizer.normalize(a, b, count)
+
+    # Both directions, each row strongest-first, then cut rows down to max_neighbors.
+    # Pairs are sorted by (a, b), so with the b -> a entries first every row's
+    # columns are ascending and the stable sort breaks score ties by column.
+    rows = np.concatenate([b, a])
+    cols = np.concatenate([a, b])
+    vals = np.concatenate([backward, forward])
+    order = np.lexsort((-vals, rows))
+    rows, cols, vals = rows[order], cols[order], vals[order]
+    counts = np.bincount(rows, minlength=n_posts)
+    if max_neighbors is not None and counts.size and counts.max() > max_neighbors:
+        row_starts = np.cumsum(counts) - counts
+        keep = np.arange(rows.shape[0]) - row_starts[rows] < max_neighbors
+        rows, cols, vals = rows[keep], cols[keep], vals[keep]
+        counts = np.minimum(counts, max_neighbors)
+    logger.info(f"Built {metric} similarities for {n_posts} posts ({int(counts.sum())} neighbors kept)")
+    return {
+        'indptr': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        'indices': cols.astype(np.int32),
+        'data': vals.astype(np.float32),
+        'max_neighbors': max_neighbors,
+        'top_k': top_k,
+    }, normalizer
+
+
+class PairNormalizer:
+    """Puts pair co-occurrence counts on the scale of a built similarity matrix.
+
+    Post degrees are frozen at build time (posts seen since count as
+    viewed once), so weights added between builds are approximations
+    until the next build recomputes them exactly.
+    """
+
+    def __init__(self, metric: str, degrees: np.ndarray, n_users: int):
+        self.metric = metric
+        self.degrees = degrees
+        self.n_users = n_users
+
+    def _degree(self, posts: np.ndarray) -> np.ndarray:
+        known = posts < self.degrees.shape[0]
+        degrees = np.ones(posts.shape[0])
+        degrees[known] = np.maximum(self.degrees[posts[known]], 1.0)
+        return degrees
+
+    def normalize(self, a: np.ndarray, b: np.ndarray, count: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(a -> b, b -> a) similarities for ``count`` co-occurrences of posts a and b"""
+        degree_a, degree_b = self._degree(a), self._degree(b)
+        if self.metric == 'idf':
+            return count * bm25_idf(degree_b, self.n_users), count * bm25_idf(degree_a, self.n_users)
+        if self.metric == 'cosine':
+            sim = count / np.sqrt(degree_a * degree_b)
+        else:
+            sim = count / np.maximum(degree_a + degree_b - count, 1.0)
+        return sim, sim
@@ -0,0 +1,201 @@
+"""Ingest tracked views from an event file or queue through the bulk track path"""
+import os
+import json
+import asyncio
+import logging
+import importlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_view(record: Any) -> Optional[Dict[str, Any]]:
+    """Normalise one view event to the fields track_views takes; None if it is unusable"""
+    if not isinstance(record, dict):
+        return None
+    user_id, post_id = record.get('user_id'), record.get('post_id')
+    if not isinstance(user_id, str) or not user_id or not isinstance(post_id, str) or not post_id:
+        return None
+    duration_ms = record.get('duration_ms')
+    if duration_ms is not None and (not isinstance(duration_ms, int) or duration_ms < 0):
+        duration_ms = None
+    viewed_at = record.get('viewed_at')
+    if isinstance(viewed_at, str):
+        try:
+            viewed_at = datetime.fromisoformat(viewed_at.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            viewed_at = None
+    elif not isinstance(viewed_at, (int, float)):
+        viewed_at = None
+    return {
+        'user_id': user_id,
+        'post_id': post_id,
+        'post_content': record.get('post_content'),
+        'post_author_id': record.get('post_author_id'),
+        'duration_ms': duration_ms,
+        'session_id': record.get('session_id'),
+        'viewed_at': viewed_at,
+    }
+
+
+class ViewSource(ABC):
+    """Where a ViewConsumer reads view events from.
+
+    ``read`` returns the next batch (an empty list when there is nothing
+    new); ``commit`` is called once that batch has been applied, so a
+    source can acknowledge or checkpoint it. Batches that were read but
+    not committed are read again after a restart; re-applying a view is
+    harmless because interactions are de-duplicated.
+    """
+
+    @abstractmethod
+    async def read(self) -> List[Dict[str, Any]]:
+        """The next batch of parsed views, empty when nothing is new"""
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FileViewSource(ViewSource):
+    """Tails an NDJSON file of view events, checkpointing its offset in ``<path>.offset``"""
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.offset_file = path + '.offset'
+        self.offset = self._load_offset()
+        self._pending_offset = self.offset
+        self.skipped = 0
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_file, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _read_lines(self) -> List[bytes]:
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            # Truncated or replaced by a new file: start over from its beginning
+            logger.warning(f"{self.path} shrank below offset {self.offset}, reading from the start")
+            self.offset = 0
+        lines: List[bytes] = []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            offset = self.offset
+            while len(lines) < self.batch_size:
+                line = f.readline()
+                # Leave a partially written last line for the next read
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                lines.append(line)
+        self._pending_offset = offset
+        return lines
+
+    async def read(self) -> List[Dict[str, Any]]:
+        views: List[Dict[str, Any]] = []
+        for line in await asyncio.to_thread(self._read_lines):
+            if not line.strip():
+                continue
+            try:
+                view = parse_view(json.loads(line))
+            except ValueError:
+                view = None
+            if view is None:
+                self.skipped += 1
+                logger.warning(f"Skipping invalid view event in {self.path}")
+                continue
+            views.append(view)
+        if not views and self._pending_offset != self.offset:
+            # Only blank or invalid lines: move past them now
+            self.commit()
+        return views
+
+    def commit(self) -> None:
+        if self._pending_offset == self.offset:
+            return
+        self.offset = self._pending_offset
+        tmp = self.offset_file + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(self.offset))
+        os.replace(tmp, self.offset_file)
+
+
+class QueueViewSource(ViewSource):
+    """Reads view events put on an in-process asyncio queue (RecommendationService.view_queue)"""
+
+    def __init__(self, queue: asyncio.Queue, batch_size: int = 1000, wait: float = 1.0):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.wait = wait
+
+    async def read(self) -> List[Dict[str, Any]]:
+        try:
+            first = await asyncio.wait_for(self.queue.get(), timeout=self.wait)
+        except asyncio.TimeoutError:
+            return []
+        records = [first]
+        while len(records) < self.batch_size and not self.queue.empty():
+            records.append(self.queue.get_nowait())
+        return [view for view in map(parse_view, records) if view is not None]
+
+
+def load_view_source(
+    spec: str,
+    path: str,
+    batch_size: int,
+    queue: Optional[asyncio.Queue] = None
+) -> ViewSource:
+    """Build the source named by VIEW_CONSUMER_SOURCE: 'file', 'queue' or 'module:factory'"""
+    if spec == 'file':
+        return FileViewSource(path, batch_size=batch_size)
+    if spec == 'queue':
+        if queue is None:
+            raise ValueError("The 'queue' view source needs the queue producers put events on")
+        return QueueViewSource(queue, batch_size=batch_size)
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise ValueError(f"Unknown view source {spec!r}; use 'file', 'queue' or 'module:factory'")
+    # A custom factory reads its own configuration and returns a ViewSource
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class ViewConsumer:
+    """Feeds batches from a ViewSource into a bulk handler (RecommendationService.track_views)"""
+
+    def __init__(
+        self,
+        source: ViewSource,
+        handler: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        poll_interval: float = 1.0
+    ):
+        self.source = source
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.consumed = 0
+
+    async def run(self) -> None:
+        while True:
+            try:
+                views = await self.source.read()
+                if not views:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.handler(views)
+                self.source.commit()
+                self.consumed += len(views)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error consuming view events: {e}")
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,107 @@
+"""Hand-off of tracked views from reader workers to the shared-state writer"""
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ViewSpool:
+    """Per-process append-only file of views for the writer process to apply.
+
+    Each line is written with a single ``write`` on an ``O_APPEND`` file
+    descriptor. Files are rotated after ``rotate_every`` views or
+    ``rotate_after`` seconds, so the writer can delete fully consumed ones.
+    """
+
+    def __init__(self, directory: str, rotate_every: int = 10000, rotate_after: float = 600.0):
+        self.directory = directory
+        self.rotate_every = rotate_every
+        self.rotate_after = rotate_after
+        self._prefix = f"{os.getpid()}-{int(time.time() * 1000)}"
+        self._seq = 0
+        self._fd: Optional[int] = None
+        self._count = 0
+        self._opened_at = 0.0
+
+    def _open(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self._prefix}-{self._seq:06d}.log")
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._count = 0
+        self._opened_at = time.monotonic()
+        return self._fd
+
+    def append(self, record: Dict[str, Any]) -> None:
+        if self._fd is not None and (
+            self._count >= self.rotate_every
+            or time.monotonic() - self._opened_at >= self.rotate_after
+        ):
+            os.close(self._fd)
+            self._fd = None
+            self._seq += 1
+        fd = self._fd if self._fd is not None else self._open()
+        os.write(fd, (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+        self._count += 1
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SpoolReader:
+    """Writer side: tails every worker's spool files and removes consumed ones"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._offsets: Dict[str, int] = {}
+
+    def read(self) -> List[Dict[str, Any]]:
+        """Return views appended since the last call, oldest file first"""
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.endswith('.log'))
+        except FileNotFoundError:
+            return []
+        latest: Dict[Tuple[str, str], str] = {}
+        for name in names:
+            pid, started, _ = name[:-4].split('-')
+            latest[(pid, started)] = name
+
+        records: List[Dict[str, Any]] = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            offset = self._offsets.get(name, 0)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            # Only consume complete lines; a write may be in progress
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].splitlines():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt line in {path}")
+            offset += end
+            self._offsets[name] = offset
+
+            pid, started, _ = name[:-4].split('-')
+            if offset == os.path.getsize(path) and (
+                latest[(pid, started)] != name or not _pid_alive(int(pid))
+            ):
+                # Its owner has moved on to a newer file or exited
+                os.remove(path)
+                del self._offsets[name]
+        return records
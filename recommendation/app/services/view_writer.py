@@ -0,0 +1,168 @@
+"""Write-behind queue for persisting recommendation views in batches"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+VIEW_COLUMNS = ["userId", "postId", "postContent", "postAuthorId", "createdAt", "sessionId", "durationMs"]
+
+
+class ViewWriteBehind:
+    """Coalesce view inserts and flush them to Postgres in the background.
+
+    Views are buffered in memory (bounded by ``max_pending``) and written with
+    ``COPY`` once ``batch_size`` views are queued or ``flush_interval``
+    seconds have passed, falling back to ``executemany`` if COPY fails. When
+    the buffer is full, producers wait up to ``enqueue_timeout`` for space
+    before the view is dropped, so a slow database can't grow memory
+    without bound.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 50000,
+        enqueue_timeout: float = 0.5
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self._buffer: Deque[tuple] = deque()
+        self._has_work = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(
+        self,
+        user_id: str,
+        post_id: str,
+        post_content: Optional[str] = None,
+        post_author_id: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        session_id: Optional[str] = None,
+        duration_ms: Optional[int] = None
+    ) -> bool:
+        """Queue a view for persistence; returns False if it had to be dropped"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        # Other producers woken by the same flush may take the space first, so check again
+        while len(self._buffer) >= self.max_pending:
+            try:
+                self._has_space.clear()
+                await asyncio.wait_for(self._has_space.wait(), timeout=deadline - loop.time())
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                logger.warning("View write-behind buffer full, dropping view")
+                return False
+        self._buffer.append((
+            user_id,
+            post_id,
+            post_content,
+            post_author_id,
+            created_at or datetime.now(timezone.utc),
+            session_id,
+            duration_ms
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self._has_work.set()
+        return True
+
+    def enqueue_many(self, records: List[tuple]) -> int:
+        """Queue a batch of view records (VIEW_COLUMNS order) without waiting for space.
+
+        Records beyond ``max_pending`` are dropped. Returns how many were queued.
+        """
+        room = max(self.max_pending - len(self._buffer), 0)
+        if room < len(records):
+            self.dropped += len(records) - room
+            logger.warning(f"View write-behind buffer full, dropping {len(records) - room} views")
+        queued = records[:room]
+        self._buffer.extend(queued)
+        if len(self._buffer) >= self.batch_size:
+            self._has_work.set()
+        return len(queued)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._has_work.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._has_work.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything currently buffered, one batch at a time"""
+        while self._buffer:
+            count = min(len(self._buffer), self.batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            self._has_space.set()
+            if not await self._write(batch):
+                # Put the batch back (as far as space allows) and retry later
+                room = self.max_pending - len(self._buffer)
+                if room < len(batch):
+                    self.dropped += len(batch) - room
+                    logger.warning(f"Dropping {len(batch) - room} views after failed flush")
+                self._buffer.extendleft(reversed(batch[:max(room, 0)]))
+                return
+
+    async def _write(self, batch: list) -> bool:
+        try:
+            await db.copy_records_to_table(
+                "RecommendationView",
+                records=batch,
+                columns=VIEW_COLUMNS
+            )
+        except Exception as e:
+            logger.warning(f"COPY of views failed, retrying with executemany: {e}")
+            try:
+                await db.executemany(
+                    """
+                    INSERT INTO "RecommendationView"
+                        ("userId", "postId", "postContent", "postAuthorId", "createdAt", "sessionId", "durationMs")
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    """,
+                    batch
+                )
+            except Exception as e:
+                logger.warning(f"Failed to persist {len(batch)} views to DB: {e}")
+                return False
+        self.written += len(batch)
+        return True
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Stop the background flusher and write out all remaining views"""
+        self._stopping = True
+        self._has_work.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            self._task = None
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._buffer:
+            logger.warning(f"{len(self._buffer)} views were not persisted on shutdown")
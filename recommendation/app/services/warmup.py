@@ -0,0 +1,71 @@
+"""Progress of the recommendation model warm-up, reported by the health endpoint"""
+import time
+from typing import Any, Dict, Optional
+
+
+class WarmupProgress:
+    """Phase, rows loaded and estimated time left of the model warm-up.
+
+    Phases run ``pending`` -> ``loading`` (local snapshot) -> ``warm_loading``
+    (DB view history) -> ``done``, or end in ``failed``. ``ready`` is set as
+    soon as the model can serve, which is after the local snapshot when
+    there is one, so the DB catch-up may still be running. Until then
+    requests are served from the popular feed.
+    """
+
+    def __init__(self):
+        self.phase = 'pending'
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.rows_loaded = 0
+        self.rows_total: Optional[int] = None
+        self.error: Optional[str] = None
+        self._phase_started = time.monotonic()
+        self._phase_rows = 0
+
+    def begin(self, phase: str, rows_total: Optional[int] = None) -> None:
+        if self.started_at is None:
+            self.started_at = time.time()
+        self.phase = phase
+        self.rows_total = rows_total
+        self._phase_started = time.monotonic()
+        self._phase_rows = self.rows_loaded
+
+    def add_rows(self, count: int) -> None:
+        self.rows_loaded += count
+
+    def mark_ready(self) -> None:
+        if not self.ready:
+            self.ready = True
+            self.ready_at = time.time()
+
+    def finish(self) -> None:
+        self.phase = 'done'
+
+    def fail(self, error: Exception) -> None:
+        self.phase = 'failed'
+        self.error = str(error)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Time left in the current phase at its average row rate, if the row total is known"""
+        if self.rows_total is None:
+            return None
+        done = self.rows_loaded - self._phase_rows
+        if done <= 0:
+            return None
+        elapsed = time.monotonic() - self._phase_started
+        return max(self.rows_total - done, 0) * elapsed / done
+
+    def as_dict(self) -> Dict[str, Any]:
+        end = self.ready_at or time.time()
+        eta = self.eta_seconds() if self.phase in ('loading', 'warm_loading') else None
+        return {
+            'phase': self.phase,
+            'rows_loaded': self.rows_loaded,
+            'rows_total': self.rows_total,
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+            # Time until the model could serve, or so far while it can't
+            'elapsed_seconds': round(end - self.started_at, 1) if self.started_at else None,
+            'error': self.error,
+        }
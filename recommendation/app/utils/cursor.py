@@ -0,0 +1,57 @@
+"""Opaque keyset pagination cursors"""
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.utils.exceptions import InvalidCursorError
+
+
+# Sort key fields each feed's cursor must carry besides the post id
+FEED_KEYS = {
+    'similarity': ('s',),
+    'popular': ('s',),
+    'author': ('c',),
+}
+
+
+def encode_cursor(
+    source: str,
+    post_id: str,
+    score: Optional[float] = None,
+    created_at: Optional[datetime] = None
+) -> str:
+    """Encode the sort key of the last item on a page as an opaque token"""
+    payload: Dict[str, Any] = {'src': source, 'i': post_id}
+    if score is not None:
+        payload['s'] = float(score)
+    if created_at is not None:
+        payload['c'] = created_at.isoformat()
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Decode a token produced by encode_cursor, checking the keys its feed needs"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict) or 'src' not in payload or 'i' not in payload:
+            raise ValueError("missing fields")
+        if payload['src'] not in FEED_KEYS:
+            raise ValueError(f"unknown feed {payload['src']!r}")
+        if not isinstance(payload['i'], str):
+            raise ValueError("post id must be a string")
+        missing = [key for key in FEED_KEYS[payload['src']] if key not in payload]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)} for the {payload['src']} feed")
+        if 's' in payload:
+            if isinstance(payload['s'], bool) or not isinstance(payload['s'], (int, float)):
+                raise ValueError("score must be a number")
+            payload['s'] = float(payload['s'])
+        if 'c' in payload:
+            payload['c'] = datetime.fromisoformat(payload['c'])
+        return payload
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
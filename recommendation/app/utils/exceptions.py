@@ -31,3 +31,12 @@ class DatabaseError(HTTPException):
             detail=detail
         )
 
+
+class InvalidCursorError(HTTPException):
+    """Raised when a pagination cursor cannot be decoded"""
+    
+    def __init__(self, detail: str = "Invalid cursor"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
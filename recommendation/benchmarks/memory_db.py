@@ -0,0 +1,126 @@
+"""In-memory stand-in for the Postgres database, answering the service's queries from a workload"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.workload import Workload
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryDatabase:
+    """Serves posts, authors and view history generated by a Workload.
+
+    Queries are recognised by the tables and clauses they use rather than
+    parsed, which is enough for the fixed set of statements the service
+    sends. ``latency`` adds a fixed delay per round trip to approximate a
+    remote database; it is 0 by default so results measure the service.
+    """
+
+    def __init__(self, workload: Workload, latency: float = 0.0):
+        self.workload = workload
+        self.latency = latency
+        self.views_written = 0
+        self.queries: Counter = Counter()
+        # Popularity is likes*2 + comments in the real schema; views stand in for both
+        self.view_counts = np.bincount(workload.posts, minlength=workload.n_posts)
+
+    def install(self, database: Any) -> None:
+        """Route the query methods of a Database instance (normally app.database.db) here"""
+        for name in ('execute_query', 'stream_query', 'execute', 'executemany', 'copy_records_to_table'):
+            setattr(database, name, getattr(self, name))
+
+    async def _round_trip(self) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    def _post_row(self, post_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            post = int(post_id.rsplit('-', 1)[1])
+        except (IndexError, ValueError):
+            return None
+        if not 0 <= post < self.workload.n_posts:
+            return None
+        created_at = self.workload.post_created_at(post)
+        views = int(self.view_counts[post])
+        author_id = self.workload.author_id(post)
+        return {
+            'id': post_id,
+            'authorId': author_id,
+            'content': f"Synthetic post {post}",
+            'images': [],
+            'createdAt': created_at,
+            'updatedAt': created_at,
+            'username': author_id,
+            'firstName': 'Bench',
+            'lastName': author_id,
+            'author_image': None,
+            'like_count': views // 10,
+            'comment_count': views // 50,
+        }
+
+    async def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        await self._round_trip()
+        if 'WHERE p.id IN' in query:
+            self.queries['post_details'] += 1
+            return [row for row in map(self._post_row, params or ()) if row is not None]
+        if 'popularity_score' in query:
+            self.queries['popularity'] += 1
+            scores = self.view_counts // 10 * 2 + self.view_counts // 50
+            order = np.lexsort((np.arange(self.workload.n_posts), -scores))
+            return [
+                {'id': self.workload.post_id(p), 'popularity_score': int(scores[p])}
+                for p in order.tolist()
+            ]
+        if 'ROW_NUMBER()' in query:
+            self.queries['author_index'] += 1
+            per_author = params[0] if params else self.workload.n_posts
+            rows = [
+                {
+                    'id': self.workload.post_id(p),
+                    'authorId': self.workload.author_id(p),
+                    'createdAt': self.workload.post_created_at(p),
+                }
+                for p in range(self.workload.n_posts - 1, -1, -1)
+            ]
+            rows.sort(key=lambda r: r['authorId'])
+            ranked, seen = [], Counter()
+            for row in rows:
+                seen[row['authorId']] += 1
+                if seen[row['authorId']] <= per_author:
+                    ranked.append(row)
+            return ranked
+        if 'reltuples' in query:
+            self.queries['estimate'] += 1
+            return [{'estimate': self.workload.size}]
+        # The author and popular SQL fallbacks are not used once both indexes are loaded
+        self.queries['unhandled'] += 1
+        logger.debug(f"Unhandled query: {query.split()[:8]}")
+        return []
+
+    async def stream_query(
+        self,
+        query: str,
+        params: Optional[tuple] = None,
+        chunk_size: int = 5000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        self.queries['stream'] += 1
+        start = self.workload.first_row_at(params[0]) if params else 0
+        for offset in range(start, self.workload.size, chunk_size):
+            await self._round_trip()
+            yield self.workload.rows(offset, min(offset + chunk_size, self.workload.size))
+
+    async def execute(self, query: str, params: Optional[tuple] = None) -> None:
+        await self._round_trip()
+        self.queries['execute'] += 1
+
+    async def executemany(self, query: str, args: list) -> None:
+        await self._round_trip()
+        self.views_written += len(args)
+
+    async def copy_records_to_table(self, table_name: str, records: list, columns: list) -> None:
+        await self._round_trip()
+        self.views_written += len(records)
@@ -0,0 +1,269 @@
+"""Benchmark track_view(s), get_recommendations and the DB warm-load at several scales.
+
+Usage (from the recommendation/ directory):
+
+    python -m benchmarks.run --scales 10k,100k,1m
+    python -m benchmarks.run --scales 100k --output results.json
+    python -m benchmarks.run --scales 100k --baseline results.json --tolerance 0.2
+
+Each scale gets a fresh service and model directory, backed by an
+in-memory stand-in for Postgres, so numbers reflect the service itself.
+With ``--baseline`` the run exits non-zero if any phase lost more than
+``--tolerance`` of its throughput or p99 latency grew by more than that.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.database import db
+from app.services.recommendation_service import RecommendationService, _post_counts_sql
+from benchmarks.memory_db import InMemoryDatabase
+from benchmarks.workload import Workload
+
+logger = logging.getLogger('benchmarks')
+
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1:] in SUFFIXES:
+        return int(float(value[:-1]) * SUFFIXES[value[-1]])
+    return int(value)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is in KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class PhaseResult:
+    """Throughput, latency percentiles and memory of one benchmark phase"""
+
+    def __init__(self, scale: int, phase: str, ops: int, seconds: float, latencies: Optional[List[float]] = None):
+        self.scale = scale
+        self.phase = phase
+        self.ops = ops
+        self.seconds = seconds
+        self.p50_ms = self.p99_ms = None
+        if latencies:
+            p50, p99 = np.percentile(np.asarray(latencies), [50, 99]) * 1000
+            self.p50_ms, self.p99_ms = float(p50), float(p99)
+        self.peak_rss_mb = peak_rss_mb()
+        self.traced_peak_mb: Optional[float] = None
+
+    @property
+    def throughput(self) -> float:
+        return self.ops / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'scale': self.scale,
+            'phase': self.phase,
+            'ops': self.ops,
+            'seconds': round(self.seconds, 4),
+            'throughput': round(self.throughput, 1),
+            'p50_ms': round(self.p50_ms, 4) if self.p50_ms is not None else None,
+            'p99_ms': round(self.p99_ms, 4) if self.p99_ms is not None else None,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'traced_peak_mb': round(self.traced_peak_mb, 1) if self.traced_peak_mb is not None else None,
+        }
+
+
+class Phase:
+    """Times one phase and, with --trace-memory, records the Python heap peak during it"""
+
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+
+    def __enter__(self) -> 'Phase':
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self.started
+        self.traced_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if self.trace_memory else None
+
+    def result(self, scale: int, name: str, ops: int, latencies: Optional[List[float]] = None) -> PhaseResult:
+        result = PhaseResult(scale, name, ops, self.seconds, latencies)
+        result.traced_peak_mb = self.traced_peak_mb
+        return result
+
+
+async def run_scale(scale: int, args: argparse.Namespace, workdir: str) -> List[PhaseResult]:
+    """Warm-load a fresh service from `scale` views, then measure tracking and serving"""
+    workload = Workload(
+        scale,
+        n_users=args.users,
+        n_posts=args.posts,
+        skew=args.skew,
+        seed=args.seed
+    )
+    store = InMemoryDatabase(workload, latency=args.db_latency_ms / 1000)
+    store.install(db)
+    settings.MODEL_PATH = os.path.join(workdir, f"scale-{scale}", 'recommendation_model')
+    logger.warning(
+        f"Scale {scale}: {workload.n_users} users, {workload.n_posts} posts, "
+        f"{workload.n_authors} authors, skew {workload.skew}"
+    )
+
+    service = RecommendationService()
+    service.view_writer.start()
+    results: List[PhaseResult] = []
+
+    with Phase(args.trace_memory) as phase:
+        await service._load_interactions_from_db()
+    results.append(phase.result(scale, 'warm_load', workload.size))
+    service._mark_ready()
+    await service.popularity.refresh(_post_counts_sql())
+    await service.author_index.refresh()
+
+    latencies: List[float] = []
+    with Phase(args.trace_memory) as phase:
+        for user_id, post_id, author_id, duration_ms, session_id in workload.views(args.views):
+            started = time.perf_counter()
+            await service.track_view(
+                user_id,
+                post_id,
+                post_author_id=author_id,
+                duration_ms=duration_ms,
+                session_id=session_id
+            )
+            latencies.append(time.perf_counter() - started)
+    results.append(phase.result(scale, 'track_view', len(latencies), latencies))
+
+    latencies = []
+    views = [
+        {
+            'user_id': user_id,
+            'post_id': post_id,
+            'post_author_id': author_id,
+            'duration_ms': duration_ms,
+            'session_id': session_id,
+        }
+        for user_id, post_id, author_id, duration_ms, session_id in workload.views(args.views)
+    ]
+    with Phase(args.trace_memory) as phase:
+        for start in range(0, len(views), args.bulk_size):
+            started = time.perf_counter()
+            await service.track_views(views[start:start + args.bulk_size])
+            latencies.append(time.perf_counter() - started)
+    # Throughput counts views; latencies are per bulk call
+    results.append(phase.result(scale, 'track_views', len(views), latencies))
+
+    latencies = []
+    with Phase(args.trace_memory) as phase:
+        for user_id in workload.request_users(args.requests):
+            started = time.perf_counter()
+            await service.get_recommendations(user_id, page=1, limit=args.limit)
+            latencies.append(time.perf_counter() - started)
+    results.append(phase.result(scale, 'get_recommendations', len(latencies), latencies))
+
+    await service.stop()
+    if store.queries['unhandled']:
+        logger.warning(f"{store.queries['unhandled']} queries were not recognised by the in-memory DB")
+    del service, store, workload
+    gc.collect()
+    return results
+
+
+def print_results(results: List[PhaseResult]) -> None:
+    header = f"{'scale':>10} {'phase':<20} {'ops':>9} {'ops/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'peak RSS MB':>12}"
+    traced = any(r.traced_peak_mb is not None for r in results)
+    print(header + (f" {'heap peak MB':>13}" if traced else ''))
+    for r in results:
+        p50 = f"{r.p50_ms:.3f}" if r.p50_ms is not None else '-'
+        p99 = f"{r.p99_ms:.3f}" if r.p99_ms is not None else '-'
+        line = (
+            f"{r.scale:>10} {r.phase:<20} {r.ops:>9} {r.throughput:>11.1f} "
+            f"{p50:>9} {p99:>9} {r.peak_rss_mb:>12.1f}"
+        )
+        if traced:
+            line += f" {r.traced_peak_mb:>13.1f}"
+        print(line)
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions of throughput or p99 latency beyond tolerance against a previous run"""
+    previous = {(r['scale'], r['phase']): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = previous.get((r['scale'], r['phase']))
+        if base is None:
+            continue
+        if base['throughput'] and r['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{r['phase']} @ {r['scale']}: throughput {r['throughput']:.1f}/s vs {base['throughput']:.1f}/s"
+            )
+        if base['p99_ms'] and r['p99_ms'] is not None and r['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{r['phase']} @ {r['scale']}: p99 {r['p99_ms']:.3f}ms vs {base['p99_ms']:.3f}ms"
+            )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> List[PhaseResult]:
+    results: List[PhaseResult] = []
+    with tempfile.TemporaryDirectory(prefix='reco-bench-') as workdir:
+        for scale in args.scales:
+            results.extend(await run_scale(scale, args, workdir))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the recommendation service hot paths')
+    parser.add_argument('--scales', default='10k,100k', help='Comma-separated view counts to warm-load, e.g. 10k,100k,1m,10m')
+    parser.add_argument('--views', type=int, default=20000, help='track_view calls per scale')
+    parser.add_argument('--bulk-size', type=int, default=500, help='Views per track_views call')
+    parser.add_argument('--requests', type=int, default=5000, help='get_recommendations calls per scale')
+    parser.add_argument('--limit', type=int, default=20, help='Page size of each recommendation request')
+    parser.add_argument('--users', type=int, default=None, help='Distinct users (default: scale / 20)')
+    parser.add_argument('--posts', type=int, default=None, help='Distinct posts (default: scale / 50)')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of user activity and post popularity')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0, help='Simulated latency per DB round trip')
+    parser.add_argument('--trace-memory', action='store_true', help='Also report the Python heap peak per phase (slower)')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression against the baseline')
+    parser.add_argument('--log-level', default='WARNING', help='Service log level (per-view INFO logs skew latencies)')
+    args = parser.parse_args(argv)
+    args.scales = [parse_scale(s) for s in args.scales.split(',') if s.strip()]
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if args.trace_memory:
+        tracemalloc.start()
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    rows = [r.as_dict() for r in results]
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(rows, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
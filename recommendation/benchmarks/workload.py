@@ -0,0 +1,108 @@
+"""Synthetic view streams with Zipf-distributed users and posts"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SESSION_GAP_SECONDS = 1800
+
+
+def zipf_weights(n: int, skew: float) -> np.ndarray:
+    """Probabilities of ranks 1..n under a bounded Zipf law"""
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** skew
+    return weights / weights.sum()
+
+
+class Workload:
+    """A time-ordered view history plus a generator of new views from the same distribution.
+
+    Users and posts are drawn independently from Zipf laws, so a few users
+    view a lot and a few posts are viewed a lot, like real feeds. Rows are
+    kept as NumPy columns and only turned into dicts one chunk at a time,
+    so 10M-view workloads fit in a few hundred MB.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        n_users: Optional[int] = None,
+        n_posts: Optional[int] = None,
+        n_authors: Optional[int] = None,
+        skew: float = 1.1,
+        span_days: float = 30.0,
+        seed: int = 42
+    ):
+        self.size = size
+        self.n_users = n_users or max(size // 20, 100)
+        self.n_posts = n_posts or max(size // 50, 100)
+        self.n_authors = n_authors or max(self.n_posts // 20, 10)
+        self.skew = skew
+        self.rng = np.random.default_rng(seed)
+
+        self.user_weights = zipf_weights(self.n_users, skew)
+        self.post_weights = zipf_weights(self.n_posts, skew)
+        self.users = self.rng.choice(self.n_users, size, p=self.user_weights).astype(np.int32)
+        self.posts = self.rng.choice(self.n_posts, size, p=self.post_weights).astype(np.int32)
+        self.end = datetime.now(timezone.utc).timestamp() - 60
+        self.start = self.end - span_days * 86400
+        self.times = self.start + np.sort(self.rng.random(size)) * (self.end - self.start)
+        self.durations = self._durations(size)
+
+    def _durations(self, count: int) -> np.ndarray:
+        # Dwell times are roughly log-normal around 8s
+        return np.clip(self.rng.lognormal(np.log(8000), 1.0, count), 200, 600000).astype(np.int32)
+
+    @staticmethod
+    def user_id(user: int) -> str:
+        return f"user-{user:08d}"
+
+    @staticmethod
+    def post_id(post: int) -> str:
+        return f"post-{post:08d}"
+
+    def author_id(self, post: int) -> str:
+        return f"author-{post % self.n_authors:06d}"
+
+    @staticmethod
+    def session_id(user: int, timestamp: float) -> str:
+        return f"s-{user}-{int(timestamp // SESSION_GAP_SECONDS)}"
+
+    def rows(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """RecommendationView rows [start, end) as the DB driver would return them"""
+        return [
+            {
+                'userId': self.user_id(user),
+                'postId': self.post_id(post),
+                'postAuthorId': self.author_id(post),
+                'createdAt': datetime.fromtimestamp(t, timezone.utc),
+                'sessionId': self.session_id(user, t),
+                'durationMs': duration,
+            }
+            for user, post, t, duration in zip(
+                self.users[start:end].tolist(),
+                self.posts[start:end].tolist(),
+                self.times[start:end].tolist(),
+                self.durations[start:end].tolist()
+            )
+        ]
+
+    def first_row_at(self, since: datetime) -> int:
+        """Index of the first row with createdAt >= since"""
+        return int(np.searchsorted(self.times, since.timestamp(), side='left'))
+
+    def post_created_at(self, post: int) -> datetime:
+        # Lower ranks are older posts, so popular posts have had time to collect views
+        return datetime.fromtimestamp(self.start - 86400 + post * 60.0, timezone.utc)
+
+    def views(self, count: int) -> Iterator[Tuple[str, str, str, int, str]]:
+        """New (user_id, post_id, author_id, duration_ms, session_id) views"""
+        users = self.rng.choice(self.n_users, count, p=self.user_weights).tolist()
+        posts = self.rng.choice(self.n_posts, count, p=self.post_weights).tolist()
+        durations = self._durations(count).tolist()
+        now = datetime.now(timezone.utc).timestamp()
+        for user, post, duration in zip(users, posts, durations):
+            yield self.user_id(user), self.post_id(post), self.author_id(post), duration, self.session_id(user, now)
+
+    def request_users(self, count: int) -> List[str]:
+        """Users asking for recommendations, the most active ones most often"""
+        return [self.user_id(u) for u in self.rng.choice(self.n_users, count, p=self.user_weights).tolist()]
@@ -0,0 +1,30 @@
+"""Shared fixtures: a recommendation service whose files live in a temporary directory"""
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.recommendation_service import RecommendationService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'MODEL_PATH', str(tmp_path / 'models' / 'recommendation_model'))
+    monkeypatch.setattr(settings, 'RECO_READ_SNAPSHOT_INTERVAL', 0.0)
+    svc = RecommendationService()
+    yield svc
+    svc.close()
+
+
+def add_tied_coviews(svc: RecommendationService, user_id: str = 'user-1', n_candidates: int = 45) -> list:
+    """Give user_id a history whose candidates share three scores; returns the candidates"""
+    history = ['seen-a', 'seen-b']
+    for post_id in history:
+        svc.user_post_interactions[user_id][post_id] = 0.0
+    rng = np.random.default_rng(1)
+    # Interned in shuffled order so post index order differs from id order
+    candidates = [f"post-{i:03d}" for i in rng.permutation(n_candidates)]
+    for post_id in candidates:
+        svc.coview.add('seen-a', post_id, float(rng.integers(1, 3)))
+        if rng.random() < 0.5:
+            svc.coview.add('seen-b', post_id, 1.0)
+    return candidates
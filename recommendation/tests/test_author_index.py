@@ -0,0 +1,38 @@
+"""Author fallback index: bounded per-user affinities, rebuilt after a refresh"""
+import asyncio
+from datetime import datetime
+
+from app.services import author_index
+from app.services.author_index import AuthorIndex
+
+
+def refresh(index, monkeypatch, posts):
+    async def execute_query(query, params=None):
+        return [
+            {'id': post_id, 'authorId': author_id, 'createdAt': datetime(2024, 1, 1, i)}
+            for i, (post_id, author_id) in enumerate(posts)
+        ]
+
+    monkeypatch.setattr(author_index.db, 'execute_query', execute_query)
+    asyncio.run(index.refresh())
+
+
+def test_affinities_are_bounded_and_rebuilt_on_refresh(monkeypatch):
+    index = AuthorIndex(posts_per_author=10, max_authors=5, affinity_cache_size=2)
+    refresh(index, monkeypatch, [('p1', 'alice'), ('p2', 'bob'), ('p3', 'bob')])
+
+    assert index.authors_for('u1', ['p1', 'p2', 'p3']) == ['bob', 'alice']
+    index.record_view('u1', 'p1')
+    index.record_view('u1', 'p1')
+    assert index.authors_for('u1', []) == ['alice', 'bob']
+
+    # Only the most recently served users keep an affinity map
+    index.authors_for('u2', ['p1'])
+    index.authors_for('u3', ['p2'])
+    assert len(index.affinity) == 2
+    assert index.affinity.get('u1') is None
+
+    # p1 changed hands; the rebuilt map follows the refreshed index
+    refresh(index, monkeypatch, [('p1', 'bob'), ('p2', 'bob')])
+    assert len(index.affinity) == 0
+    assert index.authors_for('u2', ['p1']) == ['bob']
@@ -0,0 +1,27 @@
+"""Smoke run of the benchmark harness at a small scale"""
+from app.config import settings
+from app.database import db
+from benchmarks import run
+
+
+def test_benchmark_runs_at_small_scale(tmp_path, monkeypatch, capsys):
+    # The harness points settings and the shared db at its own stand-ins; restore them afterwards
+    monkeypatch.setattr(settings, 'MODEL_PATH', settings.MODEL_PATH)
+    for name in ('execute_query', 'stream_query', 'execute', 'executemany', 'copy_records_to_table'):
+        monkeypatch.setattr(db, name, getattr(db, name))
+    # Snapshot often, so interaction snapshots are still running when the service stops
+    monkeypatch.setattr(settings, 'INTERACTION_SNAPSHOT_EVERY', 100)
+    output = tmp_path / 'results.json'
+
+    assert run.main([
+        '--scales', '2k',
+        '--views', '300',
+        '--bulk-size', '50',
+        '--requests', '50',
+        '--output', str(output),
+    ]) == 0
+
+    printed = capsys.readouterr().out
+    for phase in ('warm_load', 'track_view', 'track_views', 'get_recommendations'):
+        assert phase in printed
+    assert output.exists()
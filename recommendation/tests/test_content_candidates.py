@@ -0,0 +1,61 @@
+"""Content-based candidates are blended in the same way by every ranking path"""
+import asyncio
+
+import numpy as np
+
+from app.config import settings
+from app.services.content_index import ContentIndex
+
+
+def add_views(svc):
+    rng = np.random.default_rng(5)
+    post_ids = [f'post-{i}' for i in range(30)]
+    for i, post_id in enumerate(post_ids):
+        svc.content_index.index.add(post_id, rng.normal(size=8))
+    for u in range(12):
+        for j, post_id in enumerate(rng.choice(post_ids[:20], size=4, replace=False).tolist()):
+            svc._add_interaction(f'user-{u}', post_id, 1000.0 + j)
+    # Viewed once, so they have embeddings but no co-views: only content can rank them
+    for i, post_id in enumerate(post_ids[20:]):
+        svc._add_interaction(f'loner-{i}', post_id, 1000.0)
+    return [f'user-{u}' for u in range(12)]
+
+
+def test_batch_and_precomputed_feeds_blend_content_like_online_scoring(service, tmp_path, monkeypatch):
+    service.content_index = ContentIndex(str(tmp_path / 'embeddings.npz'), 'unused')
+    user_ids = add_views(service)
+    limit = 8
+    monkeypatch.setattr(settings, 'RECO_RESULT_CACHE_DEPTH', limit)
+    # Heavy enough that content candidates make it into the first page
+    monkeypatch.setattr(settings, 'RECO_EMBEDDING_WEIGHT', 2.0)
+
+    async def post_details(post_ids):
+        return [{'id': post_id} for post_id in post_ids]
+
+    monkeypatch.setattr(service, 'get_post_details', post_details)
+
+    async def main():
+        service.warmup.mark_ready()
+        model = service.read_model()
+        online = {}
+        for user_id in user_ids:
+            history = model.history(service.user_post_interactions[user_id])
+            ranked = await service._rank_candidates(user_id, model, history, limit)
+            online[user_id] = (model.posts.keys(ranked.post_idx[:limit].tolist()), ranked.scores[:limit])
+        # Content candidates do reach users through online scoring
+        content_only = {f'post-{i}' for i in range(20, 30)}
+        assert content_only & {post_id for post_ids, _ in online.values() for post_id in post_ids}
+
+        batch = await service.get_batch_recommendations(user_ids, limit=limit)
+        for user_id in user_ids:
+            posts, _ = batch[user_id]
+            assert [p['id'] for p in posts] == online[user_id][0]
+            np.testing.assert_allclose([p['similarity_score'] for p in posts], online[user_id][1], atol=1e-6)
+
+        await service.precompute_feeds(workers=1, depth=limit)
+        for user_id in user_ids:
+            ranked = service._precomputed_ranking(user_id, model, limit)
+            assert model.posts.keys(ranked.post_idx.tolist()) == online[user_id][0]
+            np.testing.assert_allclose(ranked.scores, online[user_id][1])
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Keyset cursors: decoded per feed, rejected with a 400 when malformed"""
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.exceptions import InvalidCursorError
+
+
+def token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def test_cursors_round_trip_per_feed():
+    assert decode_cursor(encode_cursor('similarity', 'post-1', score=0.5)) == {'src': 'similarity', 'i': 'post-1', 's': 0.5}
+    assert decode_cursor(encode_cursor('popular', 'post-1', score=3))['s'] == 3.0
+    created_at = datetime(2024, 5, 1, 12)
+    assert decode_cursor(encode_cursor('author', 'post-1', created_at=created_at))['c'] == created_at
+
+
+@pytest.mark.parametrize('payload', [
+    {'src': 'author', 'i': 'post-1'},
+    {'src': 'author', 'i': 'post-1', 'c': 'yesterday'},
+    {'src': 'popular', 'i': 'post-1'},
+    {'src': 'popular', 'i': 'post-1', 's': 'high'},
+    {'src': 'similarity', 'i': 'post-1', 's': True},
+    {'src': 'similarity', 'i': 7, 's': 0.5},
+    {'src': 'trending', 'i': 'post-1', 's': 0.5},
+    ['popular', 'post-1'],
+])
+def test_decodable_cursors_without_their_feed_keys_are_rejected(payload):
+    with pytest.raises(InvalidCursorError) as e:
+        decode_cursor(token(payload))
+    assert e.value.status_code == 400
+
+
+def test_malformed_cursors_are_rejected_before_serving(service):
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(service.get_recommendations('user-1', cursor=token({'src': 'author', 'i': 'post-1'})))
+
+
+def test_leaderboard_pages_honour_include_total(service, monkeypatch):
+    popularity = service.popularity
+    popularity.post_ids = [f'post-{i}' for i in range(5)]
+    popularity.scores = np.array([5, 4, 3, 2, 1], dtype=np.float32)
+    popularity._positions = {post_id: i for i, post_id in enumerate(popularity.post_ids)}
+    popularity.refreshed_at = time.time()
+
+    async def get_post_details(post_ids):
+        return [{'id': post_id} for post_id in post_ids]
+
+    monkeypatch.setattr(service, 'get_post_details', get_post_details)
+
+    async def main():
+        first = await service.get_popular_posts_paged(limit=2, include_total=False)
+        after = decode_cursor(first[2])
+        second = await service.get_popular_posts_paged(limit=2, after=after, include_total=False)
+        counted = await service.get_popular_posts_paged(limit=2, after=after)
+        return first, second, counted
+
+    first, second, counted = asyncio.run(main())
+    assert [p['id'] for p in first[0] + second[0]] == ['post-0', 'post-1', 'post-2', 'post-3']
+    assert first[1] is None and second[1] is None
+    assert counted[1] == 5
@@ -0,0 +1,52 @@
+"""Precomputed feeds: published by a job, picked up in the background, served from memory"""
+import asyncio
+
+import pytest
+
+from app.services.feed_store import FeedReader
+
+
+def add_views(svc):
+    # Overlapping histories, so every user has candidates
+    for user_id, post_ids in (('u1', 'ab'), ('u2', 'bc'), ('u3', 'cd')):
+        for i, post_id in enumerate(post_ids):
+            svc._add_interaction(user_id, post_id, 1000.0 + i)
+
+
+def test_requests_read_feeds_without_touching_disk(service, monkeypatch):
+    add_views(service)
+    assert asyncio.run(service.precompute_feeds(workers=1, depth=10)) == 3
+
+    # Even when a re-check is due, a request must not open the store itself
+    service.feed_reader.check_interval = 0.0
+    reads = []
+    monkeypatch.setattr(service.feed_store, 'current', lambda: reads.append('current'))
+    monkeypatch.setattr(service.feed_store, 'load', lambda: reads.append('load'))
+    ranked = service._precomputed_ranking('u1', service.read_model(), 5)
+    assert ranked is not None
+    assert ranked.total > 0
+    assert reads == []
+
+
+def test_reader_picks_up_new_generations_in_the_background(service):
+    add_views(service)
+    reader = FeedReader(service.feed_store, check_interval=0.01)
+
+    async def main():
+        task = asyncio.create_task(reader.run())
+        try:
+            await asyncio.sleep(0.05)
+            assert reader.feeds is None
+            await service.precompute_feeds(workers=1, depth=10)
+            for _ in range(100):
+                if reader.feeds is not None:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(main())
+    assert reader.feeds is not None
+    assert len(reader.feeds) == 3
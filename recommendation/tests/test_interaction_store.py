@@ -0,0 +1,38 @@
+"""The interaction log keeps disk waits off the event loop"""
+import asyncio
+import os
+import threading
+
+from app.services import interaction_store
+from app.services.interaction_store import InteractionStore
+
+
+def test_batches_are_fsynced_in_a_thread(tmp_path, monkeypatch):
+    store = InteractionStore(str(tmp_path), fsync_every=3, fsync_interval=60.0)
+    fsynced = []
+    fsync = os.fsync
+
+    def record_fsync(fd):
+        fsynced.append(threading.current_thread())
+        fsync(fd)
+
+    monkeypatch.setattr(interaction_store.os, 'fsync', record_fsync)
+
+    async def main():
+        for i in range(3):
+            store.append('user-1', f'post-{i}')
+        # Due, but only started: appending never waits for the disk
+        assert fsynced == []
+        await store._sync_task
+        assert len(fsynced) == 1 and fsynced[0] is not threading.main_thread()
+
+        store.append('user-1', 'post-3')
+        log, rotated = store.rotate()
+        assert len(rotated) == 1
+        store.append('user-2', 'post-0')
+        await asyncio.to_thread(store.finish_rotation, log)
+        await store.aclose()
+
+    asyncio.run(main())
+    assert all(thread is not threading.main_thread() for thread in fsynced)
+    assert [r['p'] for r in store.replay()] == ['post-0', 'post-1', 'post-2', 'post-3', 'post-0']
@@ -0,0 +1,53 @@
+"""Metrics registry: Prometheus text output, and no-op timers while disabled"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.metrics import MetricsRegistry, _NULL_TIMER
+
+
+def test_histograms_and_counters_render_cumulative_samples():
+    registry = MetricsRegistry()
+    latency = registry.histogram('op_seconds', 'Op latency', ['phase'], buckets=(0.1, 1.0))
+    latency.labels('rank').observe(0.05)
+    latency.labels('rank').observe(0.5)
+    latency.labels('rank').observe(5.0)
+    with latency.labels('fetch').time():
+        pass
+    hits = registry.counter('hits_total', 'Hits', ['cache'])
+    hits.labels('result').inc()
+    hits.labels('result').inc(2)
+    registry.callback('size', 'Entries', 'gauge', ['cache'], lambda: {('post',): 3})
+    # Registering a metric again hands back the existing one
+    assert registry.counter('hits_total', 'Hits', ['cache']) is hits
+
+    lines = registry.render().splitlines()
+    assert '# TYPE op_seconds histogram' in lines
+    assert 'op_seconds_bucket{phase="rank",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{phase="rank",le="1.0"} 2' in lines
+    assert 'op_seconds_bucket{phase="rank",le="+Inf"} 3' in lines
+    assert 'op_seconds_sum{phase="rank"} 5.55' in lines
+    assert 'op_seconds_count{phase="fetch"} 1' in lines
+    assert 'hits_total{cache="result"} 3' in lines
+    assert 'size{cache="post"} 3' in lines
+    # Sorted by metric name
+    assert [line.split()[2] for line in lines if line.startswith('# TYPE')] == ['hits_total', 'op_seconds', 'size']
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    latency = registry.histogram('op_seconds', 'Op latency')
+    hits = registry.counter('hits_total', 'Hits')
+    assert latency.time() is _NULL_TIMER
+    latency.observe(1.0)
+    hits.inc()
+    assert 'op_seconds_count 0' in registry.render().splitlines()
+    assert hits.labels().value == 0
+
+
+def test_metrics_endpoint_serves_the_request_histogram():
+    client = TestClient(app)
+    assert client.get('/').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'reco_http_request_seconds_count{method="GET",route="/",status="200"}' in response.text
@@ -0,0 +1,169 @@
+"""Binary model snapshots: written from the live model, mapped back at startup"""
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.services.model_snapshot import MappedIdIndex, _save_ids
+from app.services.recommendation_service import RecommendationService
+
+
+def add_views(svc, users, start):
+    rng = np.random.default_rng(int(start))
+    for u in users:
+        for i, post in enumerate(rng.choice(40, size=5, replace=False).tolist()):
+            # Only some views carry a session id or dwell time
+            session_id = f'sess-{u}' if i % 2 else None
+            duration_ms = 1000 * i if i % 3 else None
+            view = (f'user-{u}', f'post-{post}', start + i, session_id, duration_ms)
+            if svc._add_interaction(*view):
+                svc.interaction_store.append(*view)
+
+
+def snapshot(svc):
+    async def main():
+        await svc._schedule_snapshot()
+
+    asyncio.run(main())
+
+
+def assert_same_model(expected, actual):
+    assert dict(actual.user_post_interactions.items()) == dict(expected.user_post_interactions.items())
+    assert (
+        {u: c for u, c in actual.view_context.items() if c}
+        == {u: c for u, c in expected.view_context.items() if c}
+    )
+    for post_id in expected.coview.posts.ids:
+        assert actual.coview.neighbors(post_id) == pytest.approx(expected.coview.neighbors(post_id))
+        assert actual.coview.posts.get(post_id) == expected.coview.posts.get(post_id)
+
+
+def loaded_service():
+    svc = RecommendationService()
+    svc.load_interactions()
+    assert svc.model_loaded
+    return svc
+
+
+def test_snapshot_round_trip_and_incremental_rewrite(service):
+    add_views(service, range(20), 1000.0)
+    snapshot(service)
+    assert service.interaction_store.rotated_logs() == []
+    assert not os.path.exists(service.interaction_store.snapshot_file)
+
+    loaded = loaded_service()
+    try:
+        assert_same_model(service, loaded)
+        # Views on top of the mapped snapshot only re-encode the users they touch
+        add_views(loaded, range(15, 25), 2000.0)
+        prepared, rotation = loaded._prepare_snapshots()
+        assert len(prepared['changed']) == 10
+        loaded._write_snapshots(prepared, rotation)
+    finally:
+        loaded.close()
+
+    reloaded = loaded_service()
+    try:
+        assert reloaded.interaction_store.records_since_snapshot == 0
+        assert_same_model(loaded, reloaded)
+    finally:
+        reloaded.close()
+
+
+def test_failed_write_keeps_the_rotated_logs(service, monkeypatch):
+    add_views(service, range(5), 1000.0)
+    snapshot(service)
+    write = service.model_snapshot.write
+
+    def fail(prepared):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(service.model_snapshot, 'write', fail)
+    add_views(service, range(5, 10), 2000.0)
+    snapshot(service)
+    add_views(service, range(10, 15), 3000.0)
+    snapshot(service)
+    assert len(service.interaction_store.rotated_logs()) == 2
+
+    # The previous snapshot plus the rotated logs still hold every view
+    loaded = loaded_service()
+    try:
+        assert_same_model(service, loaded)
+    finally:
+        loaded.close()
+
+    # The next published snapshot covers, and drops, every rotated log
+    monkeypatch.setattr(service.model_snapshot, 'write', write)
+    add_views(service, range(15, 20), 4000.0)
+    snapshot(service)
+    assert service.interaction_store.rotated_logs() == []
+    loaded = loaded_service()
+    try:
+        assert loaded.interaction_store.records_since_snapshot == 0
+        assert_same_model(service, loaded)
+    finally:
+        loaded.close()
+
+
+def test_mapped_id_index_searches_the_sorted_ids(tmp_path):
+    ids = ['post-b', 'post-a', 'пост-c', 'post-10']
+    _save_ids(str(tmp_path), 'posts', ids)
+
+    def load(name):
+        return np.load(tmp_path / f'{name}.npy', mmap_mode='r')
+
+    index = MappedIdIndex(load('posts'), load('posts_sorted'), load('posts_order'))
+    assert len(index) == 4
+    assert [index.get(key) for key in ids] == [0, 1, 2, 3]
+    assert index.get('post-c') is None
+    assert 'post-a' in index and 'post-zz' not in index
+    # Unknown keys are skipped, as with IdIndex
+    assert index.lookup(['post-10', 'post-zz', 'post-b']).tolist() == [3, 0]
+
+    # Ids interned after loading follow the snapshot ids
+    assert index.intern('post-a') == 1
+    assert index.intern('post-new') == 4
+    assert index.lookup(['post-new', 'пост-c']).tolist() == [4, 2]
+    assert index.keys([2, 4]) == ['пост-c', 'post-new']
+    assert index.ids == ids + ['post-new']
+
+
+def test_snapshots_are_versioned_and_published_atomically(service):
+    add_views(service, range(5), 1000.0)
+    snapshot(service)
+    first = service.model_snapshot.current()
+    add_views(service, range(5, 10), 2000.0)
+    snapshot(service)
+    add_views(service, range(10, 15), 3000.0)
+    snapshot(service)
+    current = service.model_snapshot.current()
+    directory = service.model_snapshot.directory
+    # The published snapshot and the one it replaced; older generations are dropped
+    generations = sorted(name for name in os.listdir(directory) if name.startswith('model-'))
+    assert len(generations) == 2 and current in generations and first not in generations
+
+    # A crash mid-write leaves a temporary directory that loading never looks at
+    os.makedirs(os.path.join(directory, 'model-9999999999999.tmp'))
+    loaded = loaded_service()
+    try:
+        assert isinstance(loaded.coview._indices, np.memmap)
+        assert_same_model(service, loaded)
+    finally:
+        loaded.close()
+
+    meta_file = os.path.join(directory, current, 'meta.json')
+    with open(meta_file) as f:
+        meta = json.load(f)
+    with open(meta_file, 'w') as f:
+        json.dump(dict(meta, version=meta['version'] + 1), f)
+    with pytest.raises(ValueError, match='version'):
+        service.model_snapshot.load()
+    # An unreadable snapshot is skipped rather than half-loaded
+    fallback = RecommendationService()
+    try:
+        assert not fallback._load_model_snapshot()
+        assert len(fallback.user_post_interactions) == 0
+    finally:
+        fallback.close()
@@ -0,0 +1,43 @@
+"""Popularity leaderboard: pages sliced from memory, viewed posts skipped by position"""
+import asyncio
+
+from app.services import popularity
+from app.services.popularity import PopularityLeaderboard
+
+COUNTS_SQL = {'likes': '0', 'comments': '0', 'joins': '', 'group_by': ''}
+
+
+def leaderboard(monkeypatch, scores):
+    async def execute_query(query, params=None):
+        return [{'id': f'post-{i}', 'popularity_score': s} for i, s in enumerate(scores)]
+
+    monkeypatch.setattr(popularity.db, 'execute_query', execute_query)
+    board = PopularityLeaderboard()
+    asyncio.run(board.refresh(COUNTS_SQL))
+    return board
+
+
+def test_pages_skip_excluded_posts(monkeypatch):
+    board = leaderboard(monkeypatch, [9, 8, 7, 6, 5, 4, 3, 2, 1, 0])
+    excluded = ['post-0', 'post-3', 'post-4', 'missing']
+
+    pages = [board.page(page, 3, excluded) for page in (1, 2, 3)]
+    assert [ids for ids, _, _ in pages] == [
+        ['post-1', 'post-2', 'post-5'],
+        ['post-6', 'post-7', 'post-8'],
+        ['post-9'],
+    ]
+    assert {total for _, _, total in pages} == {7}
+    assert pages[0][1] == [8.0, 7.0, 4.0]
+    assert board.page(4, 3, excluded) == ([], [], 7)
+
+
+def test_cursor_pages_walk_tied_scores_and_survive_a_refresh(monkeypatch):
+    board = leaderboard(monkeypatch, [3, 2, 2, 2, 2, 1])
+    ids, scores, total, has_more = board.after('post-1', 2.0, 2, ['post-2'])
+    assert (ids, scores, total, has_more) == (['post-3', 'post-4'], [2.0, 2.0], 5, True)
+    assert board.after('post-4', 2.0, 2) == (['post-5'], [1.0], 6, False)
+
+    # The cursor post dropped out: resume after the last post with its score
+    board = leaderboard(monkeypatch, [3, 2, 2, 1])
+    assert board.after('post-9', 2.0, 5)[0] == ['post-3']
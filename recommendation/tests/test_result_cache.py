@@ -0,0 +1,47 @@
+"""Per-user ranking cache: later pages reuse the first ranking until the user views a post"""
+import asyncio
+
+from tests.conftest import add_tied_coviews
+
+
+def test_cursor_pages_share_one_ranking_until_a_new_view(service, monkeypatch):
+    candidates = add_tied_coviews(service)
+    service.warmup.mark_ready()
+    rank = service.scoring_pool.rank
+    scored = []
+
+    async def counting_rank(*args, **kwargs):
+        scored.append(1)
+        return await rank(*args, **kwargs)
+
+    async def get_post_details(post_ids):
+        return [{'id': post_id} for post_id in post_ids]
+
+    monkeypatch.setattr(service.scoring_pool, 'rank', counting_rank)
+    monkeypatch.setattr(service, 'get_post_details', get_post_details)
+
+    async def walk():
+        served, cursor = [], None
+        while True:
+            posts, _, cursor = await service.get_recommendations('user-1', limit=8, cursor=cursor)
+            assert {p['source'] for p in posts} == {'similarity'}
+            served.extend(p['id'] for p in posts)
+            if cursor is None:
+                return served
+
+    served = asyncio.run(walk())
+    # Tied scores are broken by post, so keyset pages neither skip nor repeat candidates
+    assert len(served) == len(set(served))
+    assert sorted(served) == sorted(candidates)
+    assert len(scored) == 1
+    stats = service.get_statistics()['result_cache']
+    assert stats['misses'] == 1 and stats['hits'] == len(served) // 8
+
+    async def view_and_page():
+        await service.track_view('user-1', candidates[0])
+        return await service.get_recommendations('user-1', limit=8)
+
+    posts, total, _ = asyncio.run(view_and_page())
+    assert len(scored) == 2
+    assert total == len(candidates) - 1
+    assert candidates[0] not in {p['id'] for p in posts}
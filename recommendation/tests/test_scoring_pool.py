@@ -0,0 +1,69 @@
+"""Scoring off the event loop: same rankings in every executor, popular posts on timeout"""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services import scoring_pool
+from app.services.recommendation_service import SCORING_TIMEOUTS
+from app.services.scoring_pool import ScoringPool, ScoringTimeout
+from tests.conftest import add_tied_coviews
+
+
+@pytest.mark.parametrize('mode', ['thread', 'process'])
+def test_pools_rank_like_the_inline_kernel(service, mode):
+    add_tied_coviews(service)
+    model = service.read_model()
+    history = model.history(service.user_post_interactions['user-1'])
+    pool = ScoringPool(mode, workers=2)
+
+    async def main():
+        await pool.start()
+        inline = await ScoringPool('inline').rank(model, history, 20)
+        pooled = await pool.rank(model, history, 20, after=(float(inline[1][4]), int(inline[0][4])))
+        many = await pool.rank_many(model, [history, history[:1]], 20)
+        return inline, pooled, many
+
+    try:
+        inline, pooled, many = asyncio.run(main())
+    finally:
+        pool.shutdown()
+    np.testing.assert_array_equal(pooled[0][:15], inline[0][5:])
+    assert pooled[2] == inline[2]
+    _, (owners, posts, _, totals) = many
+    np.testing.assert_array_equal(posts[owners == 0], inline[0])
+    assert totals[0] == inline[2]
+
+
+def test_slow_scoring_times_out_to_the_popular_feed(service, monkeypatch):
+    add_tied_coviews(service)
+    service.warmup.mark_ready()
+    service.scoring_pool = ScoringPool('thread', workers=1)
+    rank_history = scoring_pool.rank_history
+
+    def slow_rank_history(*args):
+        time.sleep(0.2)
+        return rank_history(*args)
+
+    async def popular_fallback(page, limit, exclude_ids=None, after=None, include_total=True):
+        return [{'id': 'popular-1', 'source': 'popular'}], 1, None
+
+    monkeypatch.setattr(scoring_pool, 'rank_history', slow_rank_history)
+    monkeypatch.setattr(service, '_popular_fallback', popular_fallback)
+    monkeypatch.setattr(settings, 'RECO_SCORING_TIMEOUT', 0.05)
+
+    timeouts = SCORING_TIMEOUTS.labels().value
+
+    async def main():
+        with pytest.raises(ScoringTimeout):
+            await service.scoring_pool.rank(service.read_model(), np.array([0]), 10, timeout=0.05)
+        return await service.get_recommendations('user-1')
+
+    try:
+        posts, total, _ = asyncio.run(main())
+    finally:
+        service.scoring_pool.shutdown()
+    assert [p['id'] for p in posts] == ['popular-1']
+    assert SCORING_TIMEOUTS.labels().value == timeouts + 1
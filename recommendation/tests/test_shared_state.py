@@ -0,0 +1,47 @@
+"""Generations published by the shared-state writer, as the readers map them"""
+import numpy as np
+
+from app.services.coview import CoViewMatrix
+from app.services.shared_state import SharedModelPublisher, SharedModelReader
+
+
+def add_history(coview, interactions, user_id, post_ids, start):
+    history = interactions.setdefault(user_id, {})
+    for i, post_id in enumerate(post_ids):
+        for other in history:
+            coview.add(post_id, other, 1.0 / (i + 1))
+        history[post_id] = start + i
+
+
+def assert_published(reader, coview, interactions):
+    published = reader.refresh()
+    assert published is not None
+    shared_coview, shared_histories = published
+    assert dict(shared_histories.items()) == interactions
+    coview.compact()
+    for expected, actual in zip(coview.csr(), shared_coview.csr()):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_incremental_generations_match_the_writer(tmp_path):
+    publisher = SharedModelPublisher(str(tmp_path))
+    reader = SharedModelReader(str(tmp_path))
+    coview = CoViewMatrix(max_neighbors=3, top_k=2)
+    interactions = {}
+    add_history(coview, interactions, 'u1', ['a', 'b', 'c'], 100.0)
+    add_history(coview, interactions, 'u2', ['b', 'd'], 200.0)
+    publisher.write(publisher.prepare(coview, interactions, ['u1', 'u2']))
+    assert_published(reader, coview, interactions)
+
+    # Only the changed users are passed on; a new user and a longer history are spliced in
+    add_history(coview, interactions, 'u3', ['e', 'a', 'd', 'f'], 300.0)
+    add_history(coview, interactions, 'u1', ['d', 'e'], 400.0)
+    prepared = publisher.prepare(coview, interactions, ['u3', 'u1'])
+    assert sorted(prepared['changed']) == [0, 2]
+    publisher.write(prepared)
+    assert_published(reader, coview, interactions)
+
+    # Without a change set every history is encoded again
+    interactions['u2'].pop('d')
+    publisher.write(publisher.prepare(coview, interactions))
+    assert_published(reader, coview, interactions)
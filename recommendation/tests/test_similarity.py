@@ -0,0 +1,78 @@
+"""Normalized similarities: the batch build and the co-views added after it"""
+import asyncio
+
+import numpy as np
+
+from app.services.recommendation_service import RecommendationService
+from app.services.similarity import cooccurrence
+
+DAY = 86400.0
+
+
+def add_views(svc, user_id, post_ids, start, step=60.0, duration_ms=None, session_ids=None):
+    for i, post_id in enumerate(post_ids):
+        session_id = session_ids[i] if session_ids else None
+        svc._add_interaction(user_id, post_id, start + i * step, session_id=session_id, duration_ms=duration_ms)
+
+
+def test_cooccurrence_pairs_views_within_a_session():
+    # Posts 0-1 and 2-3 are two sessions; post 4 has no session and pairs with anything in the window
+    history = np.array([0, 1, 2, 3, 4])
+    sessions = np.array([7, 7, 8, 8, -1])
+    a, b, count, degrees = cooccurrence([history], 5, window=3, sessions=[sessions])
+    assert sorted(zip(a.tolist(), b.tolist())) == [(0, 1), (1, 4), (2, 3), (2, 4), (3, 4)]
+    np.testing.assert_array_equal(count, np.ones(5))
+    np.testing.assert_array_equal(degrees, np.ones(5))
+
+
+def test_rebuild_keeps_the_live_coview_pairs(service):
+    add_views(service, 'u1', 'abcd', 1000.0, session_ids=['s1', 's1', 's2', 's2'])
+    add_views(service, 'u2', 'bcde', 1000.0, session_ids=['s3', None, 's4', 's4'])
+    add_views(service, 'u3', 'ace', 1000.0)
+    live = {post_id: set(service.coview.neighbors(post_id)) for post_id in 'abcde'}
+    asyncio.run(service.rebuild_similarity('jaccard'))
+    assert {post_id: set(service.coview.neighbors(post_id)) for post_id in 'abcde'} == live
+
+
+def test_live_coviews_add_one_cooccurrence(service):
+    for user_id, post_ids in (('u1', 'ab'), ('u2', 'ac'), ('u3', 'bc'), ('u4', 'abc')):
+        add_views(service, user_id, post_ids, 1000.0)
+    asyncio.run(service.rebuild_similarity('cosine'))
+    posts = service.coview.posts
+    a, b = posts.get('a'), posts.get('b')
+    expected, _ = service.similarity.normalize(np.array([a]), np.array([b]), np.ones(1))
+
+    # Age and dwell time weight raw co-views, but the build only counts pairs
+    increments = []
+    for user_id, step, duration_ms in (('u5', 60.0, None), ('u6', 20 * DAY, 900000)):
+        before = service.coview.neighbors('a').get('b', 0.0)
+        add_views(service, user_id, 'ba', 1000.0, step=step, duration_ms=duration_ms)
+        increments.append(service.coview.neighbors('a')['b'] - before)
+    np.testing.assert_allclose(increments, [expected[0], expected[0]], rtol=1e-5)
+
+
+def test_restart_keeps_scaling_new_coviews(service):
+    add_views(service, 'u1', 'abc', 1000.0)
+    add_views(service, 'u2', 'bcd', 1000.0)
+    asyncio.run(service.rebuild_similarity('cosine'))
+    # Rebuilt again from the snapshot the first build wrote, plus the users changed since
+    add_views(service, 'u3', 'acd', 2000.0)
+    add_views(service, 'u1', 'e', 2000.0)
+    asyncio.run(service.rebuild_similarity('cosine'))
+    assert service.similarity.n_users == 3
+
+    async def snapshot():
+        await service._schedule_snapshot()
+
+    asyncio.run(snapshot())
+    restarted = RecommendationService()
+    try:
+        restarted.load_interactions()
+        assert restarted.similarity.metric == 'cosine'
+        np.testing.assert_array_equal(restarted.similarity.degrees, service.similarity.degrees)
+        for svc in (service, restarted):
+            add_views(svc, 'u4', 'eb', 3000.0)
+        for post_id in 'abcde':
+            assert restarted.coview.neighbors(post_id) == service.coview.neighbors(post_id)
+    finally:
+        restarted.close()
@@ -0,0 +1,33 @@
+"""View events consumed from the service's queue, including backdated ones"""
+import asyncio
+
+from app.config import settings
+from app.services.recommendation_service import RecommendationService
+
+
+def test_queue_views_are_applied_in_time_order(service, monkeypatch):
+    monkeypatch.setattr(settings, 'VIEW_CONSUMER_SOURCE', 'queue')
+    monkeypatch.setattr(settings, 'VIEW_CONSUMER_POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(settings, 'RECO_MAX_HISTORY_PER_USER', 3)
+    svc = RecommendationService()
+
+    async def main():
+        svc.warmup.mark_ready()
+        svc._start_view_consumer()
+        for post_id, viewed_at in (('a', 1000.0), ('c', 3000.0), ('b', 2000.0), ('d', 4000.0), ('z', 500.0)):
+            await svc.view_queue.put({'user_id': 'u1', 'post_id': post_id, 'viewed_at': viewed_at})
+        while svc.view_consumer.consumed < 5:
+            await asyncio.sleep(0.01)
+        for task in svc._background_tasks:
+            task.cancel()
+        await asyncio.gather(*svc._background_tasks, return_exceptions=True)
+
+    try:
+        asyncio.run(main())
+        # Eviction drops the oldest views, including a backdated one that arrives last
+        assert list(svc.user_post_interactions['u1'].items()) == [('b', 2000.0), ('c', 3000.0), ('d', 4000.0)]
+        # Backdated views pair with their neighbours in time, as if they had arrived in order
+        assert set(svc.coview.neighbors('b')) == {'a', 'c', 'd', 'z'}
+        assert set(svc.coview.neighbors('z')) == {'b', 'c', 'd'}
+    finally:
+        svc.close()
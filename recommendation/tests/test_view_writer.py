@@ -0,0 +1,39 @@
+"""Buffering of the view write-behind queue"""
+import asyncio
+
+from app.services.view_writer import ViewWriteBehind
+
+
+def record(i):
+    return (f'user-{i}', f'post-{i}', None, None, None, None, None)
+
+
+def test_enqueue_many_queues_without_writing():
+    async def main():
+        writer = ViewWriteBehind(batch_size=3, max_pending=5)
+        assert writer.enqueue_many([record(i) for i in range(2)]) == 2
+        assert not writer._has_work.is_set()
+        # Past the batch size the flusher is woken; what doesn't fit is dropped
+        assert writer.enqueue_many([record(i) for i in range(2, 6)]) == 3
+        assert writer.pending == 5
+        assert writer.dropped == 1
+        assert writer._has_work.is_set()
+        assert writer.written == 0
+
+    asyncio.run(main())
+
+
+def test_enqueue_waits_again_when_space_is_taken():
+    async def main():
+        writer = ViewWriteBehind(max_pending=1, enqueue_timeout=0.2)
+        await writer.enqueue('user-0', 'post-0')
+        waiting = [asyncio.create_task(writer.enqueue(f'user-{i}', f'post-{i}')) for i in (1, 2)]
+        await asyncio.sleep(0.01)
+        # One slot frees up, as after a flushed batch; only one of the two producers gets it
+        writer._buffer.popleft()
+        writer._has_space.set()
+        assert sorted(await asyncio.gather(*waiting)) == [False, True]
+        assert writer.pending == 1
+        assert writer.dropped == 1
+
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""Warm-load from Postgres: streamed in chunks, resumed from the persisted createdAt watermark"""
+import asyncio
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.services import recommendation_service
+from app.services.recommendation_service import RecommendationService
+
+START = datetime(2024, 1, 1)
+
+
+def view(user_id, post_id, minutes):
+    return {
+        'userId': user_id,
+        'postId': post_id,
+        'postAuthorId': f'author-{post_id}',
+        'createdAt': START + timedelta(minutes=minutes),
+        'sessionId': None,
+        'durationMs': None,
+    }
+
+
+def fake_stream(monkeypatch, rows):
+    queries = []
+
+    async def stream_query(query, params=None, chunk_size=1000):
+        queries.append((query, params, chunk_size))
+        for i in range(0, len(rows), chunk_size):
+            yield rows[i:i + chunk_size]
+
+    monkeypatch.setattr(recommendation_service.db, 'stream_query', stream_query)
+    return queries
+
+
+def warm_load(svc):
+    async def main():
+        await svc._load_interactions_from_db()
+
+    asyncio.run(main())
+
+
+def test_warm_load_streams_chunks_and_resumes_from_the_watermark(service, monkeypatch):
+    monkeypatch.setattr(settings, 'WARM_LOAD_CHUNK_SIZE', 2)
+    rows = [view('u1', 'a', 0), view('u1', 'b', 1), view('u2', 'a', 2), view('u2', 'b', 3), view('u1', 'c', 4)]
+    queries = fake_stream(monkeypatch, rows)
+    warm_load(service)
+
+    assert queries[0][1] is None and queries[0][2] == 2
+    assert service.model_loaded
+    assert service.warmup.rows_loaded == 5
+    assert list(service.user_post_interactions['u1']) == ['a', 'b', 'c']
+    assert set(service.coview.neighbors('a')) == {'b', 'c'}
+    assert service.author_index.post_authors['c'] == 'author-c'
+    assert service.interaction_store.watermark == START + timedelta(minutes=4)
+
+    # A restart maps the snapshot and only asks Postgres for rows from the watermark on
+    restarted = RecommendationService()
+    try:
+        restarted.load_interactions()
+        assert restarted.interaction_store.watermark == START + timedelta(minutes=4)
+        # The row at the watermark is read again and deduplicated
+        queries = fake_stream(monkeypatch, [view('u1', 'c', 4), view('u2', 'c', 5)])
+        warm_load(restarted)
+        query, params, _ = queries[0]
+        assert '"createdAt" >= $1' in query
+        assert params == (START + timedelta(minutes=4),)
+        assert list(restarted.user_post_interactions['u1']) == ['a', 'b', 'c']
+        assert list(restarted.user_post_interactions['u2']) == ['a', 'b', 'c']
+        assert restarted.coview.neighbors('c')['a'] > service.coview.neighbors('c')['a']
+        assert restarted.interaction_store.watermark == START + timedelta(minutes=5)
+    finally:
+        restarted.close()
@@ -0,0 +1,43 @@
+"""Readiness gating: popular posts and a 503 readiness probe until the model has warmed up"""
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_recommendation_service
+from app.main import app
+from app.utils.cursor import encode_cursor
+
+
+def test_readiness_is_503_until_warm_up_marks_the_model_ready(service, monkeypatch):
+    service.user_post_interactions['user-1']['seen'] = 0.0
+    service.coview.add('seen', 'post-1', 1.0)
+    served = []
+
+    async def popular_fallback(page, limit, exclude_ids=None, after=None, include_total=True):
+        served.append('popular')
+        return [], 0, None
+
+    async def similarity_posts(user_id, model, history, page, limit, after):
+        served.append('similarity')
+        return [], 0, None
+
+    monkeypatch.setattr(service, '_popular_fallback', popular_fallback)
+    monkeypatch.setattr(service, '_get_similarity_posts', similarity_posts)
+    app.dependency_overrides[get_recommendation_service] = lambda: service
+    try:
+        client = TestClient(app)
+        service.warmup.begin('warm_loading', 100)
+        response = client.get('/api/v1/ready')
+        assert response.status_code == 503
+        assert response.json()['warmup']['phase'] == 'warm_loading'
+        # Liveness stays green while warming up
+        assert client.get('/api/v1/health').status_code == 200
+        assert client.get('/api/v1/recommendations/user-1').status_code == 200
+        assert served == ['popular']
+
+        service.warmup.mark_ready()
+        response = client.get('/api/v1/ready')
+        assert response.status_code == 200
+        assert response.json()['ready'] is True
+        client.get('/api/v1/recommendations/user-1', params={'cursor': encode_cursor('similarity', 'post-1', score=1.0)})
+        assert served == ['popular', 'similarity']
+    finally:
+        app.dependency_overrides.clear()